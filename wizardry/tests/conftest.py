@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StrategyServer(ThreadingHTTPServer):
+    """A local stand-in for raw.githubusercontent.com."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StrategyHandler)
+        self.files = {}
+        self.requests = []
+        self.delay = 0
+        self.failures = {}
+        #requests being served at once, the most there were, and the client ports seen
+        self.active = self.peak = 0
+        self.ports = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/' % self.server_address[1]
+
+
+class StrategyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.ports.add(self.client_address[1])
+        try:
+            self.respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if server.delay:
+            threading.Event().wait(server.delay)
+        path = self.path.lstrip('/')
+        if server.failures.get(path):
+            server.failures[path] -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = server.files.get(path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def strategy_server():
+    server = StrategyServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+STUB_LEAN = '''#!/usr/bin/env python
+import json, os, sys
+with open(os.environ['STUB_LEAN_LOG'], 'a') as log:
+    log.write(json.dumps({'args': sys.argv[1:], 'cwd': os.getcwd()}) + '\\n')
+if os.environ.get('STUB_LEAN_SLEEP'):
+    import time
+    time.sleep(float(os.environ['STUB_LEAN_SLEEP']))
+if os.environ.get('STUB_LEAN_OUTPUT') and 'backtest' in sys.argv[1:3]:
+    with open(os.environ['STUB_LEAN_OUTPUT']) as output:
+        sys.stdout.write(output.read())
+else:
+    print('stub lean ' + ' '.join(sys.argv[1:]))
+sys.exit(int(os.environ.get('STUB_LEAN_EXIT', '0')))
+'''
+
+
+class StubLean(object):
+    """A fake ``lean`` executable on PATH recording its invocations."""
+    def __init__(self, directory):
+        self.path = os.path.join(directory, 'lean')
+        self.log = os.path.join(directory, 'lean.log')
+        with open(self.path, 'w') as file:
+            file.write(STUB_LEAN.replace('#!/usr/bin/env python', '#!' + sys.executable))
+        os.chmod(self.path, 0o755)
+
+    @property
+    def calls(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as file:
+            return [json.loads(line) for line in file]
+
+
+@pytest.fixture
+def stub_lean(tmp_path, monkeypatch):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    stub = StubLean(str(directory))
+    monkeypatch.setenv('PATH', str(directory) + os.pathsep + os.environ['PATH'])
+    monkeypatch.setenv('STUB_LEAN_LOG', stub.log)
+    monkeypatch.setenv('WIZARDRY_CACHE_DIR', str(tmp_path / 'cache'))
+    return stub
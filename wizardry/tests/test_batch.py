@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from wizardry.batch import SpecError, expand, generate_variants
+from wizardry.codegen import CHOICES
+
+SPEC = {
+    'start': '2017, 1, 1',
+    'cash': 100000,
+    'grid': {
+        'alpha': ['RSI', ['RSI', 'MACD']],
+        'universe': ['Large Cap Equities', 'Coarse Universe'],
+        'portfolio': ['Equal Weighting'],
+        'execution': ['Immediate', 'VWAP'],
+        'risk': ['None'],
+    },
+    'variants': [{'alpha': 'MACD', 'universe': 'None', 'portfolio': 'None',
+                  'execution': 'None', 'risk': 'None'}],
+}
+
+
+def test_expand_grid_and_explicit_variants():
+    variants = list(expand(SPEC))
+    assert len(variants) == 1 + 2 * 2 * 2
+    assert variants[0]['alpha'] == ['MACD']
+    assert variants[-1]['alpha'] == ['RSI', 'MACD']
+    assert variants[-1]['cash'] == '100000'
+
+
+def test_expand_rejects_unknown_choice():
+    spec = dict(SPEC, grid=dict(SPEC['grid'], risk=['Stop Everything']))
+    with pytest.raises(SpecError):
+        list(expand(spec))
+
+
+def test_expand_rejects_malformed_specs():
+    variant = SPEC['variants'][0]
+    with pytest.raises(SpecError, match='unknown parameter: rsi_perod'):
+        list(expand(dict(SPEC, variants=[dict(variant, parameters={'rsi_perod': 14})])))
+    with pytest.raises(SpecError, match='parameters must map'):
+        list(expand(dict(SPEC, variants=[dict(variant, parameters=[14])])))
+    with pytest.raises(SpecError, match='variant 2 is not a mapping'):
+        list(expand(dict(SPEC, variants=[variant, 'RSI'])))
+    with pytest.raises(SpecError, match='grid must map'):
+        list(expand(dict(SPEC, grid=dict(SPEC['grid'], risk='None'))))
+    #a parameter of a component the variant doesn't use is fine: grids share them
+    assert list(expand(dict(SPEC, variants=[dict(variant, parameters={'rsi_period': 14})])))
+
+
+def test_generate_variants(tmp_path):
+    assert generate_variants(SPEC, str(tmp_path)) == 9
+    index = json.loads((tmp_path / 'variants.json').read_text())
+    assert index['variant-0001']['alpha'] == ['MACD']
+    source = (tmp_path / 'variant-0002' / 'main.py').read_text()
+    assert 'RsiAlphaModel' in source and 'QC500UniverseSelectionModel' in source
+
+
+def test_generate_ten_thousand_variants(tmp_path):
+    spec = {
+        'start': '2017, 1, 1',
+        'grid': {
+            'alpha': CHOICES['alpha'],
+            'universe': CHOICES['universe'],
+            'portfolio': CHOICES['portfolio'],
+            'execution': CHOICES['execution'],
+            'risk': CHOICES['risk'],
+        },
+        'cash': 100000,
+    }
+    assert generate_variants(spec, str(tmp_path)) == 12 * 10 * 5 * 4 * 5
+
+
+def test_generate_parameterized_variants(tmp_path):
+    spec = dict(SPEC, variants=[dict(SPEC['variants'][0], parameters={'macd_fast': 5})])
+    generate_variants(spec, str(tmp_path), parameterized=True)
+    config = json.loads((tmp_path / 'variant-0001' / 'config.json').read_text())
+    assert config['parameters'] == {'macd_fast': '5', 'macd_slow': '26', 'macd_signal': '9'}
+    assert 'MacdAlphaModel(macd_fast,' in (tmp_path / 'variant-0001' / 'main.py').read_text()
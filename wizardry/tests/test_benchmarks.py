@@ -0,0 +1,202 @@
+"""
+Benchmarks of code generation, library fetches and search, lean
+orchestration, the alpha screen and the portfolio simulator, run with pytest-benchmark
+(skipped without it). See contributor.md to save a baseline and compare a
+change against it.
+"""
+import itertools
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('requests')
+
+from wizardry.builder import FastSourceBuilder, PySourceBuilder, SourceBuilder
+from wizardry.cache import StrategyCache
+from wizardry.codegen import CHOICES, generate
+from wizardry.library import STRATEGIES, fetch, make_session, strategy_url
+from wizardry.memo import BacktestMemo, local_backtest
+from wizardry.optimizer import Optimization
+from wizardry.scheduler import backtest_projects, find_projects
+from wizardry.search import SearchIndex
+from wizardry.screen import Bars, screen, variants
+from wizardry.simulate import sample_universes, simulate
+from wizardry.validate import check_source
+
+#one alpha per combination, every other component: 12000 strategies
+COMBINATIONS = [
+    {'alpha': [alpha], 'universe': universe, 'portfolio': portfolio, 'execution': execution,
+     'risk': risk, 'start': '2017, 1, 1', 'cash': '100000'}
+    for alpha, universe, portfolio, execution, risk in itertools.product(
+        CHOICES['alpha'], CHOICES['universe'], CHOICES['portfolio'], CHOICES['execution'], CHOICES['risk'])
+]
+
+#what the stub lean prints for a backtest, read by both the cloud and local paths
+OUTPUT = '''20210101 STATISTICS:: Sharpe Ratio 1.25
+│ Statistic          │ Value    │ Statistic        │ Value    │
+│ Sharpe Ratio       │ 1.25     │ Drawdown         │ 3.1%     │
+Backtest id: 1234abcd
+Backtest url: https://www.quantconnect.com/project/1/1234abcd
+'''
+
+NAMES = STRATEGIES[:40]
+
+
+def render(sb, functions=2000):
+    for i in range(functions):
+        sb.writeln('def f{0}():'.format(i))
+        with sb.indent:
+            sb.writeln('if True:')
+            sb.indent()
+            sb.write('x = ')
+            sb.writeln('1')
+            sb.dedent()
+            sb.writeln('return x')
+        sb.writeln()
+    return sb.end()
+
+
+def render_blocks(functions=2000):
+    sb = PySourceBuilder()
+    for i in range(functions):
+        with sb.block('def f{0}():'.format(i), 1):
+            with sb.block('if True:'):
+                sb.writeln('x = 1')
+            sb.writeln('return x')
+    return sb.end()
+
+
+@pytest.fixture
+def backtest_output(tmp_path, stub_lean, monkeypatch):
+    (tmp_path / 'lean.json').write_text('{}')
+    (tmp_path / 'output.txt').write_text(OUTPUT)
+    monkeypatch.setenv('STUB_LEAN_OUTPUT', str(tmp_path / 'output.txt'))
+    return tmp_path
+
+
+@pytest.mark.parametrize('builder', [SourceBuilder, FastSourceBuilder])
+def test_builder_render(benchmark, builder):
+    benchmark.group = 'builder'
+    assert benchmark(lambda: render(builder())).count('\n') == 10000
+
+
+def test_py_builder_blocks(benchmark):
+    benchmark.group = 'builder'
+    assert benchmark(render_blocks).count('def ') == 2000
+
+
+def test_generate_every_combination(benchmark):
+    benchmark.group = 'framework'
+    sources = benchmark.pedantic(lambda: [generate(answers) for answers in COMBINATIONS], rounds=3)
+    assert len(sources) == 12000
+
+
+def test_check_generated_source(benchmark):
+    benchmark.group = 'framework'
+    source = generate(COMBINATIONS[0])
+    assert benchmark(check_source, source) == []
+
+
+def test_fetch_cold(benchmark, strategy_server, tmp_path):
+    benchmark.group = 'library'
+    for name in NAMES:
+        strategy_server.files[strategy_url(name, '')] = ('# %s\n' % name).encode('utf-8') * 200
+    caches = iter(range(1000))
+
+    def setup():
+        return (StrategyCache(str(tmp_path / str(next(caches)))), make_session(1)), {}
+
+    def fetch_all(cache, session):
+        with session:
+            return [fetch(strategy_url(name, strategy_server.url), cache, session=session) for name in NAMES]
+
+    assert len(benchmark.pedantic(fetch_all, setup=setup, rounds=5)) == 40
+
+
+def test_fetch_revalidated(benchmark, strategy_server, tmp_path):
+    benchmark.group = 'library'
+    for name in NAMES:
+        strategy_server.files[strategy_url(name, '')] = ('# %s\n' % name).encode('utf-8') * 200
+    cache = StrategyCache(str(tmp_path))
+    session = make_session(1)
+    urls = [strategy_url(name, strategy_server.url) for name in NAMES]
+    for url in urls:
+        fetch(url, cache, session=session)
+    with session:
+        benchmark.pedantic(lambda: [fetch(url, cache, session=session) for url in urls], rounds=5)
+    assert all('If-None-Match' in headers for path, headers in strategy_server.requests[len(urls):])
+
+
+def test_search(benchmark, tmp_path):
+    benchmark.group = 'library'
+    cache = StrategyCache(str(tmp_path))
+    for name in NAMES:
+        cache.put(strategy_url(name, 'http://127.0.0.1/'), ('class A(QCAlgorithm):  # %s\n' % name).encode('utf-8') * 50)
+    SearchIndex(cache=cache, base_url='http://127.0.0.1/').update()
+    #a fresh index per round: loading it is part of a search
+    results = benchmark(lambda: SearchIndex(cache=cache, base_url='http://127.0.0.1/').search('momentum reversal stocks'))
+    assert results
+
+
+def test_backtest_projects(benchmark, backtest_output):
+    benchmark.group = 'orchestration'
+    for i in range(16):
+        project = backtest_output / 'variants' / ('variant-%d' % i)
+        project.mkdir(parents=True)
+        (project / 'main.py').write_text('# %d\n' % i)
+    directories = find_projects([str(backtest_output / 'variants' / '*')])
+    rows = benchmark.pedantic(backtest_projects, args=(directories,),
+                              kwargs={'concurrency': 8, 'rate_limit': 0, 'backoff': 0, 'force_push': True},
+                              rounds=3)
+    assert {row['status'] for row in rows} == {'ok'}
+
+
+def test_local_backtest_memoized(benchmark, backtest_output):
+    benchmark.group = 'orchestration'
+    project = backtest_output / 'Strategy'
+    project.mkdir()
+    (project / 'main.py').write_text(generate(COMBINATIONS[0]))
+    memo = BacktestMemo(str(backtest_output / 'memo'))
+    local_backtest(str(project), memo=memo)
+    result, cached = benchmark(local_backtest, str(project), memo=memo)
+    assert cached
+
+
+def test_optimize_local(benchmark, backtest_output):
+    benchmark.group = 'orchestration'
+    spec = dict(COMBINATIONS[0], alpha='RSI', start='2015, 1, 1', end='2021, 1, 1',
+                parameters={'rsi_period': [10, 20, 30, 40, 50, 60]}, rungs=2, eta=3)
+    runs = iter(range(1000))
+
+    def setup():
+        directory = os.path.join(str(backtest_output), 'sweep-%d' % next(runs))
+        memo = BacktestMemo(os.path.join(directory, 'memo'))
+        return (Optimization(spec, directory, workers=4, memo=memo, log=lambda message: None),), {}
+
+    best = benchmark.pedantic(lambda optimization: optimization.run(), setup=setup, rounds=3)
+    assert len(best) == 2
+
+
+def random_bars(symbols, days):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, (symbols, days)), axis=1))
+    return Bars(['S%d' % i for i in range(symbols)], np.arange(days), close, np.ones(close.shape, bool))
+
+
+def test_screen_variants(benchmark):
+    benchmark.group = 'screen'
+    bars = random_bars(1000, 1260)
+    candidates = list(variants())
+    rows = benchmark.pedantic(screen, args=(bars, candidates), rounds=3)
+    assert len(rows) == 15
+
+
+def test_simulate_universes(benchmark):
+    benchmark.group = 'simulate'
+    bars = random_bars(1000, 252)
+    members = sample_universes(1000, 20, 200)
+    rows = benchmark.pedantic(simulate, args=(bars, ('Equal Weighting', 'Mean-Variance')), kwargs={'members': members},
+                              rounds=1)
+    assert len(rows) == 8
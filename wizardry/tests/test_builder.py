@@ -0,0 +1,52 @@
+import io
+import os
+
+import pytest
+
+from wizardry.builder import DedentException, FastSourceBuilder, SourceBuilder
+
+
+def render(sb, functions=50):
+    for i in range(functions):
+        sb.writeln('def f{0}():'.format(i))
+        with sb.indent:
+            sb.writeln('if True:')
+            sb.indent()
+            sb.write('x = ')
+            sb.writeln('1')
+            sb.dedent()
+            sb.writeln('return x')
+        sb.writeln()
+    return sb.end()
+
+
+def test_fast_builder_matches_source_builder():
+    assert render(FastSourceBuilder()) == render(SourceBuilder())
+
+
+def test_fast_builder_streams_to_file_object():
+    out = io.StringIO()
+    assert render(FastSourceBuilder(sink=out), functions=500) is None
+    assert out.getvalue() == render(SourceBuilder(), functions=500)
+
+
+def test_fast_builder_streams_to_fd(tmp_path):
+    path = str(tmp_path / 'main.py')
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        render(FastSourceBuilder(sink=fd), functions=500)
+    finally:
+        os.close(fd)
+    with open(path) as file:
+        assert file.read() == render(SourceBuilder(), functions=500)
+
+
+def test_fast_builder_truncate_and_dedent():
+    sb = FastSourceBuilder()
+    with sb.indent:
+        sb.writeln('pass')
+    sb.truncate()
+    assert sb.end() == ''
+    with pytest.raises(DedentException):
+        sb.dedent()
+
@@ -0,0 +1,58 @@
+import pytest
+
+from wizardry.catalog import CATALOG, Component
+from wizardry.codegen import Engine, config_parameters, generate
+
+ANSWERS = {
+    'alpha': ['MACD', 'RSI'],
+    'universe': 'Scheduled Universe',
+    'portfolio': 'Equal Weighting',
+    'execution': 'None',
+    'risk': 'Maximum Drawdown',
+    'start': '2017, 1, 1',
+    'cash': '100000',
+}
+
+
+def test_generate():
+    source = generate(ANSWERS)
+    assert 'from datetime import timedelta\n' in source
+    assert source.index('RsiAlphaModel') < source.index('MacdAlphaModel')
+    assert '        self.SetCash(100000) # Set Strategy Cash\n' in source
+    assert '            self.TimeRules.Every(timedelta(hours = 12)),\n' in source
+    assert 'Execution' not in source.split('class ')[1]
+
+
+def test_generate_unknown_component():
+    with pytest.raises(ValueError):
+        generate(dict(ANSWERS, risk='Hope'))
+
+
+def test_engine_catalog_extension():
+    alpha = dict(dict(CATALOG)['alpha'])
+    alpha['Momentum'] = Component(('self.AddAlpha(MomentumAlphaModel())',), ('from Momentum import *',))
+    engine = Engine(((field, alpha if field == 'alpha' else section) for field, section in CATALOG))
+    source = engine.render(dict(ANSWERS, alpha=['Momentum']))
+    assert 'from Momentum import *\n' in source
+    assert '        self.AddAlpha(MomentumAlphaModel())\n' in source
+
+
+def test_generate_parameters_and_end():
+    source = generate(dict(ANSWERS, end='2020, 1, 1', parameters={'rsi_period': 14, 'macd_fast': 5}))
+    assert 'RsiAlphaModel(14, Resolution.Minute)' in source
+    assert 'MacdAlphaModel(5, 26, 9,' in source
+    assert 'MaximumDrawdownPercentPerSecurity(0.01)' in source
+    assert '        self.SetEndDate(2020, 1, 1) # Set End Date\n' in source
+
+
+def test_generate_parameterized():
+    answers = dict(ANSWERS, parameters={'rsi_period': 14})
+    source = generate(answers, parameterized=True)
+    assert '        rsi_period = int(self.GetParameter("rsi_period") or 60)\n' in source
+    assert '        max_drawdown = float(self.GetParameter("max_drawdown") or 0.01)\n' in source
+    assert 'RsiAlphaModel(rsi_period, Resolution.Minute)' in source
+    assert 'MacdAlphaModel(macd_fast, macd_slow, macd_signal,' in source
+    #overrides only go to config.json, whatever their type
+    assert generate(dict(ANSWERS, parameters={'rsi_period': 30, 'max_drawdown': 1}), parameterized=True) == source
+    assert config_parameters(answers) == {'rsi_period': '14', 'macd_fast': '12', 'macd_slow': '26',
+                                          'macd_signal': '9', 'max_drawdown': '0.01'}
@@ -0,0 +1,92 @@
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip('requests')
+
+from wizardry import cache as cache_module
+from wizardry.cache import StrategyCache
+from wizardry.library import LibraryError, fetch, load_manifest, strategy_url, write_manifest
+
+
+def test_strategy_url():
+    assert strategy_url('Pairs Trading Copula Method').endswith('/Pairs%20Trading%20Copula%20Method.py')
+
+
+def test_fetch_revalidates_with_etag(strategy_server, tmp_path):
+    strategy_server.files['rsi.py'] = b'class Rsi(QCAlgorithm):\n    pass\n'
+    cache = StrategyCache(str(tmp_path))
+    url = strategy_server.url + 'rsi.py'
+
+    assert fetch(url, cache=cache) == 'class Rsi(QCAlgorithm):\n    pass\n'
+    assert fetch(url, cache=cache) == 'class Rsi(QCAlgorithm):\n    pass\n'
+    assert 'If-None-Match' not in strategy_server.requests[0][1]
+    assert strategy_server.requests[1][1]['If-None-Match'] == cache.get(url)['etag']
+
+    strategy_server.files['rsi.py'] = b'class Rsi2(QCAlgorithm):\n    pass\n'
+    assert 'Rsi2' in fetch(url, cache=cache)
+
+
+def test_fetch_offline_and_errors(strategy_server, tmp_path):
+    strategy_server.files['rsi.py'] = b'pass\n'
+    cache = StrategyCache(str(tmp_path))
+    with pytest.raises(LibraryError):
+        fetch(strategy_server.url + 'rsi.py', cache=cache, offline=True)
+    with pytest.raises(LibraryError):
+        fetch(strategy_server.url + 'missing.py', cache=cache)
+
+    fetch(strategy_server.url + 'rsi.py', cache=cache)
+    assert fetch(strategy_server.url + 'rsi.py', cache=cache, offline=True) == 'pass\n'
+    assert len(strategy_server.requests) == 2
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = StrategyCache(str(tmp_path), max_size=25)
+    cache.put('a', b'a' * 10)
+    cache.put('b', b'b' * 10)
+    cache.read('a')
+    cache.put('c', b'c' * 10)
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert cache.stats()['size'] == 20
+
+    cache.put('d', b'a' * 10)
+    assert cache.stats()['blobs'] == 2
+    assert cache.prune(0) == 3
+    assert StrategyCache(str(tmp_path)).stats()['entries'] == 0
+
+
+def test_prune_keeps_blobs_not_added_yet(tmp_path, monkeypatch):
+    cache = StrategyCache(str(tmp_path))
+    #a blob a sync worker just wrote, its entry not added yet
+    sha256, size = cache.write_blob([b'pending'])
+    cache.put('a', b'a' * 10)
+    assert cache.prune(0) == 1
+    assert os.path.isfile(cache.blob_path(sha256)) and not os.path.exists(cache.blob_path(hashlib.sha256(b'a' * 10).hexdigest()))
+    #nor those of a sync in another process
+    assert StrategyCache(str(tmp_path)).prune(0) == 0 and os.path.isfile(cache.blob_path(sha256))
+    monkeypatch.setattr(cache_module, 'PRUNE_GRACE', -1)
+    StrategyCache(str(tmp_path)).prune(0)
+    assert not os.path.exists(cache.blob_path(sha256))
+
+
+def test_fetch_streams_and_checks_the_manifest(strategy_server, tmp_path):
+    body = b'class Big(QCAlgorithm):\n' + b'    # padding\n' * 20000
+    strategy_server.files['big.py'] = body
+    cache = StrategyCache(str(tmp_path / 'cache'))
+    url = strategy_server.url + 'big.py'
+
+    with pytest.raises(LibraryError):
+        fetch(url, cache=cache, sha256='0' * 64)
+    assert cache.get(url) is None
+    assert os.listdir(cache.blobs) == []
+
+    (tmp_path / 'big.py').write_bytes(body)
+    assert write_manifest(str(tmp_path)) == 1
+    strategy_server.files['manifest.json'] = (tmp_path / 'manifest.json').read_bytes()
+    sha256 = load_manifest(cache, base_url=strategy_server.url)['big.py']
+    assert fetch(url, cache=cache, sha256=sha256).encode() == body
+    requests = len(strategy_server.requests)
+    assert fetch(url, cache=cache, sha256=sha256).encode() == body
+    assert len(strategy_server.requests) == requests
@@ -0,0 +1,49 @@
+import os
+
+from wizardry.manifest import PushManifest, project_files, push_project
+
+
+def make_project(tmp_path):
+    project = tmp_path / 'workspace' / 'My Project'
+    (project / '.vscode').mkdir(parents=True)
+    (project / 'backtests').mkdir()
+    (project / 'main.py').write_text('class A: pass\n')
+    (project / 'config.json').write_text('{}')
+    (project / 'research.ipynb').write_text('{}')
+    (project / '.vscode' / 'launch.json').write_text('{}')
+    (project / 'backtests' / 'result.json').write_text('{}')
+    (project / 'notes.txt').write_text('')
+    return project
+
+
+def test_project_files(tmp_path):
+    assert project_files(str(make_project(tmp_path))) == ['config.json', 'main.py', 'research.ipynb']
+
+
+def test_push_only_when_changed(tmp_path, stub_lean, monkeypatch):
+    project = make_project(tmp_path)
+    pushes = lambda: len(stub_lean.calls)
+
+    assert push_project(str(project)) == 0
+    assert stub_lean.calls[0] == {'args': ['cloud', 'push', '--project', 'My Project'],
+                                  'cwd': str(project.parent)}
+    assert push_project(str(project)) == 0
+    assert pushes() == 1
+
+    os.utime(str(project / 'main.py'), ns=(1, 1))
+    assert push_project(str(project)) == 0
+    assert pushes() == 1
+    assert PushManifest(str(project)).files['main.py']['mtime_ns'] == 1
+
+    (project / 'main.py').write_text('class B: pass\n')
+    push_project(str(project))
+    assert pushes() == 2
+    push_project(str(project), force=True)
+    assert pushes() == 3
+
+    (project / 'research.ipynb').unlink()
+    monkeypatch.setenv('STUB_LEAN_EXIT', '1')
+    assert push_project(str(project)) == 1
+    monkeypatch.delenv('STUB_LEAN_EXIT')
+    push_project(str(project))
+    assert pushes() == 5
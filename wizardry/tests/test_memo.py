@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+from wizardry.memo import BacktestError, BacktestMemo, backtest_key, local_backtest
+
+OUTPUT = '''20210101 STATISTICS:: Sharpe Ratio 1.5
+20210101 STATISTICS:: Net Profit 12.3%
+'''
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'lean.json').write_text('{"data-folder": "data"}')
+    project = tmp_path / 'Strategy'
+    project.mkdir()
+    (project / 'main.py').write_text('self.SetStartDate(2017, 1, 1)\nself.SetCash(100000)\n')
+    (project / 'config.json').write_text('{}')
+    return project
+
+
+def test_backtest_key(project, tmp_path):
+    key = backtest_key(str(project))
+    assert backtest_key(str(project)) == key
+    (project / 'main.py').write_text('self.SetStartDate(2018, 1, 1)\nself.SetCash(100000)\n')
+    assert backtest_key(str(project)) != key
+    changed = backtest_key(str(project))
+    (tmp_path / 'lean.json').write_text('{"data-folder": "other"}')
+    assert backtest_key(str(project)) != changed
+
+
+def test_local_backtest_is_memoized(project, tmp_path, stub_lean, monkeypatch):
+    (tmp_path / 'output.txt').write_text(OUTPUT)
+    monkeypatch.setenv('STUB_LEAN_OUTPUT', str(tmp_path / 'output.txt'))
+    memo = BacktestMemo(str(tmp_path / 'memo'))
+
+    result, cached = local_backtest(str(project), memo=memo)
+    assert not cached
+    assert result['statistics'] == {'Sharpe Ratio': '1.5', 'Net Profit': '12.3%'}
+    assert (result['start'], result['cash']) == ('2017, 1, 1', '100000')
+    assert stub_lean.calls[0]['args'][:2] == ['backtest', 'Strategy']
+    assert stub_lean.calls[0]['cwd'] == str(tmp_path)
+
+    result, cached = local_backtest(str(project), memo=memo)
+    assert cached and result['statistics']['Sharpe Ratio'] == '1.5'
+    assert len(stub_lean.calls) == 1
+
+    local_backtest(str(project), use_cache=False, memo=memo)
+    assert len(stub_lean.calls) == 2
+
+    monkeypatch.setenv('STUB_LEAN_EXIT', '1')
+    (project / 'main.py').write_text('self.SetCash(5)\n')
+    with pytest.raises(BacktestError):
+        local_backtest(str(project), memo=memo)
+
+
+def test_memo_eviction(tmp_path):
+    memo = BacktestMemo(str(tmp_path), max_entries=2, max_age_days=1)
+    for i, key in enumerate('abc'):
+        memo.put(key, {'n': i})
+        os.utime(os.path.join(memo.root, key + '.json'), (time.time() - 10 + i,) * 2)
+    memo.prune()
+    assert memo.get('a') is None and memo.get('c') == {'n': 2}
+
+    os.utime(os.path.join(memo.root, 'b.json'), (time.time() - 2 * 86400,) * 2)
+    assert memo.get('b') is None
+
+
+def test_prune_races_another_prune(tmp_path, monkeypatch):
+    memo = BacktestMemo(str(tmp_path), max_entries=1)
+    memo.put('a', {'n': 1})
+    memo.put('b', {'n': 2})
+    #another thread of the sweep evicts the entries this prune is looking at
+    listed = [os.path.join(memo.root, key + '.json') for key in 'abc']
+    monkeypatch.setattr('wizardry.memo.glob.glob', lambda pattern: listed)
+    memo.prune()
+    assert os.listdir(memo.root) == ['b.json'] and memo.get('b') == {'n': 2}
+    memo.max_entries = 0
+    memo.prune()
+    memo.prune()
+    assert os.listdir(memo.root) == []
@@ -0,0 +1,95 @@
+import datetime
+import json
+import os
+import re
+
+import pytest
+
+from wizardry import optimizer
+from wizardry.batch import SpecError
+from wizardry.memo import BacktestMemo
+from wizardry.optimizer import Optimization, parameter_values, rung_start, trials
+
+SPEC = {
+    'alpha': 'RSI',
+    'universe': 'Manual Selection',
+    'portfolio': 'Equal Weighting',
+    'execution': 'Immediate',
+    'risk': 'Maximum Drawdown',
+    'start': '2012, 1, 1',
+    'end': '2021, 1, 1',
+    'cash': 100000,
+    'parameters': {'rsi_period': {'min': 10, 'max': 50, 'step': 5}},
+    'rungs': 3,
+    'eta': 3,
+}
+
+
+@pytest.fixture
+def lean(tmp_path, monkeypatch):
+    """A fake lean whose Sharpe ratio peaks at an RSI period of 30."""
+    (tmp_path / 'lean.json').write_text('{}')
+    calls = []
+
+    def capture_lean(args, cwd=None, timeout=None):
+        with open(os.path.join(cwd, args[1], 'main.py')) as file:
+            source = file.read()
+        if os.environ.get('FAKE_LEAN_INTERRUPT') == str(len(calls)):
+            raise KeyboardInterrupt
+        calls.append(re.search(r'SetStartDate\((.*?)\)', source).group(1))
+        with open(os.path.join(cwd, args[1], 'config.json')) as file:
+            period = int(json.load(file)['parameters']['rsi_period'])
+        return 0, 'STATISTICS:: Sharpe Ratio %.2f\n' % (2 - abs(period - 30) / 10.0)
+
+    monkeypatch.setattr(optimizer, 'capture_lean', capture_lean)
+    return calls
+
+
+def test_trials():
+    assert parameter_values('x', {'min': 0.01, 'max': 0.03, 'step': 0.01}) == [0.01, 0.02, 0.03]
+    assert len(trials(dict(SPEC, parameters={'rsi_period': [1, 2], 'max_drawdown': [0.1, 0.2]}),
+                      {'alpha': ['RSI'], 'universe': 'None', 'portfolio': 'None',
+                       'execution': 'None', 'risk': 'Maximum Drawdown'})) == 4
+    sampled = Optimization(dict(SPEC, search='random', samples=4, seed=1), 'unused').trials
+    assert len(sampled) == 4 and len({trial['rsi_period'] for trial in sampled}) == 4
+    with pytest.raises(SpecError):
+        Optimization(dict(SPEC, parameters={'ema_fast': [10]}), 'unused')
+    with pytest.raises(SpecError):
+        Optimization(dict(SPEC, parameters={'period': [10]}), 'unused')
+    assert rung_start(datetime.date(2012, 1, 1), datetime.date(2021, 1, 1), 1) == datetime.date(2012, 1, 1)
+    #the source casts to the type of the default
+    assert Optimization(dict(SPEC, parameters={'rsi_period': [20.0, 30]}), 'unused').trials == [
+        {'rsi_period': 20}, {'rsi_period': 30}]
+    for values in ([12.5, 20], {'min': 10, 'max': 20, 'step': 2.5}, ['14']):
+        with pytest.raises(SpecError):
+            Optimization(dict(SPEC, parameters={'rsi_period': values}), 'unused')
+
+    #a sweep up to today is fingerprinted with today's date, another day is another sweep
+    today = optimizer.format_date(datetime.date.today())
+    assert (Optimization(dict(SPEC, end=None), 'unused').fingerprint
+            == Optimization(dict(SPEC, end=today), 'unused').fingerprint
+            != Optimization(SPEC, 'unused').fingerprint)
+
+
+def test_successive_halving_and_resume(tmp_path, lean, monkeypatch):
+    memo = BacktestMemo(str(tmp_path / 'memo'))
+    directory = str(tmp_path / 'Strategy' / 'optimizations' / 'wizardry')
+    monkeypatch.setenv('FAKE_LEAN_INTERRUPT', '5')
+    with pytest.raises(KeyboardInterrupt):
+        Optimization(SPEC, directory, workers=1, memo=memo, log=lambda message: None).run()
+    assert len(lean) == 5
+
+    monkeypatch.delenv('FAKE_LEAN_INTERRUPT')
+    optimization = Optimization(SPEC, directory, workers=3, memo=memo, log=lambda message: None)
+    assert optimization.load() == 5
+    best = optimization.run()
+    #9 trials on a ninth of the period, the best 3 on a third, the best one on all of it
+    assert len(lean) == 9 + 3 + 1
+    assert sorted(lean).count('2012, 1, 1') == 1
+    assert [row['parameters'] for row in best] == [{'rsi_period': 30}]
+    assert best[0]['objective'] == 2.0 and best[0]['trial'] == 'trial-0005'
+
+    assert Optimization(SPEC, directory, memo=memo, log=lambda message: None).load() == 13
+    #the trials only differ by their parameters
+    sources = {open(os.path.join(directory, 'trial-%04d' % i, 'main.py')).read() for i in (1, 2, 3)}
+    assert len(sources) == 1 and 'int(self.GetParameter("rsi_period") or 60)' in sources.pop()
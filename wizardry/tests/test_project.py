@@ -0,0 +1,72 @@
+import json
+import os
+
+from wizardry.codegen import generate
+from wizardry.project import merge_regions, split_regions, update_config, write_source
+
+ANSWERS = {
+    'alpha': ['RSI'],
+    'universe': 'None',
+    'portfolio': 'Equal Weighting',
+    'execution': 'None',
+    'risk': 'None',
+    'start': '2017, 1, 1',
+    'cash': '100000',
+}
+
+EDIT = '        self.Debug(str(data))\n'
+
+
+def test_regenerate_keeps_edits(tmp_path):
+    assert write_source(str(tmp_path), generate(ANSWERS)) == 'created'
+    path = tmp_path / 'main.py'
+    path.write_text(path.read_text() + EDIT)
+    os.utime(str(path), ns=(1, 1))
+
+    assert write_source(str(tmp_path), generate(ANSWERS)) == 'unchanged'
+    assert os.stat(str(path)).st_mtime_ns == 1
+
+    assert write_source(str(tmp_path), generate(dict(ANSWERS, alpha=['MACD']), parameterized=True)) == 'updated'
+    source = path.read_text()
+    assert source.endswith(EDIT)
+    assert 'MacdAlphaModel(macd_fast' in source and 'RsiAlphaModel' not in source
+    assert source.index('# wizardry:end settings') < source.index('# wizardry:begin parameters') < source.index('# wizardry:begin alpha')
+    assert oct(os.stat(str(path)).st_mode & 0o777) == oct(0o644)
+
+    #back to the literal constants, the parameters region goes away
+    write_source(str(tmp_path), generate(ANSWERS))
+    assert path.read_text() == generate(ANSWERS) + EDIT
+
+
+def test_new_regions_of_older_sources():
+    #a main.py written before the models and methods regions existed
+    old = generate(ANSWERS).replace('# wizardry:begin models\n# wizardry:end models\n\n', '')
+    old = old.replace('    # wizardry:begin methods\n    # wizardry:end methods\n\n', '')
+    old = old.replace('# wizardry:end universe\n', '# wizardry:end universe\n        self.SetWarmup(10)\n')
+    new = generate(dict(ANSWERS, alpha=['Dual Thrust'], universe='Coarse Universe'))
+    merged = merge_regions(old, new)
+    compile(merged, 'main.py', 'exec')
+    assert merged.index('# wizardry:end imports') < merged.index('class DualThrustAlphaModel') < merged.index('class DancingBlueOwl')
+    assert '        # wizardry:end universe\n        self.SetWarmup(10)\n\n    # wizardry:begin methods\n' in merged
+    assert merged.index('def CoarseSelectionFunction') < merged.index('def OnData')
+
+
+def test_replace_unmarked_source(tmp_path):
+    (tmp_path / 'main.py').write_text('class Mine(QCAlgorithm):\n    pass\n')
+    assert write_source(str(tmp_path), generate(ANSWERS)) == 'replaced'
+    assert (tmp_path / 'main.py.bak').read_text() == 'class Mine(QCAlgorithm):\n    pass\n'
+    assert write_source(str(tmp_path), 'class Library(QCAlgorithm):\n    pass\n') == 'replaced'
+
+
+def test_malformed_markers():
+    assert split_regions('# wizardry:begin alpha\n# wizardry:begin risk\n') is None
+    assert split_regions('# wizardry:end alpha\n') is None
+    assert merge_regions('# wizardry:begin alpha\nx\n', generate(ANSWERS)) is None
+
+
+def test_update_config(tmp_path):
+    (tmp_path / 'config.json').write_text('{"algorithm-language": "Python", "cloud-id": 42}')
+    assert update_config(str(tmp_path), {'rsi_period': '14'})
+    assert not update_config(str(tmp_path), {'rsi_period': '14'})
+    config = json.loads((tmp_path / 'config.json').read_text())
+    assert config == {'algorithm-language': 'Python', 'cloud-id': 42, 'parameters': {'rsi_period': '14'}}
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from wizardry import results
+from wizardry.results import ResultStore, ResultsError, guess_run, parse_number, parse_result
+
+
+def make_result(i):
+    start = 1483228800 + i
+    return {
+        'statistics': {
+            'Sharpe Ratio': '%.3f' % ((i % 100) / 25.0 - 1),
+            'Drawdown': '%.1f%%' % (i % 30),
+            'Net Profit': '%.2f%%' % (i % 50 - 10),
+            'Total Trades': str(i % 7),
+            'Estimated Strategy Capacity': '$1,000,000.00',
+        },
+        'charts': {'Strategy Equity': {'series': {'Equity': {'values': [
+            {'x': start + 86400 * day, 'y': 100000 + i + day} for day in range(20)
+        ]}}}},
+        'orders': {str(n): {'time': '2017-01-0%dT14:31:00Z' % (n + 1),
+                            'symbol': {'value': 'SPY' if n % 2 else 'TLT'},
+                            'quantity': 10 * (n + 1), 'price': 200.5} for n in range(i % 4)},
+    }
+
+
+def write_results(root, projects, per_project):
+    for p in range(projects):
+        for i in range(per_project):
+            run = root / ('project-%d' % p) / 'backtests' / ('2021-01-01_00-00-%04d' % i)
+            run.mkdir(parents=True)
+            (run / ('%d.json' % i)).write_text(json.dumps(make_result(i)))
+            (run / ('%d-summary.json' % i)).write_text(json.dumps(make_result(i)))
+
+
+def test_parsing():
+    assert parse_number('$1,234.50') == 1234.5
+    assert parse_number('-3.1%') == -3.1
+    assert parse_number('N/A') is None
+    parsed = parse_result(make_result(3))
+    assert parsed['statistics']['sharpe_ratio'] == -0.88
+    assert parsed['statistics']['estimated_strategy_capacity'] == 1e6
+    assert len(parsed['equity'][0]) == 20 and parsed['orders'][0][1] == 'TLT'
+    assert guess_run('/w/Strategy/backtests/2021-01-01/42.json') == ('Strategy', '2021-01-01/42')
+    #lean writes 7 digits of fraction, which datetime only parses from Python 3.11
+    assert results._timestamp('2021-01-01T00:00:00.1234567Z') == 1609459200
+    assert results._timestamp('2021-01-01T00:00:01.5') == 1609459201
+    assert results._timestamp('2021-01-01T00:00:00+01:00') == 1609455600
+
+
+def test_ingest_query_and_curve(tmp_path):
+    write_results(tmp_path / 'runs', 2, 10)
+    store = ResultStore(str(tmp_path / 'store'))
+    assert store.ingest([str(tmp_path / 'runs')]) == {'project-0': 10, 'project-1': 10}
+    assert store.ingest([str(tmp_path / 'runs')]) == {}
+    missing = []
+    assert store.ingest([str(tmp_path / 'missing')], missing=missing) == {}
+    assert missing == [str(tmp_path / 'missing')]
+
+    rows = store.query(where=['sharpe_ratio>=-0.85', 'total_trades!=0'], projects='project-1',
+                       sort='-sharpe_ratio', limit=3)
+    assert [row['run'] for row in rows] == ['2021-01-01_00-00-0009/9', '2021-01-01_00-00-0008/8',
+                                            '2021-01-01_00-00-0006/6']
+    assert rows[0]['project'] == 'project-1' and rows[0]['total_trades'] == 2.0
+    assert store.query(columns=['run', 'unknown'], limit=1)[0]['unknown'] is None
+    with pytest.raises(ResultsError):
+        ResultStore(str(tmp_path / 'empty')).query(where=['sharpe_ratio >> 1'])
+
+    summary = store.aggregate(['sharpe_ratio'], where=['drawdown<5'])
+    assert [row['runs'] for row in summary] == [5, 5]
+    assert summary[0]['sharpe_ratio']['max'] == pytest.approx(-0.84)
+
+    times, values = store.curve('project-0', '2021-01-01_00-00-0004/4')
+    assert len(times) == 20 and values[0] == 100004
+    with pytest.raises(ResultsError):
+        store.curve('project-0', 'missing')
+
+
+def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, 'MAX_SEGMENTS', 2)
+    store = ResultStore(str(tmp_path / 'store'))
+    for i in range(1, 4):
+        path = tmp_path / ('%d.json' % i)
+        path.write_text(json.dumps(make_result(i)))
+        store.ingest([str(path)], project='Strategy')
+    assert len(store.segments('Strategy')) == 1
+    assert [row['run'] for row in store.query(sort='created')] == ['1', '2', '3']
+    assert store.curve('Strategy', '3')[1][0] == 100003
+    segment = results.Segment(store.segments('Strategy')[0])
+    symbols = np.array(segment.meta['symbols'])[segment.array('order_symbol')]
+    assert list(symbols) == ['TLT', 'TLT', 'SPY', 'TLT', 'SPY', 'TLT']
+
+
+def test_ten_thousand_results(tmp_path):
+    write_results(tmp_path / 'runs', 10, 1000)
+    store = ResultStore(str(tmp_path / 'store'))
+    assert sum(store.ingest([str(tmp_path / 'runs')]).values()) == 10000
+
+    rows = store.query(where=['sharpe_ratio>2', 'drawdown<10'], sort='-net_profit', limit=None)
+    summary = store.aggregate(['sharpe_ratio', 'net_profit'], where=['total_trades>=3'])
+    expected = [i for i in range(1000) if (i % 100) / 25.0 - 1 > 2 and i % 30 < 10]
+    assert len(rows) == 10 * len(expected)
+    assert rows[0]['net_profit'] == max(i % 50 - 10 for i in expected)
+    assert [row['runs'] for row in summary] == [sum(1 for i in range(1000) if i % 7 >= 3)] * 10
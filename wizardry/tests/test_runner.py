@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from wizardry import runner, serve
+from wizardry.runner import Job, Output, capture_lean, run, run_all, run_lean
+
+FAKE_LEAN = '''#!/usr/bin/env python
+import os, sys, time
+args = sys.argv[1:]
+with open(os.environ['FAKE_LEAN_LOG'], 'a') as log:
+    log.write(' '.join(args) + '\\n')
+logged_in = os.path.join(os.path.dirname(os.environ['FAKE_LEAN_LOG']), 'logged-in')
+if args[0] == 'login':
+    open(logged_in, 'w').close()
+elif args[:2] == ['cloud', 'live']:
+    sys.stdout.write('Select a brokerage [1-3]: ')
+    sys.exit(0)
+elif args[0] == 'cloud' and not os.path.exists(logged_in):
+    print('Please log in using `lean login`', file=sys.stderr)
+    sys.exit(1)
+elif args[0] == 'sleep':
+    print('sleeping', flush=True)
+    started = time.time()
+    time.sleep(float(args[1]))
+    with open(os.environ['FAKE_LEAN_LOG'] + '.sleeps', 'a') as log:
+        log.write('%r %r\\n' % (started, time.time()))
+elif args[0] == 'long':
+    sys.stdout.write('x' * int(args[1]))
+    sys.exit(0)
+print('out ' + ' '.join(args))
+print('err', file=sys.stderr)
+sys.exit(int(args[-1]) if args[0] == 'backtest' and args[-1].isdigit() else 0)
+'''
+
+
+@pytest.fixture
+def fake_lean(tmp_path, monkeypatch):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    path = directory / 'lean'
+    path.write_text(FAKE_LEAN.replace('#!/usr/bin/env python', '#!' + sys.executable))
+    path.chmod(0o755)
+    monkeypatch.setenv('PATH', str(directory) + os.pathsep + os.environ['PATH'])
+    monkeypatch.setenv('FAKE_LEAN_LOG', str(directory / 'calls'))
+    monkeypatch.setattr(serve, 'ADDRESS_FILE', str(tmp_path / 'no-worker.json'))
+    calls = lambda: (directory / 'calls').read_text().splitlines()
+    #(start, end) of every finished sleep
+    calls.sleeps = lambda: [tuple(map(float, line.split())) for line in (directory / 'calls.sleeps').read_text().splitlines()]
+    return calls
+
+
+def test_streams_and_exit_codes(fake_lean, capsys):
+    result = run(['backtest', 'Project', '3'])
+    assert result.code == 3 and not result.auth_failed and not result.timed_out
+    assert sorted(result.output.splitlines()) == ['err', 'out backtest Project 3']
+    captured = capsys.readouterr()
+    assert captured.out == 'out backtest Project 3\n' and captured.err == 'err\n'
+    assert capture_lean(['backtest', 'Project']) == (0, result.output.replace(' 3', ''))
+    assert capsys.readouterr().out == ''
+    #lines longer than the read buffer come through whole
+    assert run(['long', str(3 * runner.LINE_LIMIT)], echo=False).output == 'x' * 3 * runner.LINE_LIMIT
+
+
+def test_prompts_reach_the_terminal(fake_lean, capfd):
+    #not piped, so a prompt without a newline shows before its answer is typed
+    result = run(['cloud', 'live', 'Project'])
+    assert result.code == 0 and result.output == ''
+    assert capfd.readouterr().out == 'Select a brokerage [1-3]: '
+
+
+def test_bounded_output():
+    output = Output(echo=False, limit=10)
+    for i in range(100):
+        output.write('line %d\n' % i)
+    output.close()
+    assert output.text() == '[%d characters of output dropped]\n' % (output.size - 10) + 'e 98\nline 99\n'[-10:]
+    assert not output.auth_failed
+    output.write('Error: not logged in')
+    output.close()
+    assert output.auth_failed
+
+
+def test_timeout_and_cancel(fake_lean):
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as error:
+        capture_lean(['sleep', '30'], timeout=0.5)
+    assert error.value.output == 'sleeping\n'
+    job = Job(['sleep', '30'], echo=False)
+    assert job.poll() is None
+    time.sleep(0.3)
+    job.cancel()
+    assert job.returncode == runner.CANCELLED
+    assert time.monotonic() - started < 10
+
+
+def test_run_all_is_concurrent(fake_lean, tmp_path):
+    results = run_all([(['sleep', '1'], str(tmp_path))] * 3 + [(['backtest', '2'], None)], concurrency=4)
+    assert [result.code for result in results] == [0, 0, 0, 2]
+    #every sleep started before any of them ended: they ran side by side
+    sleeps = fake_lean.sleeps()
+    assert len(sleeps) == 3
+    assert max(start for start, end in sleeps) < min(end for start, end in sleeps)
+
+
+def test_login_retry(fake_lean, capsys):
+    assert run(['cloud', 'push'], echo=False).auth_failed
+    assert run_lean(['cloud', 'push']) == 0
+    assert fake_lean() == ['cloud push', 'cloud push', 'login', 'cloud push']
+    assert "lean needs you to log in" in capsys.readouterr().out
+    assert run_lean(['backtest', '4']) == 4
+    assert fake_lean()[-1] == 'backtest 4'
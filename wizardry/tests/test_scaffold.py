@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from wizardry import scaffold
+from wizardry.manifest import push_projects
+from wizardry.scaffold import ScaffoldError, class_name, create_project, create_projects, read_names
+
+
+def test_create_project(tmp_path):
+    directory = create_project('Momentum/My RSI-2', str(tmp_path))
+    assert directory == str(tmp_path / 'Momentum' / 'My RSI-2')
+    files = sorted(os.path.relpath(os.path.join(root, name), directory)
+                   for root, _, names in os.walk(directory) for name in names)
+    assert files == ['.idea/My RSI-2.iml', '.idea/misc.xml', '.idea/modules.xml', '.idea/workspace.xml',
+                     '.vscode/launch.json', '.vscode/settings.json', 'config.json', 'main.py', 'research.ipynb']
+    for name in ('config.json', 'research.ipynb', '.vscode/launch.json'):
+        with open(os.path.join(directory, name)) as file:
+            json.load(file)
+    with open(os.path.join(directory, 'main.py')) as file:
+        source = file.read()
+    compile(source, 'main.py', 'exec')
+    assert 'class MyRSI2(QCAlgorithm):' in source
+    assert '.idea/My RSI-2.iml' in (tmp_path / 'Momentum' / 'My RSI-2' / '.idea' / 'modules.xml').read_text()
+    assert class_name('2nd try') == 'Algorithm2ndTry'
+
+    with pytest.raises(ScaffoldError):
+        create_project('Momentum/My RSI-2', str(tmp_path))
+    for name in ('', '../outside', 'a/./b', 'semi;colon'):
+        with pytest.raises(ScaffoldError):
+            create_project(name, str(tmp_path))
+    #nothing half written is left behind
+    assert sorted(os.listdir(tmp_path)) == ['Momentum']
+    assert os.listdir(tmp_path / 'Momentum') == ['My RSI-2']
+
+
+def test_create_projects(tmp_path, monkeypatch):
+    (tmp_path / 'names.txt').write_text('# variants\nA\n\nB  # the second\nA\nC\n')
+    names = read_names(str(tmp_path / 'names.txt'))
+    assert names == ['A', 'B', 'C']
+    create_project('C', str(tmp_path))
+    reads = []
+    monkeypatch.setattr(scaffold, 'open', lambda *args, **kwargs: reads.append(args[0]) or open(*args, **kwargs),
+                        raising=False)
+    scaffold.load_templates.cache_clear()
+    names += ['Variant %d' % i for i in range(200)]
+    results = create_projects(names, str(tmp_path))
+    assert [error for _, error in results].count(None) == len(names) - 1
+    assert results[2] == (None, "A project named 'C' already exists")
+    assert all(os.path.isfile(os.path.join(directory, 'main.py')) for directory, _ in results if directory)
+    #the templates are read once, not for every project
+    assert len([path for path in reads if path.endswith('.tmpl')]) == len(scaffold.FILES)
+
+
+def test_push_projects(tmp_path, stub_lean):
+    directories = [directory for directory, _ in create_projects(['A', 'B'], str(tmp_path))]
+    assert push_projects(directories) == [0, 0]
+    assert sorted(call['args'][-1] for call in stub_lean.calls) == ['A', 'B']
+    #unchanged projects aren't pushed again
+    (tmp_path / 'B' / 'main.py').write_text('class B: pass\n')
+    assert push_projects(directories) == [0, 0]
+    assert [call['args'] for call in stub_lean.calls[2:]] == [['cloud', 'push', '--project', 'B']]
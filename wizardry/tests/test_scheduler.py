@@ -0,0 +1,75 @@
+import csv
+import json
+
+from wizardry.scheduler import RateLimiter, backtest_projects, find_projects, parse_backtest, write_summary
+
+OUTPUT = '''Started backtest named 'Smooth Blue Owl' for project 'variants/variant-0001'
+┌────────────────────┬──────────┬──────────────────┬──────────┐
+│ Statistic          │ Value    │ Statistic        │ Value    │
+├────────────────────┼──────────┼──────────────────┼──────────┤
+│ Equity             │ $101,000 │ Net Profit       │ $1,000   │
+├────────────────────┼──────────┼──────────────────┼──────────┤
+│ Sharpe Ratio       │ 1.25     │ Drawdown         │ 3.1%     │
+│ Net Profit         │ 1.0%     │                  │          │
+└────────────────────┴──────────┴──────────────────┴──────────┘
+Backtest id: 1234abcd
+Backtest name: Smooth Blue Owl
+Backtest url: https://www.quantconnect.com/project/1/1234abcd
+'''
+
+
+def test_parse_backtest():
+    parsed = parse_backtest(OUTPUT)
+    assert parsed['statistics']['Sharpe Ratio'] == '1.25'
+    assert parsed['statistics']['Net Profit'] == '1.0%'
+    assert parsed['backtest_id'] == '1234abcd'
+    assert parsed['error'] is None
+    failed = parse_backtest('Backtest id: x\nAn error occurred during this backtest:\nNameError: symbols\n')
+    assert failed['error'] == 'NameError: symbols'
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(per_minute=6000)
+    limiter.wait()
+    limiter.wait()
+    assert limiter._next > 0
+
+
+def make_projects(tmp_path, count):
+    (tmp_path / 'lean.json').write_text('{}')
+    for i in range(count):
+        project = tmp_path / 'variants' / ('variant-%d' % i)
+        project.mkdir(parents=True)
+        (project / 'main.py').write_text('# %d\n' % i)
+    return find_projects([str(tmp_path / 'variants' / '*')])
+
+
+def test_backtest_projects_with_stub_lean(tmp_path, stub_lean, monkeypatch):
+    output = tmp_path / 'output.txt'
+    output.write_text(OUTPUT)
+    monkeypatch.setenv('STUB_LEAN_OUTPUT', str(output))
+    directories = make_projects(tmp_path, 6)
+    rows = backtest_projects(directories, concurrency=3, rate_limit=0, backoff=0)
+
+    assert [row['project'] for row in rows] == ['variants/variant-%d' % i for i in range(6)]
+    assert {row['status'] for row in rows} == {'ok'}
+    assert rows[0]['sharpe'] == '1.25' and rows[0]['drawdown'] == '3.1%'
+    commands = [call['args'] for call in stub_lean.calls]
+    assert commands.count(['cloud', 'backtest', 'variants/variant-0']) == 1
+    assert {call['cwd'] for call in stub_lean.calls} == {str(tmp_path)}
+
+    write_summary(rows, str(tmp_path / 'summary.csv'))
+    with open(str(tmp_path / 'summary.csv')) as file:
+        assert list(csv.DictReader(file))[5]['net_profit'] == '1.0%'
+
+
+def test_backtest_projects_retries_and_timeouts(tmp_path, stub_lean, monkeypatch):
+    directories = make_projects(tmp_path, 1)
+    monkeypatch.setenv('STUB_LEAN_EXIT', '1')
+    rows = backtest_projects(directories, rate_limit=0, retries=2, backoff=0)
+    assert rows[0]['status'] == 'failed' and rows[0]['attempts'] == 3
+
+    monkeypatch.setenv('STUB_LEAN_EXIT', '0')
+    monkeypatch.setenv('STUB_LEAN_SLEEP', '5')
+    rows = backtest_projects(directories, rate_limit=0, retries=0, timeout=0.5)
+    assert rows[0]['status'] == 'timeout'
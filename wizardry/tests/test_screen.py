@@ -0,0 +1,98 @@
+import math
+import zipfile
+
+import numpy as np
+import pytest
+
+from wizardry.screen import (Bars, ScreenError, ema, load_bars, macd_positions, parse_values, returns_positions,
+                             rsi, screen, sma, variants)
+
+
+def prices(symbols=5, days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, (symbols, days)), axis=1))
+
+
+#scalar references, one bar at a time
+
+def ema_reference(values, alpha):
+    result = []
+    for x in values:
+        result.append(x if not result else (1 - alpha) * result[-1] + alpha * x)
+    return result
+
+
+def sma_reference(values, period):
+    return [sum(values[t - period + 1:t + 1]) / period if t >= period - 1 else math.nan
+            for t in range(len(values))]
+
+
+def rsi_reference(values, period):
+    gains, losses = [0.0], [0.0]
+    for previous, current in zip(values, values[1:]):
+        gains.append(max(current - previous, 0))
+        losses.append(max(previous - current, 0))
+    result = []
+    for gain, loss in zip(ema_reference(gains, 1.0 / period), ema_reference(losses, 1.0 / period)):
+        result.append(50 if gain == loss == 0 else 100 if loss == 0 else 100 - 100 / (1 + gain / loss))
+    return result
+
+
+def macd_reference(values, fast, slow, signal):
+    macd = [f - s for f, s in zip(sma_reference(values, fast), sma_reference(values, slow))]
+    warm = max(fast, slow) - 1
+    line = [math.nan] * warm + sma_reference(macd[warm:], signal)
+    return [1 if line[t] / values[t] > 0.01 else -1 if line[t] / values[t] < -0.01 else 0
+            for t in range(len(values))]
+
+
+def test_indicators_match_scalar_reference():
+    close = prices()
+    for alpha in (2.0 / 13, 2.0 / 201, 1.0 / 60):
+        for row in close:
+            assert np.allclose(ema(row[None], alpha)[0], ema_reference(list(row), alpha), rtol=1e-10)
+    for row in close:
+        assert np.allclose(sma(row[None], 26)[0], sma_reference(list(row), 26), rtol=1e-10, equal_nan=True)
+        assert np.allclose(rsi(row[None], 14)[0], rsi_reference(list(row), 14), rtol=1e-9)
+        assert macd_positions(row[None], 12, 26, 9)[0].tolist() == macd_reference(list(row), 12, 26, 9)
+        expected = [0] * 14 + [math.copysign(1, row[t] / row[t - 14] - 1) for t in range(14, len(row))]
+        assert returns_positions(row[None], 14)[0].tolist() == expected
+    #the whole matrix at once is the rows one by one
+    assert np.allclose(ema(close, 0.1), np.array([ema_reference(list(row), 0.1) for row in close]))
+
+
+def test_screen_ranks_variants():
+    close = prices(symbols=20)
+    #a steady uptrend: the EMA cross stays long and wins
+    close[:10] = 100 * np.exp(np.cumsum(np.full((10, 400), 0.002) + np.random.default_rng(1).normal(0, 0.005, (10, 400)), axis=1))
+    bars = Bars(['S%d' % i for i in range(20)], np.arange(400), close, np.ones(close.shape, bool))
+    candidates = list(variants(['EMA Cross', 'RSI'], {'rsi_period': [14, 30]}))
+    assert len(candidates) == 1 + 2 + 2
+    rows = screen(bars, candidates)
+    assert rows[0]['alpha'] == 'EMA Cross' and rows[0]['parameters'] == 'ema_fast=50 ema_slow=200'
+    assert rows[0]['sharpe'] > rows[-1]['sharpe']
+    with pytest.raises(ScreenError):
+        list(variants(['Dual Thrust']))
+    with pytest.raises(ScreenError):
+        list(variants(['RSI'], {'ema_fast': [10]}))
+    assert parse_values('rsi_period=14,30') == ('rsi_period', [14, 30])
+
+
+def test_load_bars(tmp_path):
+    (tmp_path / 'symbols').mkdir()
+    (tmp_path / 'symbols' / 'AAA.csv').write_text('Date,Open,High,Low,Close,Volume\n'
+                                                   '2020-01-02,1,1,1,10,5\n2020-01-06,1,1,1,11,5\n')
+    with zipfile.ZipFile(str(tmp_path / 'symbols' / 'bbb.zip'), 'w') as archive:
+        archive.writestr('bbb.csv', '20200102 00:00,1,1,1,200000,5\n20200103 00:00,1,1,1,210000,5\n')
+    bars = load_bars(str(tmp_path / 'symbols'))
+    assert bars.symbols == ['AAA', 'BBB']
+    assert bars.dates.tolist() == [20200102, 20200103, 20200106]
+    assert bars.close.tolist() == [[10, 10, 11], [20, 21, 21]]
+    assert bars.valid.tolist() == [[True, False, True], [True, True, False]]
+
+    (tmp_path / 'long.csv').write_text('symbol,date,close\nBBB,20200103,21\nAAA,20200102,10\nBBB,20200102,20\n')
+    bars = load_bars(str(tmp_path / 'long.csv'))
+    assert bars.symbols == ['AAA', 'BBB'] and bars.close.tolist() == [[10, 10], [20, 21]]
+    with pytest.raises(ScreenError):
+        load_bars(str(tmp_path / 'missing'))
+
@@ -0,0 +1,71 @@
+import filecmp
+import os
+
+from wizardry.cache import StrategyCache
+from wizardry.library import BASE_URL as LIBRARY_URL
+from wizardry.library import STRATEGIES, strategy_url
+from wizardry.search import PREBUILT, SearchIndex, asset_classes, build_prebuilt, tags, tokenize
+
+BASE_URL = 'http://127.0.0.1/'
+
+
+def make_index(tmp_path):
+    cache = StrategyCache(str(tmp_path))
+    cache.put(strategy_url('Pairs Trading with Stocks', BASE_URL),
+              b'class Pairs(QCAlgorithm):\n    def CointegrationTest(self):\n        self.AddEquity("XOM")\n')
+    cache.put(strategy_url('Forex Momentum', BASE_URL), b'self.AddForex("EURUSD")\n')
+    return SearchIndex(cache=cache, base_url=BASE_URL)
+
+
+def test_tokenize():
+    assert tokenize('CointegrationTest of the Pairs') == ['cointegration', 'test', 'pair']
+    assert asset_classes('Momentum Effect in Commodities Futures') == ['futures']
+    assert tags('Pairs Trading Copula Method') == ['mean reversion', 'pairs trading']
+
+
+def test_search_ranks_names_and_source(tmp_path):
+    index = make_index(tmp_path)
+    assert index.update() == len(STRATEGIES)
+
+    results = index.search('pairs cointegration', limit=3)
+    assert results[0]['name'] == 'Pairs Trading Cointegration Method'
+    source_match = [result for result in results if result['name'] == 'Pairs Trading with Stocks']
+    assert source_match[0]['cached'] and source_match[0]['assets'] == ['equity']
+
+    assert index.search('eurusd')[0]['name'] == 'Forex Momentum'
+    assert index.search('nothing matches this') == []
+
+
+def test_update_is_incremental_and_persisted(tmp_path):
+    index = make_index(tmp_path)
+    index.update()
+    assert index.update() == 0
+
+    index.cache.put(strategy_url('Gold Market Timing', BASE_URL), b'self.AddFuture("GC")\n')
+    reloaded = SearchIndex(cache=index.cache, base_url=BASE_URL)
+    assert reloaded.update() == 1
+    assert reloaded.search('gc')[0]['name'] == 'Gold Market Timing'
+
+
+
+def test_search_tags(tmp_path):
+    index = make_index(tmp_path)
+    index.update()
+    assert {result['name'] for result in index.search('seasonality', limit=100)} >= {
+        'January Effect in Stocks', 'Turn of the Month in Equity Indexes', 'Lunar Cycle in Equity Market'}
+    assert index.search('pairs cointegration')[0]['tags'] == ['mean reversion', 'pairs trading']
+
+
+def test_prebuilt_index(tmp_path):
+    #the shipped index is the one the catalog builds
+    build_prebuilt(str(tmp_path / 'search.json'))
+    assert filecmp.cmp(str(tmp_path / 'search.json'), PREBUILT, shallow=False)
+
+    cache = StrategyCache(str(tmp_path / 'cache'))
+    index = SearchIndex(cache=cache, base_url=LIBRARY_URL)
+    assert index.update() == 0
+    assert not os.path.exists(index.path)
+    assert index.search('pairs cointegration')[0]['name'] == 'Pairs Trading Cointegration Method'
+    #only the cached strategies are indexed again
+    cache.put(strategy_url('Forex Momentum', LIBRARY_URL), b'self.AddForex("EURUSD")\n')
+    assert SearchIndex(cache=cache, base_url=LIBRARY_URL).update() == 1
@@ -0,0 +1,95 @@
+import io
+import os
+import threading
+
+import pytest
+
+from wizardry import serve
+from wizardry.runner import run_lean
+
+
+def fake_lean(args, cwd, out):
+    out.write('lean %s in %s\n' % (' '.join(args), cwd))
+    return 3 if args[0] == 'fail' else 0
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    if not hasattr(serve.socket, 'AF_UNIX'):
+        pytest.skip('needs Unix sockets')
+    monkeypatch.setattr(serve, 'ADDRESS_FILE', str(tmp_path / 'serve.json'))
+    server = serve.make_server(str(tmp_path / 'lean.sock'), executor=fake_lean)
+    serve.publish(server)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_jobs_share_one_connection(worker, tmp_path):
+    out = io.StringIO()
+    with serve.connect() as sock:
+        assert serve.submit(sock, ['cloud', 'push'], str(tmp_path), out) == 0
+        assert serve.submit(sock, ['fail'], str(tmp_path), out) == 3
+    assert out.getvalue() == 'lean cloud push in %s\nlean fail in %s\n' % (tmp_path, tmp_path)
+
+
+def test_connections_need_the_token(worker, tmp_path):
+    assert serve.is_interactive(['cloud', 'live', 'Project']) and serve.is_interactive(['login'])
+    assert not serve.is_interactive(['cloud', 'push'])
+    with serve.connect() as sock:
+        assert serve.submit(sock, ['cloud', 'push'], str(tmp_path), io.StringIO()) == 0
+    stranger = serve.socket.socket(serve.socket.AF_UNIX, serve.socket.SOCK_STREAM)
+    with stranger:
+        stranger.connect(worker.server_address)
+        stranger.sendall(b'{"token": "guess"}\n')
+        with pytest.raises(ConnectionError):
+            serve.submit(stranger, ['cloud', 'push'], str(tmp_path), io.StringIO())
+
+
+def test_clients_dont_wait_for_each_other(worker, tmp_path, stub_lean):
+    #an idle client doesn't hold up the others
+    idle = serve.connect()
+    with idle, serve.connect() as sock:
+        sock.settimeout(10)
+        assert serve.submit(sock, ['cloud', 'push'], str(tmp_path), io.StringIO()) == 0
+
+    #a job arriving while another runs is turned down, lean runs it instead
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_lean(args, cwd, out):
+        started.set()
+        finish.wait(10)
+        return fake_lean(args, cwd, out)
+
+    worker.executor = slow_lean
+    codes = []
+    with serve.connect() as sock:
+        thread = threading.Thread(target=lambda: codes.append(serve.submit(sock, ['backtest'], str(tmp_path), io.StringIO())))
+        thread.start()
+        assert started.wait(10)
+        with serve.connect() as other:
+            assert serve.submit(other, ['cloud', 'push'], str(tmp_path), io.StringIO()) is None
+        assert run_lean(['cloud', 'push'], cwd=str(tmp_path)) == 0
+        assert stub_lean.calls == [{'args': ['cloud', 'push'], 'cwd': str(tmp_path)}]
+        finish.set()
+        thread.join(10)
+    assert codes == [0]
+
+
+def test_run_lean_prefers_the_worker(worker, stub_lean, capsys):
+    assert run_lean(['cloud', 'backtest', 'Project']) == 0
+    assert 'lean cloud backtest Project in %s' % os.getcwd() in capsys.readouterr().out
+    assert stub_lean.calls == []
+
+    assert run_lean(['login']) == 0
+    assert run_lean(['cloud', 'live', 'Project']) == 0
+    assert [call['args'] for call in stub_lean.calls] == [['login'], ['cloud', 'live', 'Project']]
+
+
+def test_run_lean_without_worker(stub_lean, tmp_path, monkeypatch):
+    monkeypatch.setattr(serve, 'ADDRESS_FILE', str(tmp_path / 'missing.json'))
+    monkeypatch.setenv('STUB_LEAN_EXIT', '2')
+    assert run_lean(['cloud', 'push', '--project', 'My Project'], cwd=str(tmp_path)) == 2
+    assert stub_lean.calls == [{'args': ['cloud', 'push', '--project', 'My Project'], 'cwd': str(tmp_path)}]
@@ -0,0 +1,149 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from wizardry.screen import Bars
+from wizardry.simulate import (Book, Covariance, Problem, SimulationError, ledoit_wolf, minimize, project,
+                               sample_universes, simulate)
+
+
+def make_bars(symbols=6, days=300, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, (1, days))
+    returns = rng.normal(0.0003, 0.015, (symbols, days)) + rng.uniform(0.5, 1.5, (symbols, 1)) * market
+    close = 100 * np.exp(np.cumsum(returns, axis=1))
+    return Bars(['S%d' % i for i in range(symbols)], np.arange(days), close, np.ones(close.shape, bool))
+
+
+def dense(covariance):
+    symbols = len(covariance.variance)
+    return covariance.factor.T @ covariance.factor + covariance.shrinkage * np.diag(covariance.variance) * np.eye(symbols)
+
+
+def best_on_simplex(quadratic, linear):
+    """The minimum of w' Q w / 2 - l' w over the simplex, trying every support."""
+    best, value = None, np.inf
+    size = len(linear)
+    for count in range(1, size + 1):
+        for support in itertools.combinations(range(size), count):
+            support = list(support)
+            #stationary point with sum(w) = 1: Q w - l = lambda
+            system = np.zeros((count + 1, count + 1))
+            system[:count, :count] = quadratic[np.ix_(support, support)]
+            system[:count, count] = -1
+            system[count, :count] = 1
+            solution = np.linalg.solve(system, np.append(linear[support], 1))
+            if (solution[:count] < -1e-12).any():
+                continue
+            weights = np.zeros(size)
+            weights[support] = solution[:count]
+            objective = weights @ quadratic @ weights / 2 - linear @ weights
+            if objective < value:
+                best, value = weights, objective
+    return best
+
+
+def test_project():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 8))
+    allowed = rng.random((50, 8)) < 0.7
+    allowed[0] = False
+    projected = project(values, allowed)
+    assert not projected[0].any()
+    assert np.allclose(projected[1:].sum(axis=1), 1) and (projected >= 0).all() and not projected[~allowed].any()
+    #no allowed point of the simplex is closer
+    for row in range(1, 50):
+        for other in rng.dirichlet(np.ones(allowed[row].sum()), 20):
+            point = np.zeros(8)
+            point[allowed[row]] = other
+            assert np.linalg.norm(values[row] - projected[row]) <= np.linalg.norm(values[row] - point) + 1e-12
+
+
+def test_optimizations_match_exhaustive_search():
+    bars = make_bars()
+    covariance = Covariance(bars.returns[:, :63], bars.returns[:, :63].var(axis=1, ddof=1))
+    direction = np.array([1.0, -1, 1, 1, -1, 0])
+    allowed = np.ones((2, 6), bool)
+    allowed[1, :2] = False
+    expected = np.random.default_rng(1).normal(0, 0.001, 6)
+    problem = Problem(covariance, allowed & (direction != 0), direction, expected, 2.5)
+    share, iterations = minimize(problem.gradient, problem.valid, problem.valid / problem.valid.sum(axis=1, keepdims=True),
+                                 problem.lipschitz(), tolerance=1e-9)
+    weights = direction * problem.scatter(share, 6)
+    signed = dense(covariance) * np.outer(direction, direction)
+    for row, members in enumerate(allowed & (direction != 0)):
+        reference = np.zeros(6)
+        reference[members] = best_on_simplex(2.5 * signed[np.ix_(members, members)], (direction * expected)[members])
+        assert np.allclose(np.abs(weights[row]), reference, atol=1e-5)
+
+
+def test_posterior_and_shrinkage_match_dense_formulas():
+    bars = make_bars(symbols=8)
+    window = bars.returns[:, 10:40]
+    covariance = Covariance(window, window.var(axis=1, ddof=1))
+    sigma = dense(covariance)
+    prior = sigma @ np.full(8, 2.5 / 8)
+    views = np.array([True, False, True, True, False, False, True, False])
+    picked = np.eye(8)[views]
+    expected = np.array([0.001, -0.002, 0.0005, 0.003])
+    omega = np.diag(np.diag(picked @ sigma @ picked.T))
+    reference = prior + sigma @ picked.T @ np.linalg.solve(picked @ sigma @ picked.T + omega, expected - picked @ prior)
+    assert np.allclose(covariance.posterior(prior, views, expected), reference)
+
+    demeaned = window - window.mean(axis=1, keepdims=True)
+    sample = demeaned @ demeaned.T / 30
+    off = 1 - np.eye(8)
+    noise = sum((((np.outer(day, day) - sample) * off) ** 2).sum() for day in demeaned.T) / 30 ** 2
+    spread = ((sample * off) ** 2).sum()
+    assert ledoit_wolf(demeaned) == pytest.approx(min(noise, spread) / spread)
+
+
+def test_risk_models_liquidate():
+    #long two symbols: the first loses 3% and recovers, the second gains 15%
+    path = np.array([[100, 97, 100, 101], [100, 105, 115, 110]], float)
+    stops = {}
+    for risk, limit in (('None', None), ('Maximum Drawdown', 0.02), ('Trailing Stop Risk Management Model', 0.05),
+                        ('Maximum Unrealized Profit Percent Per Security', 0.1)):
+        book = Book(risk, (1, 2), limit)
+        book.rebalance(np.array([[0.5, 0.5]]), path[:, 0])
+        book.hold(path)
+        stops[risk] = book.stops[0], np.cumprod(1 + book.returns[0][0])[-1]
+    assert stops['None'] == (0, pytest.approx(1 + 0.5 * 0.01 + 0.5 * 0.1))
+    #out of the first symbol at 97
+    assert stops['Maximum Drawdown'] == (1, pytest.approx(1 - 0.5 * 0.03 + 0.5 * 0.1))
+    #out of the second one at 110, 4% under 115 isn't enough
+    assert stops['Trailing Stop Risk Management Model'] == (0, pytest.approx(1.055))
+    #the second one is sold at 115
+    assert stops['Maximum Unrealized Profit Percent Per Security'] == (1, pytest.approx(1 + 0.5 * 0.01 + 0.5 * 0.15))
+
+
+def test_simulate():
+    bars = make_bars(symbols=40, days=200)
+    members = sample_universes(40, 5, 10, seed=1)
+    assert (members.sum(axis=1) == 10).all()
+    weights = {}
+    rows = simulate(bars, members=members, alphas=('Historical Returns',), rebalance=10, weights=weights)
+    assert len(rows) == 16
+    assert weights['Mean-Variance'].shape == (14, 5, 40)
+    for paths in weights.values():
+        assert not paths[:, ~members].any()
+        gross = np.abs(paths).sum(axis=2)
+        assert ((gross < 1 + 1e-6)).all()
+    #the optimized portfolios are fully invested
+    assert np.allclose(np.abs(weights['Black Litterman']).sum(axis=2), 1, atol=1e-6)
+    with pytest.raises(SimulationError):
+        simulate(bars, portfolios=('Risk Parity',))
+    with pytest.raises(SimulationError):
+        simulate(bars, risks=('Sector Exposure',))
+
+    #warm starts save iterations when the rebalances are close
+    warm, cold = (simulate(bars, ('Mean-Variance',), ('None',), rebalance=1, warm=warm)[0]['iterations']
+                  for warm in (True, False))
+    assert warm < cold
+
+
+def test_simulate_thousands_of_symbols():
+    bars = make_bars(symbols=3000, days=150)
+    rows = simulate(bars, ('Equal Weighting', 'Mean-Variance'), ('None', 'Trailing Stop Risk Management Model'))
+    assert len(rows) == 4 and all(np.isfinite(row['sharpe']) for row in rows)
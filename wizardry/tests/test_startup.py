@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('typer')
+
+# Cumulative microseconds ``import wizardry.cli`` may take on a cold start.
+STARTUP_BUDGET_US = int(os.environ.get('WIZARDRY_STARTUP_BUDGET_US', 500000))
+
+HEAVY_MODULES = ('PyInquirer', 'pyfiglet', 'requests', 'colorama', 'termcolor', 'pkg_resources')
+
+
+def importtime(module):
+    """Run ``python -X importtime -c 'import module'`` and parse its report."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def test_cli_skips_heavy_imports():
+    timings = importtime('wizardry.cli')
+    assert not [name for name in timings if name.split('.')[0] in HEAVY_MODULES]
+
+
+def test_cli_startup_budget():
+    timings = importtime('wizardry.cli')
+    assert timings['wizardry.cli'] < STARTUP_BUDGET_US
@@ -0,0 +1,97 @@
+import os
+import shutil
+
+from wizardry.manifest import dedupe_projects, push_project
+from wizardry.scaffold import create_projects
+from wizardry.store import ContentStore, file_sha256, line_delta
+
+
+def test_line_delta():
+    assert line_delta(b'a\nb\nc\n', b'a\nB\nc\nd\n') == (2, 1, 6)
+    assert line_delta(b'', b'x\n') == (1, 0, 2)
+
+
+def test_push_against_the_store(tmp_path, stub_lean):
+    (directory, _), = create_projects(['Variant'], str(tmp_path))
+    logs = []
+    assert push_project(directory, log=logs.append) == 0
+    main = os.path.join(directory, 'main.py')
+    with open(main) as file:
+        source = file.read()
+    with open(main, 'w') as file:
+        file.write(source.replace('2013, 10, 11', '2014, 10, 11'))
+    assert push_project(directory, log=logs.append) == 0
+    assert logs == ["Changed since the last push: main.py +1 -1"]
+    assert len(stub_lean.calls) == 2
+
+    #a copy of the project without its push manifest knows what its remote project holds
+    shutil.rmtree(os.path.join(directory, '.wizardry'))
+    assert push_project(directory, log=logs.append) == 0
+    assert len(stub_lean.calls) == 2 and logs[-1] == "No changes since the last push, skipping it."
+    assert ContentStore().pushed(str(tmp_path), 'Variant')['main.py'] is not None
+
+
+def fake_reflink(source, target):
+    #a plain copy, as a clone looks to whoever reads or writes it
+    tmp = target + '.clone'
+    shutil.copyfile(source, tmp)
+    shutil.copymode(target, tmp)
+    os.replace(tmp, target)
+    return True
+
+
+def test_dedupe(tmp_path, monkeypatch):
+    monkeypatch.setattr('wizardry.store.reflink', fake_reflink)
+    store = ContentStore(str(tmp_path / 'store'))
+    directories = [directory for directory, _ in create_projects(['A', 'B', 'C'], str(tmp_path / 'workspace'))]
+    size = os.path.getsize(os.path.join(directories[0], 'research.ipynb'))
+    linked, saved = dedupe_projects(directories, store)
+    #misc.xml, the .iml, launch.json, settings.json and research.ipynb are cloned
+    assert linked == 2 * 5 and saved >= 2 * size
+    assert dedupe_projects(directories, store) == (0, 0)
+
+    #every file stays writable and each project's own
+    for directory in directories:
+        for name in ('research.ipynb', '.vscode/settings.json', 'main.py', 'config.json', '.idea/modules.xml'):
+            info = os.stat(os.path.join(directory, name))
+            assert info.st_nlink == 1 and info.st_mode & 0o777 == 0o644
+    assert store.prune() == 0
+
+
+def test_edit_a_deduped_file(tmp_path, monkeypatch):
+    monkeypatch.setattr('wizardry.store.reflink', fake_reflink)
+    store = ContentStore(str(tmp_path / 'store'))
+    directories = [directory for directory, _ in create_projects(['A', 'B'], str(tmp_path / 'workspace'))]
+    dedupe_projects(directories, store)
+    settings = [os.path.join(directory, '.vscode', 'settings.json') for directory in directories]
+    with open(settings[0]) as file:
+        original = file.read()
+    #in place, as editors save
+    with open(settings[0], 'w') as file:
+        file.write('{}')
+    with open(settings[1]) as file:
+        assert file.read() == original
+    assert dedupe_projects(directories, store) == (0, 0)
+
+
+def test_dedupe_unshares_old_hardlinks(tmp_path, monkeypatch):
+    #an older wizardry hardlinked the copies to a read-only blob, on a filesystem which can't clone
+    monkeypatch.setattr('wizardry.store.reflink', lambda source, target: False)
+    store = ContentStore(str(tmp_path / 'store'))
+    directories = [directory for directory, _ in create_projects(['A', 'B'], str(tmp_path / 'workspace'))]
+    notebooks = [os.path.join(directory, 'research.ipynb') for directory in directories]
+    sha256 = file_sha256(notebooks[0])
+    store.add(notebooks[0], sha256)
+    for notebook in notebooks:
+        os.unlink(notebook)
+        os.link(store.blob_path(sha256), notebook)
+
+    assert dedupe_projects(directories, store) == (0, 0)
+    for notebook in notebooks:
+        info = os.stat(notebook)
+        assert info.st_nlink == 1 and info.st_mode & 0o777 == 0o644
+    with open(notebooks[0], 'a') as file:
+        file.write('\n')
+    with open(notebooks[1], 'rb') as file:
+        assert store.read(sha256) == file.read()
+    assert store.prune() == 1
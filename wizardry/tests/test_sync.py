@@ -0,0 +1,90 @@
+import hashlib
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+
+from wizardry import library
+from wizardry.cache import StrategyCache
+from wizardry.library import MANIFEST, STRATEGIES, strategy_url, sync
+
+NAMES = STRATEGIES[:40]
+
+
+def serve_catalog(server):
+    for name in NAMES:
+        server.files[strategy_url(name, '')] = ('# %s\n' % name).encode('utf-8')
+
+
+def test_sync_downloads_then_revalidates(strategy_server, tmp_path):
+    serve_catalog(strategy_server)
+    strategy_server.failures[strategy_url(NAMES[0], '')] = 2
+    cache = StrategyCache(str(tmp_path))
+    done = []
+
+    summary = sync(NAMES, cache=cache, base_url=strategy_server.url, backoff=0.01,
+                   progress=lambda: done.append(1))
+    assert summary == {'downloaded': 40, 'unchanged': 0, 'failed': []}
+    assert len(done) == 40
+    assert cache.read(strategy_url(NAMES[0], strategy_server.url)) == ('# %s\n' % NAMES[0]).encode()
+
+    summary = sync(NAMES, cache=cache, base_url=strategy_server.url)
+    assert summary == {'downloaded': 0, 'unchanged': 40, 'failed': []}
+
+
+def test_sync_skips_files_matching_the_manifest(strategy_server, tmp_path):
+    serve_catalog(strategy_server)
+    files = {path: {'sha256': hashlib.sha256(body).hexdigest()} for path, body in strategy_server.files.items()}
+    cache = StrategyCache(str(tmp_path))
+    sync(NAMES, cache=cache, base_url=strategy_server.url)
+
+    strategy_server.files[MANIFEST] = json.dumps({'files': files}).encode('utf-8')
+    strategy_server.requests[:] = []
+    summary = sync(NAMES, cache=cache, base_url=strategy_server.url)
+    assert summary == {'downloaded': 0, 'unchanged': 40, 'failed': []}
+    assert [path for path, headers in strategy_server.requests] == ['/' + MANIFEST]
+
+    #a body which doesn't match the manifest is rejected
+    strategy_server.files[strategy_url(NAMES[0], '')] = b'tampered'
+    files[strategy_url(NAMES[0], '')]['sha256'] = hashlib.sha256(b'expected').hexdigest()
+    strategy_server.files[MANIFEST] = json.dumps({'files': files}).encode('utf-8')
+    summary = sync(NAMES, cache=cache, base_url=strategy_server.url)
+    assert [name for name, error in summary['failed']] == [NAMES[0]]
+    assert 'checksum' in summary['failed'][0][1]
+
+
+def test_sync_reports_failures(strategy_server, tmp_path):
+    serve_catalog(strategy_server)
+    summary = sync(NAMES + ('Missing',), cache=StrategyCache(str(tmp_path)),
+                   base_url=strategy_server.url, backoff=0.01)
+    assert [name for name, error in summary['failed']] == ['Missing']
+
+
+def test_sync_closes_its_session_on_errors(strategy_server, tmp_path, monkeypatch):
+    serve_catalog(strategy_server)
+    sessions = []
+    original = library.make_session
+
+    def make_session(workers):
+        session = original(workers)
+        sessions.append(session)
+        session.close = lambda close=session.close: (sessions.remove(session), close())
+        return session
+
+    def interrupt():
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(library, 'make_session', make_session)
+    with pytest.raises(KeyboardInterrupt):
+        sync(NAMES, cache=StrategyCache(str(tmp_path)), base_url=strategy_server.url, progress=interrupt)
+    assert sessions == []
+
+
+def test_sync_is_concurrent_over_pooled_connections(strategy_server, tmp_path):
+    serve_catalog(strategy_server)
+    strategy_server.delay = 0.05
+    sync(NAMES, cache=StrategyCache(str(tmp_path / 'pool')), workers=8, base_url=strategy_server.url)
+    #several downloads were in flight at once, over kept-alive connections
+    assert strategy_server.peak > 1
+    assert len(strategy_server.ports) * 2 < len(strategy_server.requests)
@@ -0,0 +1,62 @@
+import json
+
+from wizardry import trace
+from wizardry.manifest import push_project
+from wizardry.runner import capture_lean
+from wizardry.trace import Tracer, lean_phase, load_history, percentile, summarize
+
+
+def test_spans_and_export(tmp_path):
+    tracer = Tracer()
+    with tracer.span('push') as attributes:
+        attributes['exit_code'] = 0
+    tracer.add('lean cloud backtest', 1.0, 3.5, bytes=10)
+    tracer.export(str(tmp_path / 'out.json'))
+    events = json.loads((tmp_path / 'out.json').read_text())['traceEvents']
+    assert [(event['name'], event['ph'], event['args']) for event in events] == [
+        ('push', 'X', {'exit_code': 0}), ('lean cloud backtest', 'X', {'bytes': 10})]
+    assert events[1]['dur'] == 2500000
+    tracer.export(str(tmp_path / 'out.jsonl'))
+    spans = [json.loads(line) for line in (tmp_path / 'out.jsonl').read_text().splitlines()]
+    assert [span['name'] for span in spans] == ['push', 'lean cloud backtest']
+    assert spans[1]['duration'] == 2.5
+
+
+def test_history_and_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace, 'MAX_RUNS', 3)
+    monkeypatch.setattr(trace, 'HISTORY_SIZE', 1000)
+    path = str(tmp_path / 'history.jsonl')
+    for i in range(1, 101):
+        tracer = Tracer()
+        tracer.add('push', 0, i / 100.0)
+        tracer.add('lean cloud backtest', 0, 10)
+        tracer.record('backtest' if i % 2 else 'live', path=path)
+    runs = load_history(path)
+    assert len(runs) < 100
+    assert [run['spans'][0]['duration'] for run in runs[-3:]] == [0.98, 0.99, 1.0]
+    assert [run['command'] for run in load_history(path, command='live', runs=2)] == ['live', 'live']
+    rows = summarize([{'spans': [{'name': 'push', 'duration': i / 100.0}]} for i in range(1, 101)]
+                     + [{'spans': [{'name': 'lean login', 'duration': 60}]}])
+    assert rows[0]['phase'] == 'lean login'
+    assert (rows[1]['count'], rows[1]['p50'], rows[1]['p95']) == (100, 0.5, 0.95)
+    assert percentile([3, 1, 2], 50) == 2
+    assert lean_phase(['cloud', 'push', '--project', 'P']) == 'lean cloud push'
+    assert lean_phase(['login']) == 'lean login'
+
+
+def test_lean_and_push_spans(tmp_path, stub_lean, monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(trace.TRACER, 'spans', tracer.spans)
+    project = tmp_path / 'workspace' / 'Traced'
+    project.mkdir(parents=True)
+    (project / 'main.py').write_text('class A: pass\n')
+    push_project(str(project))
+    push_project(str(project), log=lambda message: None)
+    code, output = capture_lean(['cloud', 'backtest', 'Traced'])
+    spans = [(span['name'], span['attributes']) for span in tracer.spans]
+    assert spans == [
+        ('lean cloud push', {'exit_code': 0, 'bytes': len('stub lean cloud push --project Traced\n')}),
+        ('push', {'files': 1, 'bytes': 14, 'exit_code': 0}),
+        ('push', {'skipped': True}),
+        ('lean cloud backtest', {'exit_code': 0, 'bytes': len(output)}),
+    ]
@@ -0,0 +1,96 @@
+import itertools
+
+from wizardry.codegen import CHOICES, generate
+from wizardry.validate import check_project, check_source, format_problem
+
+ANSWERS = {
+    'alpha': ['RSI', 'EMA Cross'],
+    'universe': 'Large Cap Equities',
+    'portfolio': 'Equal Weighting',
+    'execution': 'Immediate',
+    'risk': 'Maximum Drawdown',
+    'start': '2017, 1, 1',
+    'cash': '100000',
+}
+
+
+def messages(source):
+    return [problem.message for problem in check_source(source)]
+
+
+def test_generated_algorithms_pass():
+    assert check_source(generate(ANSWERS)) == []
+    assert check_source(generate(ANSWERS, parameterized=True)) == []
+
+
+def test_every_component_passes():
+    for alpha, universe in itertools.product(CHOICES['alpha'], CHOICES['universe']):
+        answers = dict(ANSWERS, alpha=[alpha], universe=universe)
+        assert check_source(generate(answers)) == [], (alpha, universe)
+        assert check_source(generate(answers, parameterized=True)) == [], (alpha, universe)
+    for field in ('portfolio', 'execution', 'risk'):
+        for name in CHOICES[field]:
+            assert check_source(generate(dict(ANSWERS, **{field: name}))) == [], name
+    assert check_source(generate(dict(ANSWERS, alpha=list(CHOICES['alpha'])))) == []
+
+
+def test_broken_components():
+    #the selection function of the universe was deleted
+    source = generate(dict(ANSWERS, universe='Coarse Universe'))
+    source = source.replace('def CoarseSelectionFunction', 'def SelectCoarse')
+    [problem] = check_source(source)
+    assert problem.message == "'self.CoarseSelectionFunction' is not a member of QCAlgorithm nor set by DancingBlueOwl"
+    assert not problem.warning
+    source = generate(dict(ANSWERS, alpha=['Dual Thrust'])).replace('        self.k2 = 0.63\n', '')
+    assert [(problem.message, problem.warning) for problem in check_source(source)] == [
+        ("'self.k2' is not a member of QCAlgorithm nor set by DancingBlueOwl", False)]
+    #the alpha reads symbols before the universe assigns them
+    source = generate(dict(ANSWERS, alpha=['RSI'], universe='Manual Selection'))
+    source = source.replace('RsiAlphaModel(60, Resolution.Minute)', 'RsiAlphaModel(len(symbols))')
+    assert "'symbols' is used before it is assigned" in messages(source)
+
+
+def test_scopes_and_members():
+    source = '\n'.join([
+        'from QuantConnect.Algorithm import *',
+        'LIMIT = 3',
+        'class Algo(QCAlgorithm):',
+        '    def Initialize(self):',
+        '        self.count = LIMIT',
+        '        self.Schedule.On(self.DateRules.EveryDay(), self.TimeRules.At(9, 0), lambda: self.Rebalance(self.count))',
+        '    def Rebalance(self, count):',
+        '        return [symbol for symbol in self.Securities.Keys][:count]',
+        '',
+    ])
+    assert check_source(source) == []
+    problems = check_source(source.replace('self.count)', 'self.cuont)').replace('LIMIT = 3', 'LIMT = 3'))
+    assert [format_problem('main.py', problem) for problem in problems] == [
+        "main.py:5:22: undefined name 'LIMIT'",
+        "main.py:6:101: warning: 'self.cuont' is not a member of QCAlgorithm nor set by Algo",
+    ]
+    assert [problem.warning for problem in problems] == [False, True]
+    #the same read in a generated region is an error
+    problems = check_source(source.replace('        self.Schedule', '        # wizardry:begin schedule\n        self.Schedule')
+                            .replace('self.count))', 'self.cuont))\n        # wizardry:end schedule'))
+    assert [(problem.message, problem.warning) for problem in problems] == [
+        ("'self.cuont' is not a member of QCAlgorithm nor set by Algo", False)]
+    #common members the catalog doesn't use are known too
+    assert check_source(source.replace('self.count = LIMIT', 'self.SetWarmup(10); self.bb = self.BB("SPY", 20)\n'
+                                       '        self.count = LIMIT if self.LiveMode else self.Settings')) == []
+    #names aren't checked when a module outside the index is star-imported
+    assert check_source('from helpers import *\n' + source.replace('= LIMIT', '= helper()')) == []
+
+
+def test_syntax_and_missing_algorithm():
+    [problem] = check_source('class A(QCAlgorithm):\n    def OnData(self, data):\n        # nothing\n')
+    assert problem.line == 3
+    assert messages('x = 1\n') == ['no class derives from QCAlgorithm']
+
+
+def test_check_project(tmp_path):
+    source = generate(dict(ANSWERS, universe='Options Universe'))
+    (tmp_path / 'main.py').write_text(source.replace('OptionUniverseSelectionModel', 'OptionsUniverseSelectionModel'))
+    (tmp_path / 'helpers.py').write_text('def helper():\n    return undefined\n')
+    problems = [(path, problem.message) for path, problem in check_project(str(tmp_path))]
+    assert problems == [('helpers.py', "undefined name 'undefined'"),
+                        ('main.py', "undefined name 'OptionsUniverseSelectionModel'")]
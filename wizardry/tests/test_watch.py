@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from wizardry.watch import InotifyWatcher, PollingWatcher, Watch
+
+
+def make_project(tmp_path):
+    project = tmp_path / 'workspace' / 'Watched'
+    (project / 'backtests').mkdir(parents=True)
+    (project / 'main.py').write_text('class A: pass\n')
+    (project / 'config.json').write_text('{}')
+    return project
+
+
+def watchers(project):
+    yield PollingWatcher(str(project), interval=0.05)
+    try:
+        yield InotifyWatcher(str(project))
+    except OSError:
+        pass
+
+
+def test_watchers_report_project_files(tmp_path):
+    project = make_project(tmp_path)
+    for watcher in watchers(project):
+        (project / 'main.py').write_text('class B: pass\n')
+        (project / 'backtests' / 'result.json').write_text('{}')
+        (project / 'lib').mkdir(exist_ok=True)
+        time.sleep(0.05)
+        (project / 'lib' / 'helpers.py').write_text('x = %r\n' % watcher.kind)
+        changed = set()
+        deadline = time.monotonic() + 2
+        while {'main.py', 'lib/helpers.py'} - changed and time.monotonic() < deadline:
+            changed |= watcher.changes(0.2)
+        watcher.close()
+        assert {'main.py', 'lib/helpers.py'} <= changed, watcher.kind
+        assert 'backtests/result.json' not in changed
+
+
+def test_saves_are_coalesced(tmp_path, stub_lean):
+    project = make_project(tmp_path)
+    watch = Watch(str(project), debounce=0.3, polling=True, log=lambda message: None)
+    watch.watcher.interval = 0.05
+    for i in range(3):
+        (project / 'main.py').write_text('class A%d: pass\n' % i)
+        time.sleep(0.1)
+    (project / 'notes.txt').write_text('ignored')
+    changed = watch.settle(watch.changes(1))
+    assert changed == {'main.py'}
+
+
+@pytest.mark.parametrize('local', [False, True])
+def test_newer_save_cancels_backtest(tmp_path, stub_lean, monkeypatch, local):
+    monkeypatch.setenv('STUB_LEAN_SLEEP', '5')
+    project = make_project(tmp_path)
+    messages, pushes = [], []
+    push = lambda directory, run, log: pushes.append(directory) or 0
+    watch = Watch(str(project), debounce=0.1, local=local, polling=True, push=push, log=messages.append)
+    watch.watcher.interval = 0.05
+    stop = threading.Event()
+    thread = threading.Thread(target=watch.run, args=(stop,))
+    thread.start()
+    try:
+        (project / 'main.py').write_text('class B: pass\n')
+        deadline = time.monotonic() + 10
+        while not watch.latencies and time.monotonic() < deadline:
+            time.sleep(0.05)
+        first = watch.process
+        (project / 'main.py').write_text('class C: pass\n')
+        while len(watch.latencies) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert len(watch.latencies) == 2
+    assert first.returncode is not None
+    assert "Cancelled the backtest of the previous save." in messages
+    assert all(0 <= latency < 10 for latency in watch.latencies)
+    assert watch.summary()['backtests'] == 2
+    expected = ['backtest', 'Watched'] if local else ['cloud', 'backtest', 'Watched']
+    assert [call['args'] for call in stub_lean.calls] == [expected, expected]
+    assert len(pushes) == (0 if local else 2)
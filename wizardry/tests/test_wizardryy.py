@@ -1,4 +1,4 @@
-from wizardryy import __version__
+from wizardry import __version__
 
 
 def test_version():
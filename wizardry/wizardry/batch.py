@@ -0,0 +1,120 @@
+"""
+Batch mode for the ``framework`` command: expand a spec file into many
+strategy variants, one project directory each, without any prompt.
+
+A spec is a YAML (or JSON) mapping. Scalar values are shared by every
+variant, ``grid`` maps a field to the list of values to combine, and
+``variants`` lists explicit combinations::
+
+    start: 2017, 1, 1
+    cash: 100000
+    grid:
+      alpha: [RSI, [RSI, MACD], EMA Cross]
+      universe: [Large Cap Equities, Coarse Universe]
+      portfolio: [Equal Weighting]
+      execution: [Immediate, VWAP]
+      risk: [None, Maximum Drawdown]
+
+Each variant ends up in ``<out_dir>/variant-<n>/main.py`` and the choices
+behind every variant are listed in ``<out_dir>/variants.json``.
+"""
+import itertools
+import json
+import os
+
+from wizardry.codegen import CHOICES, FIELDS, PARAMETERS, config_parameters, generate
+from wizardry.project import update_config, write_source
+
+
+class SpecError(ValueError):
+    """Raised when a spec file can't be expanded into variants."""
+
+
+def load_spec(path):
+    """Read a spec file, YAML unless the file name ends with ``.json``."""
+    with open(path) as file:
+        if path.endswith('.json'):
+            return json.load(file)
+        try:
+            import yaml
+        except ImportError:
+            raise SpecError('PyYAML is needed to read %s (pip install pyyaml), '
+                            'or write the spec as JSON' % path)
+        return yaml.safe_load(file)
+
+
+def check_answers(variant):
+    """Normalize and validate the answers of a single variant."""
+    missing = [field for field in FIELDS if field not in variant]
+    if missing:
+        raise SpecError('missing value for: ' + ', '.join(missing))
+    answers = dict(variant)
+    alpha = answers['alpha']
+    answers['alpha'] = [alpha] if isinstance(alpha, str) else list(alpha)
+    for field, options in CHOICES.items():
+        values = answers[field] if field == 'alpha' else [answers[field]]
+        for value in values:
+            if value not in options:
+                raise SpecError('%r is not a valid %s, choose from: %s'
+                                % (value, field, ', '.join(options)))
+    parameters = answers.get('parameters') or {}
+    if not isinstance(parameters, dict):
+        raise SpecError('parameters must map parameter names to values')
+    unknown = [str(name) for name in parameters if name not in PARAMETERS]
+    if unknown:
+        raise SpecError('unknown parameter: %s, choose from: %s'
+                        % (', '.join(unknown), ', '.join(sorted(PARAMETERS))))
+    for field in ('start', 'cash'):
+        answers[field] = str(answers[field])
+    return answers
+
+
+def expand(spec):
+    """
+    Yield the answers of every variant described by ``spec``: the explicit
+    ``variants`` first, then the cartesian product of ``grid``.
+    """
+    if not isinstance(spec, dict):
+        raise SpecError('a spec must be a mapping')
+    defaults = {key: value for key, value in spec.items()
+                if key not in ('grid', 'variants')}
+    variants = spec.get('variants') or []
+    if not isinstance(variants, list):
+        raise SpecError('variants must be a list of mappings')
+    for number, variant in enumerate(variants, 1):
+        if not isinstance(variant, dict):
+            raise SpecError('variant %d is not a mapping: %r' % (number, variant))
+        yield check_answers(dict(defaults, **variant))
+    grid = spec.get('grid') or {}
+    if not isinstance(grid, dict) or not all(isinstance(values, (list, tuple)) for values in grid.values()):
+        raise SpecError('grid must map fields to lists of values')
+    if grid:
+        fields = list(grid)
+        for values in itertools.product(*(grid[field] for field in fields)):
+            yield check_answers(dict(defaults, **dict(zip(fields, values))))
+
+
+def generate_variants(spec, out_dir, parameterized=False):
+    """
+    Write one project directory per variant of ``spec`` (a mapping or the
+    path of a spec file) under ``out_dir``. With ``parameterized``, the
+    constants of the components go to the ``config.json`` of each variant.
+    Returns the number of variants.
+    """
+    if isinstance(spec, str):
+        spec = load_spec(spec)
+    variants = list(expand(spec))
+    os.makedirs(out_dir, exist_ok=True)
+    width = max(len(str(len(variants))), 4)
+    index = {}
+    for number, answers in enumerate(variants, 1):
+        name = 'variant-%0*d' % (width, number)
+        directory = os.path.join(out_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        write_source(directory, generate(answers, parameterized) + '\n')
+        if parameterized:
+            update_config(directory, config_parameters(answers))
+        index[name] = answers
+    with open(os.path.join(out_dir, 'variants.json'), 'w') as file:
+        json.dump(index, file, indent=2)
+    return len(variants)
@@ -0,0 +1,373 @@
+from __future__ import print_function, unicode_literals, with_statement
+import os
+import textwrap
+from contextlib import contextmanager
+try:
+    from StringIO import StringIO ## for Python 2
+except ImportError:
+    from io import StringIO ## for Python 3
+
+
+class DedentException(Exception):
+    """Raised when dedenting past indentation level zero."""
+
+
+INDENT = ' ' * 4
+
+class IndentManager(object):
+    """
+    A context manager for indentation. Used internally by the source manager
+    to provide the indent context manager. And the indent and dedent methods.
+    """
+    def __init__(self, indent_with=INDENT):
+        self.indent_with = indent_with
+        self.level = 0
+
+    def __call__(self):
+        """
+        Raise the indentation level if this instance is called like a method.
+        """
+        self.indent()
+
+    def __str__(self):
+        """
+        self.indent_with multiplied by the current indentation level.
+        Used to indent strings to the correct depth.
+        """
+        return self.indent_with * self.level
+
+    def __enter__(self):
+        """
+        Start of an indentation context.
+        """
+        self.indent()
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Ends of an indentation context, so dedent.
+        """
+        self.dedent()
+
+    def indent(self):
+        """Raise the indentation level by 1."""
+        self.level = self.level + 1
+        return self
+
+    def dedent(self):
+        """
+        Decrease the indentation level by one. If the indentation level is
+        already at zero a ``DedentException`` is raised.
+        """
+        if self.level == 0:
+            raise DedentException('Indent level is already at zero.')
+        self.level = self.level - 1
+
+    def reset(self):
+        """
+        Reset the indentation level to zero.
+        """
+        self.level = 0
+
+
+class SourceBuilder(object):
+    """
+    A basic source code writer.
+    Usage
+    -----
+    Create a SourceBuilder instance  and write code to it to line by line.
+    By using the ``indent`` context manager each line gets correctly indented
+    and the input indentation will resemble the output::
+      >>> sb = SourceBuilder()
+      >>> sb.writeln()
+      >>> sb.writeln('def hello_world():')
+      >>> with sb.indent:
+      ...     sb.writeln('print \'Hello World\'')
+      ...
+      ...
+      >>> sb.writeln()
+      >>> sb.writeln('hello_world()')
+      >>> source = sb.end()
+      >>> print source
+      def hello_world():
+          print 'Hello World'
+      hello_world()
+    If for some reason context managers can't be used ``indent`` also works
+    as a method. Combined with the ``dedent`` method code indentation levels
+    can be controlled manually.::
+      >>> sb = SourceBuilder()
+      >>> sb.writeln()
+      >>> sb.writeln('def hello_world():')
+      >>> sb.indent()
+      >>> sb.writeln('print \'Hello World\'')
+      >>> sb.dedent()
+      >>> sb.writeln()
+      >>> sb.writeln('hello_world()')
+      >>> source = sb.end()
+      >>> print source
+      def hello_world():
+           print 'Hello World'
+      hello_world()
+    It's not advised to use ``sb.indent`` in ``with`` statements in combination
+    with calls to ``sb.dedent()`` or ``sb.indent()``.
+    """
+    def __init__(self, indent_with=INDENT):
+        """
+        Initialize SourceBuilder, ``indent_with`` is set to 4 spaces
+        by default.
+        """
+        self._out = StringIO()
+        self.indent = IndentManager(indent_with=indent_with)
+
+    def write(self, code):
+        """
+        Write code at the current indentation level.
+        """
+        self._out.write(str(self.indent))
+        self._out.write(code)
+
+    def writeln(self, code=''):
+        """
+        Write a line at the current indentation level.
+        If no code is given only a newline is written.
+        """
+        if code:
+            self.write(code)
+        self._out.write('\n')
+
+    def dedent(self):
+        """
+        Decrease the current indentation level. Should only be used if
+        the indent context manager is not used.
+        Raises a ``DedentException`` if decreasing indentation level is not
+        possible.
+        """
+        self.indent.dedent()
+
+    def end(self):
+        """
+        Get the generated source and resets the indent level.
+        """
+        self.indent.reset()
+        return self._out.getvalue()
+
+    def truncate(self):
+        '''
+        Discard generated source and memory buffer and resets the indent level.
+        '''
+        if not self._out.closed:
+            self._out.close()
+        self._out = StringIO()
+        self.indent.reset()
+
+    def close(self):
+        '''
+        Convenience method for use with ``contextlib.closing``.
+        Calls ``self.truncate()``.
+        '''
+        self.truncate()
+
+
+class CachedIndentManager(IndentManager):
+    """
+    An IndentManager that keeps the indentation string of the current level
+    in ``prefix`` instead of multiplying ``indent_with`` for every line.
+    Prefixes are computed once per level and reused.
+    """
+    def __init__(self, indent_with=INDENT):
+        self.indent_with = indent_with
+        self.level = 0
+        self.prefix = ''
+        self._prefixes = ['']
+
+    def __str__(self):
+        return self.prefix
+
+    def indent(self):
+        """Raise the indentation level by 1."""
+        self.level = self.level + 1
+        if self.level == len(self._prefixes):
+            self._prefixes.append(self.indent_with * self.level)
+        self.prefix = self._prefixes[self.level]
+        return self
+
+    def dedent(self):
+        """
+        Decrease the indentation level by one. If the indentation level is
+        already at zero a ``DedentException`` is raised.
+        """
+        if self.level == 0:
+            raise DedentException('Indent level is already at zero.')
+        self.level = self.level - 1
+        self.prefix = self._prefixes[self.level]
+
+    def reset(self):
+        """
+        Reset the indentation level to zero.
+        """
+        self.level = 0
+        self.prefix = ''
+
+
+FLUSH_EVERY = 512
+
+
+class FastSourceBuilder(object):
+    """
+    A faster SourceBuilder with the same API (``writeln``, ``indent``,
+    ``dedent``, ``end``, ``truncate``).
+
+    Lines are appended, already indented, to a list of chunks which is only
+    joined by ``end``. Given a ``sink`` (a file object, or a file descriptor
+    as an int) the chunks are streamed to it every ``FLUSH_EVERY`` lines
+    instead of being kept in memory::
+
+      >>> with open('main.py', 'w') as file:
+      ...     sb = FastSourceBuilder(sink=file)
+      ...     sb.writeln('def hello_world():')
+      ...     with sb.indent:
+      ...         sb.writeln('print(\'Hello World\')')
+      ...     sb.end()
+
+    When streaming, ``end`` flushes the remaining lines and returns ``None``.
+    """
+    __slots__ = ('_chunks', '_sink', 'encoding', 'indent')
+
+    def __init__(self, indent_with=INDENT, sink=None, encoding='utf-8'):
+        self._chunks = []
+        self._sink = sink
+        self.encoding = encoding
+        self.indent = CachedIndentManager(indent_with=indent_with)
+
+    def write(self, code):
+        """
+        Write code at the current indentation level.
+        """
+        self._chunks.append(self.indent.prefix + code)
+
+    def writeln(self, code=''):
+        """
+        Write a line at the current indentation level.
+        If no code is given only a newline is written.
+        """
+        if code:
+            self._chunks.append(self.indent.prefix + code + '\n')
+        else:
+            self._chunks.append('\n')
+        if self._sink is not None and len(self._chunks) >= FLUSH_EVERY:
+            self.flush()
+
+    def dedent(self):
+        """
+        Decrease the current indentation level. Should only be used if
+        the indent context manager is not used.
+        Raises a ``DedentException`` if decreasing indentation level is not
+        possible.
+        """
+        self.indent.dedent()
+
+    def flush(self):
+        """
+        Send the pending lines to the sink. Does nothing without a sink.
+        """
+        if self._sink is None or not self._chunks:
+            return
+        data = ''.join(self._chunks)
+        del self._chunks[:]
+        if isinstance(self._sink, int):
+            data = memoryview(data.encode(self.encoding))
+            while data:
+                data = data[os.write(self._sink, data):]
+        else:
+            self._sink.write(data)
+
+    def end(self):
+        """
+        Get the generated source and resets the indent level. When streaming
+        to a sink the remaining lines are flushed and ``None`` is returned.
+        """
+        self.indent.reset()
+        if self._sink is not None:
+            self.flush()
+            return None
+        return ''.join(self._chunks)
+
+    def truncate(self):
+        '''
+        Discard the pending source and resets the indent level. Lines already
+        streamed to a sink can't be taken back.
+        '''
+        self._chunks = []
+        self.indent.reset()
+
+    def close(self):
+        '''
+        Convenience method for use with ``contextlib.closing``.
+        Calls ``self.truncate()``.
+        '''
+        self.truncate()
+
+
+INDENT = ' ' * 4
+TRIPLE_QUOTES = '"' * 3
+DOCSTRING_WIDTH = 72
+
+
+class PySourceBuilder(SourceBuilder):
+    """
+    A special SourceBuilder that provides some convenience context managers
+    for writing well formatted Python code.
+    """
+    def __init__(self, indent_with=INDENT):
+        super(PySourceBuilder, self).__init__(indent_with=indent_with)
+
+    @contextmanager
+    def block(self, code, lines_before=0):
+        """
+        A context manager for block structures. It's a generic way to start a
+        control structure (if, try, while, for etc.) or a class, function or
+        method definition.
+        The given ``code`` will be printed preceded by 0 or more blank lines,
+        controlled by the ``lines_before`` parameter. An indent context is
+        then started.
+        Example::
+            sb = PySourceBuilder()
+            >>>
+            >>> with sb.block('class Hello(object):', 2):
+            ...     with sb.block('def __init__(self, what=\'World\'):', 1):
+            ...         sb.writeln('pass')
+            ...
+            >>> print sb.end()
+            class Hello(object):
+                def __init__(self, what='World'):
+                    pass
+        """
+        for i in range(lines_before):
+            self.writeln()
+        self.writeln(code)
+        with self.indent:
+            yield
+
+    def docstring(self, doc, delimiter=TRIPLE_QUOTES, width=DOCSTRING_WIDTH):
+        """
+        Write a docstring. The given ``doc`` is surrounded by triple double
+        quotes (\"\"\"). This can be changed by passing a different
+        ``delimiter`` (e.g. triple single quotes).
+        The docstring is formatted to not run past 72 characters per line
+        (including indentation). This can be changed by passing a different
+        ``width`` parameter.
+        """
+        doc = textwrap.dedent(doc).strip()
+        max_width = width - len(str(self.indent))
+        lines = doc.splitlines()
+        if len(lines) == 1 and len(doc) < max_width - len(delimiter) * 2:
+            self.writeln(u'%s%s%s' % (delimiter, doc, delimiter))
+        else:
+            self.writeln(delimiter)
+            for line in lines:
+                if not line.strip():
+                    self.writeln()
+                for wrap in textwrap.wrap(line, max_width):
+                    self.writeln(wrap)
+            self.writeln()
+            self.writeln(delimiter)
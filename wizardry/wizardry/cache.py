@@ -0,0 +1,238 @@
+"""
+Local on-disk cache of the strategies forked with ``wizardry library``.
+
+Bodies are stored once, content-addressed by their SHA-256, under
+``<cache dir>/library/blobs``. ``index.json`` maps every fetched URL to its
+blob together with the ``ETag``/``Last-Modified`` validators the server
+sent, so later fetches can be conditional requests. The least recently used
+entries are evicted once the cache grows past its size limit. A blob written
+before its entry is added (by the workers of a sync) is never pruned in the
+meantime.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+#default size limit of the library cache, in bytes
+MAX_SIZE = 50 * 1024 * 1024
+
+#seconds an unreferenced blob is kept: it may have just been written by a
+#sync, in this process or another, which hasn't added its entry yet
+PRUNE_GRACE = 3600
+
+
+class ChecksumError(ValueError):
+    """Raised when a body doesn't match the checksum it was expected to have."""
+
+
+def cache_dir(*parts):
+    """
+    The user cache directory of wizardry, ``$WIZARDRY_CACHE_DIR`` if set,
+    otherwise the platform's cache location (e.g. ``~/.cache/wizardry``).
+    """
+    root = os.environ.get('WIZARDRY_CACHE_DIR')
+    if not root:
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        elif sys.platform == 'darwin':
+            base = os.path.expanduser('~/Library/Caches')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        root = os.path.join(base, 'wizardry')
+    return os.path.join(root, *parts)
+
+
+def atomic_write(path, data, mode=None):
+    """
+    Write ``data`` (bytes) to ``path`` through a temporary file + rename.
+    The file is private to the user unless given another ``mode``.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class StrategyCache(object):
+    """
+    A size-bounded, content-addressed cache of library strategies.
+
+    Entries are dicts with the ``sha256`` and ``size`` of the body, the
+    ``etag`` and ``last_modified`` validators (or ``None``) and the time
+    the entry was last ``used``.
+    """
+    def __init__(self, root=None, max_size=MAX_SIZE):
+        self.root = root or cache_dir('library')
+        self.max_size = max_size
+        self.blobs = os.path.join(self.root, 'blobs')
+        self._index_path = os.path.join(self.root, 'index.json')
+        self._index = None
+        #blobs written by write_blob whose entry isn't added yet
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            try:
+                with open(self._index_path) as file:
+                    self._index = json.load(file)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self._index_path, json.dumps(self.index, indent=1).encode('utf-8'))
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blobs, sha256[:2], sha256)
+
+    def get(self, url):
+        """The entry cached for ``url``, ``None`` if missing or damaged."""
+        entry = self.index.get(url)
+        if entry is None or not os.path.isfile(self.blob_path(entry['sha256'])):
+            return None
+        return entry
+
+    def read(self, url):
+        """The cached body of ``url`` as bytes, marking it as used."""
+        entry = self.get(url)
+        if entry is None:
+            raise KeyError(url)
+        with open(self.blob_path(entry['sha256']), 'rb') as file:
+            data = file.read()
+        self.touch(url)
+        return data
+
+    def touch(self, url):
+        """Mark ``url`` as just used, for the LRU eviction."""
+        self.index[url]['used'] = time.time()
+        self._save()
+
+    def write_blob(self, chunks, sha256=None):
+        """
+        Stream ``chunks`` (bytes) into a blob through a temporary file,
+        hashing them on the way. With ``sha256``, a body with another hash
+        raises ``ChecksumError`` and leaves nothing behind. The index isn't
+        touched, so this is safe from several threads, and the blob is
+        pinned, safe from pruning, until ``add`` points an entry to it.
+        Returns the ``(sha256, size)`` of the blob.
+        """
+        os.makedirs(self.blobs, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.blobs, prefix='.tmp-')
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            actual = digest.hexdigest()
+            if sha256 is not None and actual != sha256:
+                raise ChecksumError('expected sha256 %s, got %s' % (sha256, actual))
+            path = self.blob_path(actual)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._lock:
+                self._pinned.add(actual)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return actual, size
+
+    def put(self, url, data, etag=None, last_modified=None):
+        """Store ``data`` (bytes) for ``url`` with its validators."""
+        sha256, size = self.write_blob([data])
+        self.add(url, sha256, size, etag, last_modified)
+
+    def add(self, url, sha256, size, etag=None, last_modified=None):
+        """Point ``url`` to the blob ``sha256`` written by ``write_blob``."""
+        self.index[url] = {
+            'sha256': sha256,
+            'size': size,
+            'etag': etag,
+            'last_modified': last_modified,
+            'used': time.time(),
+        }
+        with self._lock:
+            self._pinned.discard(sha256)
+        if self.stats()['size'] > self.max_size:
+            self.prune()
+        else:
+            self._save()
+
+    def stats(self):
+        """Number of entries, distinct blobs and bytes used on disk."""
+        blobs = {entry['sha256']: entry['size'] for entry in self.index.values()}
+        return {
+            'root': self.root,
+            'entries': len(self.index),
+            'blobs': len(blobs),
+            'size': sum(blobs.values()),
+            'max_size': self.max_size,
+        }
+
+    def prune(self, max_size=None):
+        """
+        Evict the least recently used entries until the blobs fit in
+        ``max_size`` bytes (the cache limit by default), then delete blobs
+        no entry refers to (see ``_collect``). Returns the number of evicted
+        entries.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        evicted = 0
+        freed = set()
+        size = self.stats()['size']
+        for url in sorted(self.index, key=lambda url: self.index[url]['used']):
+            if size <= max_size:
+                break
+            evicted_entry = self.index.pop(url)
+            evicted += 1
+            if not any(entry['sha256'] == evicted_entry['sha256']
+                       for entry in self.index.values()):
+                size -= evicted_entry['size']
+                freed.add(evicted_entry['sha256'])
+        self._save()
+        self._collect(freed)
+        return evicted
+
+    def _collect(self, freed=()):
+        """
+        Delete the blobs that are not referenced by the index anymore: the
+        ``freed`` ones right away, others once ``PRUNE_GRACE`` old, and never
+        those pinned by ``write_blob``.
+        """
+        referenced = {entry['sha256'] for entry in self.index.values()}
+        if not os.path.isdir(self.blobs):
+            return
+        expired = time.time() - PRUNE_GRACE
+        with self._lock:
+            referenced |= self._pinned
+        for prefix in os.listdir(self.blobs):
+            directory = os.path.join(self.blobs, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name in referenced:
+                    continue
+                try:
+                    if name in freed or os.stat(path).st_mtime < expired:
+                        os.remove(path)
+                except OSError:
+                    pass
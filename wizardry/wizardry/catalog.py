@@ -0,0 +1,383 @@
+"""
+The components offered by the ``framework`` command, as data.
+
+Every section maps the name shown in the prompt to a ``Component``: the
+lines it adds to ``Initialize`` (indented relative to the method body), the
+import lines it needs, the methods it adds to the algorithm class (the
+selection functions of a universe) and the classes it defines next to it
+(the alpha models LEAN doesn't ship). Adding a component is adding an entry
+here, the prompt and the code generation pick it up from this catalog.
+
+The tunable constants of a component are written as ``{placeholders}`` in
+its lines and listed with their defaults in ``parameters``, so optimizers
+can sweep them (see ``wizardry.optimizer``).
+"""
+from collections import namedtuple
+
+Component = namedtuple('Component', ['lines', 'imports', 'parameters', 'methods', 'classes'],
+                       defaults=((), (), ()))
+
+NONE = Component((), ())
+
+#imports every generated algorithm starts with, in the order they are written
+BASE_IMPORTS = (
+    'from System import *',
+    'from QuantConnect import *',
+    'from QuantConnect.Algorithm import *',
+    'from QuantConnect.Indicators import *',
+    'from QuantConnect.Algorithm.Framework import *',
+    'from QuantConnect.Algorithm.Framework.Risk import *',
+    'from QuantConnect.Algorithm.Framework.Alphas import *',
+    'from QuantConnect.Algorithm.Framework.Selection import *',
+    'from QuantConnect.Algorithm.Framework.Execution import *',
+    'from QuantConnect.Algorithm.Framework.Portfolio import *',
+)
+
+DATETIME = 'from datetime import timedelta'
+
+#alpha models of the QuantConnect examples which LEAN doesn't ship, written next to the algorithm
+MEAN_REVERSION_IBS = (
+    'class MeanReversionIBSAlphaModel(AlphaModel):',
+    '    \'\'\'Once a day, longs the securities with the lowest Internal Bar Strength and shorts the highest\'\'\'',
+    '',
+    '    def __init__(self, numberOfStocks = 2, period = timedelta(days = 1)):',
+    '        self.numberOfStocks = numberOfStocks',
+    '        self.period = period',
+    '        self.day = None',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        if algorithm.Time.day == self.day:',
+    '            return []',
+    '        strength = {}',
+    '        for security in algorithm.ActiveSecurities.Values:',
+    '            if security.HasData and security.High > security.Low:',
+    '                strength[security.Symbol] = (security.Close - security.Low) / (security.High - security.Low)',
+    '        if len(strength) < 2 * self.numberOfStocks:',
+    '            return []',
+    '        self.day = algorithm.Time.day',
+    '        ranked = sorted(strength, key = strength.get)',
+    '        return [Insight.Price(symbol, self.period, InsightDirection.Up) for symbol in ranked[:self.numberOfStocks]] + \\',
+    '            [Insight.Price(symbol, self.period, InsightDirection.Down) for symbol in ranked[-self.numberOfStocks:]]',
+)
+
+RATE_OF_CHANGE = (
+    'class RateOfChangeAlphaModel(AlphaModel):',
+    '    \'\'\'Once a month, emits insights in the direction of the yearly rate of change of every security\'\'\'',
+    '',
+    '    def __init__(self, lookback = 252, period = timedelta(days = 30)):',
+    '        self.lookback = lookback',
+    '        self.period = period',
+    '        self.indicators = {}',
+    '        self.month = None',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        ready = [(symbol, roc) for symbol, roc in self.indicators.items() if roc.IsReady]',
+    '        if algorithm.Time.month == self.month or not ready:',
+    '            return []',
+    '        self.month = algorithm.Time.month',
+    '        return [Insight.Price(symbol, self.period, InsightDirection.Up if roc.Current.Value > 0 else InsightDirection.Down)',
+    '                for symbol, roc in ready]',
+    '',
+    '    def OnSecuritiesChanged(self, algorithm, changes):',
+    '        for security in changes.AddedSecurities:',
+    '            if security.Symbol not in self.indicators:',
+    '                self.indicators[security.Symbol] = algorithm.ROC(security.Symbol, self.lookback, Resolution.Daily)',
+    '        for security in changes.RemovedSecurities:',
+    '            self.indicators.pop(security.Symbol, None)',
+)
+
+MORTGAGE_RATE_VOLATILITY = (
+    'class QuandlMortgagePriceColumns(PythonQuandl):',
+    '    def __init__(self):',
+    '        self.ValueColumnName = "Value"',
+    '',
+    '',
+    'class MortgageRateVolatilityAlphaModel(AlphaModel):',
+    '    \'\'\'Sells everything when the 30 year mortgage rate leaves its Bollinger band, buys when it is back in\'\'\'',
+    '',
+    '    def __init__(self, algorithm, indicatorPeriod = 15, insightMagnitude = 0.0005, deviations = 2):',
+    '        self.mortgageRate = algorithm.AddData(QuandlMortgagePriceColumns, "WFC/PR_GOV_30YFIXEDVA_APR").Symbol',
+    '        self.period = timedelta(days = indicatorPeriod)',
+    '        self.insightMagnitude = insightMagnitude',
+    '        self.deviations = deviations',
+    '        self.std = algorithm.STD(self.mortgageRate, indicatorPeriod)',
+    '        self.sma = algorithm.SMA(self.mortgageRate, indicatorPeriod)',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        if not data.ContainsKey(self.mortgageRate) or not self.std.IsReady:',
+    '            return []',
+    '        distance = abs(data[self.mortgageRate].Value - self.sma.Current.Value)',
+    '        deviation = self.deviations * self.std.Current.Value',
+    '        if distance > deviation:',
+    '            direction = InsightDirection.Down',
+    '        elif distance < deviation / 2:',
+    '            direction = InsightDirection.Up',
+    '        else:',
+    '            return []',
+    '        return [Insight.Price(symbol, self.period, direction, self.insightMagnitude, None)',
+    '                for symbol in algorithm.ActiveSecurities.Keys if symbol != self.mortgageRate]',
+)
+
+INTRADAY_REVERSAL = (
+    'class IntradayReversalAlphaModel(AlphaModel):',
+    '    \'\'\'Between 10AM and 3PM, goes long when the price crosses below its moving average, short when it crosses above\'\'\'',
+    '',
+    '    def __init__(self, period = 5, resolution = Resolution.Hour):',
+    '        self.period = period',
+    '        self.resolution = resolution',
+    '        self.averages = {}',
+    '        self.directions = {}',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        if not 10 <= algorithm.Time.hour < 15:',
+    '            return []',
+    '        #the insights expire at 3PM, when the positions are closed',
+    '        close = algorithm.Time.replace(hour = 15, minute = 1, second = 0)',
+    '        insights = []',
+    '        for symbol, average in self.averages.items():',
+    '            security = algorithm.Securities[symbol]',
+    '            if not security.HasData or not average.IsReady:',
+    '                continue',
+    '            direction = InsightDirection.Up if security.Price < average.Current.Value else InsightDirection.Down',
+    '            if direction != self.directions.get(symbol):',
+    '                self.directions[symbol] = direction',
+    '                insights.append(Insight.Price(symbol, close, direction))',
+    '        return insights',
+    '',
+    '    def OnSecuritiesChanged(self, algorithm, changes):',
+    '        for security in changes.AddedSecurities:',
+    '            if security.Symbol not in self.averages:',
+    '                self.averages[security.Symbol] = algorithm.SMA(security.Symbol, self.period, self.resolution)',
+    '        for security in changes.RemovedSecurities:',
+    '            self.averages.pop(security.Symbol, None)',
+    '            self.directions.pop(security.Symbol, None)',
+)
+
+TRIANGLE_ARBITRAGE = (
+    'class ForexTriangleArbitrageAlphaModel(AlphaModel):',
+    '    \'\'\'Trades the three currency pairs of ``symbols`` when their cross rate drifts away from 1\'\'\'',
+    '',
+    '    def __init__(self, period, symbols):',
+    '        self.period = period',
+    '        self.symbols = symbols',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        if not all(data.QuoteBars.ContainsKey(symbol) for symbol in self.symbols):',
+    '            return []',
+    '        a, b, c = [data.QuoteBars[symbol] for symbol in self.symbols]',
+    '        if a.Ask.Close / b.Bid.Close / c.Ask.Close <= 1.0005:',
+    '            return []',
+    '        return [',
+    '            Insight.Price(self.symbols[0], self.period, InsightDirection.Up, 0.0001, None),',
+    '            Insight.Price(self.symbols[1], self.period, InsightDirection.Down, 0.0001, None),',
+    '            Insight.Price(self.symbols[2], self.period, InsightDirection.Up, 0.0001, None),',
+    '        ]',
+)
+
+DUAL_THRUST = (
+    'class DualThrustAlphaModel(AlphaModel):',
+    '    \'\'\'Goes long above, and short below, a breakout channel around the close of the last bar',
+    '    (see https://www.quantconnect.com/tutorials/strategy-library/dual-thrust-trading-algorithm)\'\'\'',
+    '',
+    '    RESOLUTIONS = {',
+    '        Resolution.Second: timedelta(seconds = 1),',
+    '        Resolution.Minute: timedelta(minutes = 1),',
+    '        Resolution.Hour: timedelta(hours = 1),',
+    '        Resolution.Daily: timedelta(days = 1),',
+    '    }',
+    '',
+    '    def __init__(self, k1, k2, rangePeriod, resolution = Resolution.Daily, barsToConsolidate = 1):',
+    '        self.k1 = k1',
+    '        self.k2 = k2',
+    '        self.rangePeriod = rangePeriod',
+    '        self.barLength = self.RESOLUTIONS.get(resolution, timedelta(days = 1)) * barsToConsolidate',
+    '        self.period = timedelta(days = 5)',
+    '        self.windows = {}',
+    '        self.lines = {}',
+    '',
+    '    def Update(self, algorithm, data):',
+    '        insights = []',
+    '        for symbol, (upper, lower) in self.lines.items():',
+    '            holding = algorithm.Portfolio[symbol]',
+    '            price = algorithm.Securities[symbol].Price',
+    '            if price > upper and not holding.IsLong:',
+    '                insights.append(Insight.Price(symbol, self.period, InsightDirection.Up))',
+    '            elif price < lower and not holding.IsShort:',
+    '                insights.append(Insight.Price(symbol, self.period, InsightDirection.Down))',
+    '        return insights',
+    '',
+    '    def OnSecuritiesChanged(self, algorithm, changes):',
+    '        for security in changes.AddedSecurities:',
+    '            if security.Symbol not in self.windows:',
+    '                self.windows[security.Symbol] = deque(maxlen = self.rangePeriod)',
+    '                algorithm.Consolidate(security.Symbol, self.barLength, self.OnBar)',
+    '',
+    '    def OnBar(self, bar):',
+    '        window = self.windows[bar.Symbol]',
+    '        window.append(bar)',
+    '        if len(window) == window.maxlen:',
+    '            spread = max(max(x.High for x in window) - min(x.Close for x in window),',
+    '                         max(x.Close for x in window) - min(x.Low for x in window))',
+    '            self.lines[bar.Symbol] = (bar.Close + self.k1 * spread, bar.Close - self.k2 * spread)',
+)
+
+#selection function of the coarse universes: the most traded equities with fundamental data
+COARSE_SELECTION = (
+    'def CoarseSelectionFunction(self, coarse):',
+    '    selected = sorted([x for x in coarse if x.HasFundamentalData and x.Price > 5],',
+    '                      key = lambda x: x.DollarVolume, reverse = True)',
+    '    return [x.Symbol for x in selected[:self.__numberOfSymbols]]',
+)
+
+ALPHA = {
+    'RSI': Component((
+        'self.AddAlpha(RsiAlphaModel({rsi_period}, Resolution.Minute))',
+    ), (), (('rsi_period', 60),)),
+    'EMA Cross': Component((
+        'self.AddAlpha(EmaCrossAlphaModel({ema_fast}, {ema_slow}, Resolution.Minute))',
+    ), (), (('ema_fast', 50), ('ema_slow', 200))),
+    'MACD': Component((
+        'self.AddAlpha(MacdAlphaModel({macd_fast}, {macd_slow}, {macd_signal}, MovingAverageType.Simple, Resolution.Daily))',
+    ), (), (('macd_fast', 12), ('macd_slow', 26), ('macd_signal', 9))),
+    'Historical Returns': Component((
+        'self.AddAlpha(HistoricalReturnsAlphaModel({returns_lookback}, Resolution.Daily))',
+    ), (), (('returns_lookback', 14),)),
+    'Pairs Trading': Component((
+        'self.AddAlpha(PearsonCorrelationPairsTradingAlphaModel({pairs_lookback}, Resolution.Daily))',
+    ), (), (('pairs_lookback', 252),)),
+    'Mean Reversion IBS': Component((
+        'self.SetAlpha(MeanReversionIBSAlphaModel())',
+    ), (DATETIME,), classes=MEAN_REVERSION_IBS),
+    'Greenblatt Magic Formula': Component((
+        'self.SetAlpha(RateOfChangeAlphaModel())',
+    ), (DATETIME,), classes=RATE_OF_CHANGE),
+    'Mortgage Rate Volatility': Component((
+        'self.SetAlpha(MortgageRateVolatilityAlphaModel(self))',
+    ), (DATETIME, 'from QuantConnect.Python import PythonQuandl'), classes=MORTGAGE_RATE_VOLATILITY),
+    'Intraday Reversal': Component((
+        'self.SetAlpha(IntradayReversalAlphaModel(5, Resolution.Hour))',
+    ), (), classes=INTRADAY_REVERSAL),
+    'Triangular Arbitrage': Component((
+        'triangle = [self.AddForex(ticker, Resolution.Minute, Market.Oanda).Symbol for ticker in ["EURUSD", "EURGBP", "GBPUSD"]]',
+        'self.SetAlpha(ForexTriangleArbitrageAlphaModel(timedelta(minutes = 5), triangle))',
+    ), (DATETIME,), classes=TRIANGLE_ARBITRAGE),
+    'Dual Thrust': Component((
+        'self.k1 = 0.63',
+        'self.k2 = 0.63',
+        'self.rangePeriod = 20',
+        'self.consolidatorBars = 30',
+        'self.SetAlpha(DualThrustAlphaModel(self.k1, self.k2, self.rangePeriod, self.UniverseSettings.Resolution, self.consolidatorBars))',
+    ), (DATETIME, 'from collections import deque'), classes=DUAL_THRUST),
+    'None': NONE,
+}
+
+UNIVERSE = {
+    'Large Cap Equities': Component((
+        'self.SetUniverseSelection(QC500UniverseSelectionModel())',
+    ), ()),
+    'EMA Cross Universe': Component((
+        'fastPeriod = {universe_fast}',
+        'slowPeriod = {universe_slow}',
+        'count = {universe_count}',
+        'self.SetUniverseSelection(EmaCrossUniverseSelectionModel(fastPeriod, slowPeriod, count))',
+    ), (), (('universe_fast', 10), ('universe_slow', 30), ('universe_count', 10))),
+    'Coarse Universe': Component((
+        'self.__numberOfSymbols = 100',
+        'self.SetUniverseSelection(CoarseFundamentalUniverseSelectionModel(self.CoarseSelectionFunction))',
+    ), (), methods=COARSE_SELECTION),
+    'Coarse-Fine Universe': Component((
+        'self.__numberOfSymbols = 100',
+        'self.__numberOfSymbolsFine = 5',
+        'self.SetUniverseSelection(FineFundamentalUniverseSelectionModel(self.CoarseSelectionFunction, self.FineSelectionFunction, None, None))',
+    ), (), methods=COARSE_SELECTION + (
+        '',
+        'def FineSelectionFunction(self, fine):',
+        '    selected = sorted(fine, key = lambda x: x.ValuationRatios.PERatio, reverse = True)',
+        '    return [x.Symbol for x in selected[:self.__numberOfSymbolsFine]]',
+    )),
+    'Uncorrelated Universe': Component((
+        'self.SetUniverseSelection(UncorrelatedUniverseSelectionModel())',
+    ), ()),
+    'Options Universe': Component((
+        'self.SetUniverseSelection(OptionUniverseSelectionModel(timedelta(days = 1), self.SelectOptionChainSymbols))',
+    ), (DATETIME,), methods=(
+        'def SelectOptionChainSymbols(self, utcTime):',
+        '    return [Symbol.Create("SPY", SecurityType.Option, Market.USA, "?SPY")]',
+    )),
+    'Future Universe': Component((
+        'self.SetUniverseSelection(FutureUniverseSelectionModel(timedelta(days = 1), self.SelectFutureChainSymbols))',
+    ), (DATETIME,), methods=(
+        'def SelectFutureChainSymbols(self, utcTime):',
+        '    return [Symbol.Create("ES", SecurityType.Future, Market.CME)]',
+    )),
+    'Scheduled Universe': Component((
+        '# selection will run on mon/tues/thurs at 00:00/06:00/12:00/18:00',
+        'self.SetUniverseSelection(ScheduledUniverseSelectionModel(',
+        '    self.DateRules.Every(DayOfWeek.Monday, DayOfWeek.Tuesday, DayOfWeek.Thursday),',
+        '    self.TimeRules.Every(timedelta(hours = 12)),',
+        '    self.SelectSymbols',
+        '))',
+    ), (DATETIME,), methods=(
+        'def SelectSymbols(self, dateTime):',
+        '    return [Symbol.Create(ticker, SecurityType.Equity, Market.USA) for ticker in ["SPY", "QQQ", "IWM"]]',
+    )),
+    'Manual Selection': Component((
+        'symbols = [ Symbol.Create("SPY", SecurityType.Equity, Market.USA) ]',
+        'self.SetUniverseSelection( ManualUniverseSelectionModel(symbols) )',
+    ), ()),
+    'None': NONE,
+}
+
+PORTFOLIO = {
+    'Equal Weighting': Component((
+        'self.SetPortfolioConstruction(EqualWeightingPortfolioConstructionModel())',
+    ), ()),
+    'Mean-Variance': Component((
+        'self.SetPortfolioConstruction(MeanVarianceOptimizationPortfolioConstructionModel())',
+    ), ()),
+    'Black Litterman': Component((
+        'self.SetPortfolioConstruction(BlackLittermanOptimizationPortfolioConstructionModel())',
+    ), ()),
+    'Confidence Weighted Portfolio': Component((
+        'self.SetPortfolioConstruction(ConfidenceWeightedPortfolioConstructionModel())',
+    ), ()),
+    'None': NONE,
+}
+
+EXECUTION = {
+    'Immediate': Component((
+        'self.SetExecution(ImmediateExecutionModel())',
+    ), ()),
+    'VWAP': Component((
+        'self.SetExecution(VolumeWeightedAveragePriceExecutionModel())',
+    ), ()),
+    'Standard deviation': Component((
+        'self.SetExecution(StandardDeviationExecutionModel({deviation_period}, {deviations}, Resolution.Minute))',
+    ), (), (('deviation_period', 60), ('deviations', 2))),
+    'None': NONE,
+}
+
+RISK = {
+    'Maximum Drawdown': Component((
+        'self.SetRiskManagement(MaximumDrawdownPercentPerSecurity({max_drawdown}))',
+    ), (), (('max_drawdown', 0.01),)),
+    'Sector Exposure': Component((
+        'self.SetRiskManagement(MaximumSectorExposureRiskManagementModel())',
+    ), ()),
+    'Maximum Unrealized Profit Percent Per Security': Component((
+        'self.SetRiskManagement(MaximumUnrealizedProfitPercentPerSecurity(maximumUnrealizedProfitPercent = {max_profit}))',
+    ), (), (('max_profit', 0.1),)),
+    'Trailing Stop Risk Management Model': Component((
+        'self.SetRiskManagement(TrailingStopRiskManagementModel({trailing_stop}))',
+    ), (), (('trailing_stop', 0.01),)),
+    'None': NONE,
+}
+
+#sections in the order they are written in ``Initialize``
+CATALOG = (
+    ('alpha', ALPHA),
+    ('execution', EXECUTION),
+    ('portfolio', PORTFOLIO),
+    ('risk', RISK),
+    ('universe', UNIVERSE),
+)
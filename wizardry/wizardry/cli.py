@@ -1,1017 +1,552 @@
-from __future__ import print_function, unicode_literals, with_statement
-import typer
-import textwrap
-from contextlib import contextmanager
-try:
-    from StringIO import StringIO ## for Python 2
-except ImportError:
-    from io import StringIO ## for Python 3
-from PyInquirer import style_from_dict, Token, prompt, Separator
-from pprint import pprint
-import pathlib
-import os.path
-import requests
-import re
-import sys
-import subprocess
-import pkg_resources
-import os
-import shutil
-import sys
-from colorama import init
-init(strip=not sys.stdout.isatty())
-from termcolor import cprint
-from pyfiglet import figlet_format
-
-def urlify(s):
-
-    # Remove all non-word characters (everything except numbers and letters)
-    s = re.sub(r"[^\w\s]", '', s)
-
-    # Replace all runs of whitespace with a single dash
-    s = re.sub(r"\s+", '%20', s)
-
-    return s
-
-INDENT = ' ' * 4
-
-class IndentManager(object):
-    """
-    A context manager for indentation. Used internally by the source manager
-    to provide the indent context manager. And the indent and dedent methods.
-    """
-    def __init__(self, indent_with=INDENT):
-        self.indent_with = indent_with
-        self.level = 0
-
-    def __call__(self):
-        """
-        Raise the indentation level if this instance is called like a method.
-        """
-        self.indent()
-
-    def __str__(self):
-        """
-        self.indent_with multiplied by the current indentation level.
-        Used to indent strings to the correct depth.
-        """
-        return self.indent_with * self.level
-
-    def __enter__(self):
-        """
-        Start of an indentation context.
-        """
-        self.indent()
-        return self
-
-    def __exit__(self, *exc_info):
-        """
-        Ends of an indentation context, so dedent.
-        """
-        self.dedent()
-
-    def indent(self):
-        """Raise the indentation level by 1."""
-        self.level = self.level + 1
-        return self
-
-    def dedent(self):
-        """
-        Decrease the indentation level by one. If the indentation level is
-        already at zero a ``DedentException`` is raised.
-        """
-        if self.level == 0:
-            raise DedentException('Indent level is already at zero.')
-        self.level = self.level - 1
-
-    def reset(self):
-        """
-        Reset the indentation level to zero.
-        """
-        self.level = 0
-
-
-class SourceBuilder(object):
-    """
-    A basic source code writer.
-    Usage
-    -----
-    Create a SourceBuilder instance  and write code to it to line by line.
-    By using the ``indent`` context manager each line gets correctly indented
-    and the input indentation will resemble the output::
-      >>> sb = SourceBuilder()
-      >>> sb.writeln()
-      >>> sb.writeln('def hello_world():')
-      >>> with sb.indent:
-      ...     sb.writeln('print \'Hello World\'')
-      ...
-      ...
-      >>> sb.writeln()
-      >>> sb.writeln('hello_world()')
-      >>> source = sb.end()
-      >>> print source
-      def hello_world():
-          print 'Hello World'
-      hello_world()
-    If for some reason context managers can't be used ``indent`` also works
-    as a method. Combined with the ``dedent`` method code indentation levels
-    can be controlled manually.::
-      >>> sb = SourceBuilder()
-      >>> sb.writeln()
-      >>> sb.writeln('def hello_world():')
-      >>> sb.indent()
-      >>> sb.writeln('print \'Hello World\'')
-      >>> sb.dedent()
-      >>> sb.writeln()
-      >>> sb.writeln('hello_world()')
-      >>> source = sb.end()
-      >>> print source
-      def hello_world():
-           print 'Hello World'
-      hello_world()
-    It's not advised to use ``sb.indent`` in ``with`` statements in combination
-    with calls to ``sb.dedent()`` or ``sb.indent()``.
-    """
-    def __init__(self, indent_with=INDENT):
-        """
-        Initialize SourceBuilder, ``indent_with`` is set to 4 spaces
-        by default.
-        """
-        self._out = StringIO()
-        self.indent = IndentManager(indent_with=indent_with)
-
-    def write(self, code):
-        """
-        Write code at the current indentation level.
-        """
-        self._out.write(str(self.indent))
-        self._out.write(code)
-
-    def writeln(self, code=''):
-        """
-        Write a line at the current indentation level.
-        If no code is given only a newline is written.
-        """
-        if code:
-            self.write(code)
-        self._out.write('\n')
-
-    def dedent(self):
-        """
-        Decrease the current indentation level. Should only be used if
-        the indent context manager is not used.
-        Raises a ``DedentException`` if decreasing indentation level is not
-        possible.
-        """
-        self.indent.dedent()
-
-    def end(self):
-        """
-        Get the generated source and resets the indent level.
-        """
-        self.indent.reset()
-        return self._out.getvalue()
-
-    def truncate(self):
-        '''
-        Discard generated source and memory buffer and resets the indent level.
-        '''
-        if not self._out.closed:
-            self._out.close()
-        self._out = StringIO()
-        self.indent.reset()
-
-    def close(self):
-        '''
-        Convenience method for use with ``contextlib.closing``.
-        Calls ``self.truncate()``.
-        '''
-        self.truncate()
-
-
-INDENT = ' ' * 4
-TRIPLE_QUOTES = '"' * 3
-DOCSTRING_WIDTH = 72
-
-
-class PySourceBuilder(SourceBuilder):
-    """
-    A special SourceBuilder that provides some convenience context managers
-    for writing well formatted Python code.
-    """
-    def __init__(self, indent_with=INDENT):
-        super(PySourceBuilder, self).__init__(indent_with=indent_with)
-
-    @contextmanager
-    def block(self, code, lines_before=0):
-        """
-        A context manager for block structures. It's a generic way to start a
-        control structure (if, try, while, for etc.) or a class, function or
-        method definition.
-        The given ``code`` will be printed preceded by 0 or more blank lines,
-        controlled by the ``lines_before`` parameter. An indent context is
-        then started.
-        Example::
-            sb = PySourceBuilder()
-            >>>
-            >>> with sb.block('class Hello(object):', 2):
-            ...     with sb.block('def __init__(self, what=\'World\'):', 1):
-            ...         sb.writeln('pass')
-            ...
-            >>> print sb.end()
-            class Hello(object):
-                def __init__(self, what='World'):
-                    pass
-        """
-        for i in range(lines_before):
-            self.writeln()
-        self.writeln(code)
-        with self.indent:
-            yield
-
-    def docstring(self, doc, delimiter=TRIPLE_QUOTES, width=DOCSTRING_WIDTH):
-        """
-        Write a docstring. The given ``doc`` is surrounded by triple double
-        quotes (\"\"\"). This can be changed by passing a different
-        ``delimiter`` (e.g. triple single quotes).
-        The docstring is formatted to not run past 72 characters per line
-        (including indentation). This can be changed by passing a different
-        ``width`` parameter.
-        """
-        doc = textwrap.dedent(doc).strip()
-        max_width = width - len(str(self.indent))
-        lines = doc.splitlines()
-        if len(lines) == 1 and len(doc) < max_width - len(delimiter) * 2:
-            self.writeln(u'%s%s%s' % (delimiter, doc, delimiter))
-        else:
-            self.writeln(delimiter)
-            for line in lines:
-                if not line.strip():
-                    self.writeln()
-                for wrap in textwrap.wrap(line, max_width):
-                    self.writeln(wrap)
-            self.writeln()
-            self.writeln(delimiter)
-
-
-app = typer.Typer()
-
-@app.command()
-def framework():
-    print("\n")
-    text="The Algorithmic Wizard"
-    cprint(figlet_format(text, font="slant"), "yellow")
-    print("\n")
-    style = style_from_dict({
-        Token.Separator: '#cc5454',
-        Token.QuestionMark: '#673ab7 bold',
-        Token.Selected: '#ffba26',  # default
-        Token.Pointer: '#673ab7 bold',
-        Token.Instruction: '',  # default
-        Token.Answer: '#ffba26 bold',
-        Token.Question: '',
-    })
-    
-    print("Let's build a strategy!")
-    print("\n")
-    questions = [
-        {
-            'type': 'checkbox',
-            'message': 'Choose one or several alpha',
-            'name': 'alpha',
-            'choices': [
-                Separator('\n= Alpha ='),
-                {
-                    'name': 'RSI'
-                },
-                {
-                    'name': 'EMA Cross'
-                },
-                {
-                    'name': 'MACD'
-                },
-                {
-                    'name': 'Historical Returns'
-                },
-                {
-                    'name': 'Pairs Trading'
-                },
-                {
-                    'name': 'Mean Reversion IBS'
-                },
-                {
-                    'name': 'Greenblatt Magic Formula'
-                },
-                {
-                    'name': 'Mortgage Rate Volatility'
-                },
-                {
-                    'name': 'Intraday Reversal'
-                },
-                {
-                    'name': 'Triangular Arbitrage'
-                },
-                {
-                    'name': 'Dual Thrust'
-                },
-                {
-                    'name': 'None'
-                }
-            ],
-
-            'validate': lambda answer: 'You must choose one of these' \
-                if len(answer) == 0 else True
-
-        },
-        {
-            'type': 'list',
-            'message': 'Choose an universe',
-            'name': 'universe',
-            'choices': [
-                Separator('\n= Universe ='),
-
-                {
-                    'name': 'Large Cap Equities'
-                },
-                {
-                    'name': 'EMA Cross Universe'
-                },
-                {
-                    'name': 'Coarse Universe'
-                },
-                {
-                    'name': 'Coarse-Fine Universe'
-                },
-                {
-                    'name': 'Uncorrelated Universe'
-                },
-                {
-                    'name': 'Options Universe'
-                },
-                {
-                    'name': 'Future Universe'
-                },
-                {
-                    'name': 'Scheduled Universe'
-                },
-                {
-                    'name': 'Manual Selection'
-                },
-                {
-                    'name': 'None'
-                }
-            ],
-            'validate': lambda answer: 'You must choose at least one of these' \
-                if len(answer) == 0 else True
-        },
-
-        {
-            'type': 'list',
-            'message': 'Choose the construction of your portfolio',
-            'name': 'portfolio',
-            'choices': [
-                Separator('\n= Portfolio ='),
-                #self.SetPortfolioConstruction(ConfidenceWeightedPortfolioConstructionModel())
-                {
-                    'name': 'Equal Weighting'
-                },
-                {
-                    'name': 'Mean-Variance'
-                },
-                {
-                    'name': 'Black Litterman'
-                },
-                {
-                    'name': 'Confidence Weighted Portfolio'
-                },
-                {
-                    'name': 'None'
-                } #optimizer unconstrained, sharpe, min variance
-            ],
-            'validate': lambda answer: 'You must choose at least one of these' \
-                if len(answer) == 0 else True
-        },
-        {
-                'type': 'list',
-                'message': 'Choose the type of execution',
-                'name': 'execution',
-                'choices': [
-                    Separator('\n= Execution ='),
-                    {
-                        'name': 'Immediate'
-                    },
-                    {
-                        'name': 'VWAP'
-                    },
-                    {
-                        'name': 'Standard deviation'
-                    },
-                    {
-                        'name': 'None'
-                    }
-                ],
-                'validate': lambda answer: 'You must choose at least one of these' \
-                    if len(answer) == 0 else True
-            },
-                {
-                        'type': 'list',
-                        'message': 'Choose the type of risk management',
-                        'name': 'risk',
-                        'choices': [
-                            Separator('\n= Risk ='),
-                            {
-                                'name': 'Maximum Drawdown'
-                            },
-                            {
-                                'name': 'Sector Exposure'
-                            },
-                            {
-                                'name': 'Maximum Unrealized Profit Percent Per Security'
-                            },
-                            {
-                                'name': 'Trailing Stop Risk Management Model'
-                            },
-                            {
-                                'name': 'None'
-                            }
-                        ],
-                        'validate': lambda answer: 'You must choose at least one of these' \
-                            if len(answer) == 0 else True
-                    },
-                {
-                        'type': 'input',
-                        'message': 'Type the start date in this format YYYY, MM, DD (e.g : 2017, 1, 1)',
-                        'name': 'start',
-                        'validate': lambda answer: 'You must choose at least one of these' \
-                            if len(answer) == 0 else True
-                    },
-                {
-                        'type': 'input',
-                        'message': 'Set Strategy cash (e.g : 100000)',
-                        'name': 'cash',
-                        'validate': lambda answer: 'You must choose at least one of these' \
-                            if len(answer) == 0 else True
-                    },
-                {
-                        'type': 'confirm',
-                        'message': 'Build the strategy?',
-                        'name': 'build',
-                        'validate': lambda answer: 'You must choose at least one of these' \
-                            if len(answer) == 0 else True
-                    }
-    ]
-
-    answers = prompt(questions, style=style)
-
-    factors = []
-    for n in answers:
-        list = answers[n]
-        factors.append(list)
-
-
-    #code generation
-    sb = SourceBuilder()
-    sb.writeln('from System import *')
-    sb.writeln('from QuantConnect import *')
-    sb.writeln('from QuantConnect.Algorithm import *')
-    sb.writeln('from QuantConnect.Indicators import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework.Risk import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework.Alphas import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework.Selection import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework.Execution import *')
-    sb.writeln('from QuantConnect.Algorithm.Framework.Portfolio import *')
-    sb.writeln()
-
-
-    klasses = ['DancingBlueOwl']
-    for klass in klasses:
-         sb.writeln('class {0}(QCAlgorithm):'.format(klass))
-
-         sb.writeln()
-         with sb.indent:
-             sb.writeln('def Initialize(self):')
-             with sb.indent:
-
-                 sb.writeln('self.SetStartDate('+factors[5]+') # Set Start Date')
-                 sb.writeln('self.SetCash('+factors[6]+') # Set Strategy Cash')
-                 sb.writeln('#self.AddEquity("SPY", Resolution.Minute)')
-                 sb.writeln()
-
-                  #alpha
-                 if "RSI" in factors[0]:
-                   sb.writeln('self.AddAlpha(RsiAlphaModel(60, Resolution.Minute))')
-
-                 if "EMA Cross" in factors[0]:
-                   sb.writeln('self.AddAlpha(EmaCrossAlphaModel(50, 200, Resolution.Minute))')
-
-                 if "MACD" in factors[0]:
-                   sb.writeln('self.AddAlpha(MacdAlphaModel(12, 26, 9, MovingAverageType.Simple, Resolution.Daily))')
-
-                 if "Historical Returns" in factors[0]:
-                   sb.writeln('self.AddAlpha(HistoricalReturnsAlphaModel(14, Resolution.Daily))')
-
-                 if "Pairs Trading" in factors[0]:
-                   sb.writeln('self.AddAlpha(PearsonCorrelationPairsTradingAlphaModel(252, Resolution.Daily))')
-
-                 if "Mean Reversion IBS" in factors[0]:
-                   sb.writeln('self.SetAlpha(MeanReversionIBSAlphaModel())')
-
-                 if "Greenblatt Magic Formula" in factors[0]:
-                   sb.writeln('self.SetAlpha(RateOfChangeAlphaModel())')
-
-                 if "Mortgage Rate Volatility" in factors[0]:
-                   sb.writeln('self.SetAlpha(MortgageRateVolatilityAlphaModel(self))')
-
-                 if "Intraday Reversal" in factors[0]:
-                   sb.writeln('self.SetAlpha(IntradayReversalAlphaModel(5, resolution))')
-
-                 if "Triangular Arbitrage" in factors[0]:
-                   sb.writeln('self.SetAlpha(ForexTriangleArbitrageAlphaModel(Resolution.Minute, symbols))')
-
-                 if "Dual Thrust" in factors[0]:
-                   sb.writeln('self.SetAlpha(DualThrustAlphaModel(self.k1, self.k2, self.rangePeriod, self.UniverseSettings.Resolution, self.consolidatorBars))')
-
-                 if factors[0] == "None":
-                   pass
-
-                 sb.writeln()
-
-                 #execution
-                 if factors[3] == "Immediate":
-                   sb.writeln('self.SetExecution(ImmediateExecutionModel())')
-
-                 if factors[3] == "VWAP":
-                   sb.writeln('self.SetExecution(VolumeWeightedAveragePriceExecutionModel())')
-
-                 if factors[3] == "Standard deviation":
-                   sb.writeln('self.SetExecution(StandardDeviationExecutionModel(60, 2, Resolution.Minute))')
-
-                 if factors[3] == "None":
-                     pass
-
-                 sb.writeln()
-
-                 #portfolio
-
-                 if factors[2] == "Equal Weighting":
-                   sb.writeln('self.SetPortfolioConstruction(EqualWeightingPortfolioConstructionModel())')
-
-                 if factors[2] == "Mean-Variance":
-                   sb.writeln('self.SetPortfolioConstruction(MeanVarianceOptimizationPortfolioConstructionModel())')
-
-                 if factors[2] == "Black Litterman":
-                   sb.writeln('self.SetPortfolioConstruction(BlackLittermanOptimizationPortfolioConstructionModel())')
-
-                 if factors[2] == "Confidence Weighted Portfolio":
-                   sb.writeln('self.SetPortfolioConstruction(ConfidenceWeightedPortfolioConstructionModel())')
-
-
-                 if factors[2] == "None":
-                     pass
-
-                 sb.writeln()
-
-                 #risk management
-
-                 if factors[4] == "Maximum Drawdown":
-                   sb.writeln('self.SetRiskManagement(MaximumDrawdownPercentPerSecurity(0.01))')
-
-                 if factors[4] == "Sector Exposure":
-                   sb.writeln('self.SetRiskManagement(MaximumSectorExposureRiskManagementModel())')
-
-                 if factors[4] == "Maximum Unrealized Profit Percent Per Security":
-                   sb.writeln('self.SetRiskManagement(MaximumUnrealizedProfitPercentPerSecurity(maximumUnrealizedProfitPercent = 0.1))')
-
-                 if factors[4] == "Trailing Stop Risk Management Model":
-                   sb.writeln('self.SetRiskManagement(TrailingStopRiskManagementModel(0.01))')
-
-
-
-                 if factors[4] == "None":
-                     pass
-
-                 sb.writeln()
-
-
-
-
-                 #universe
-
-                 if factors[1] == "Large Cap Equities":
-                   sb.writeln('self.SetUniverseSelection(QC500UniverseSelectionModel())')
-
-                 if factors[1] == "Uncorrelated Universe":
-                   sb.writeln('self.SetUniverseSelection(UncorrelatedUniverseSelectionModel())')
-
-                 if factors[1] == "Options Universe":
-                   sb.writeln('self.SetUniverseSelection(OptionsUniverseSelectionModel())')
-
-                 if factors[1] == "Future Universe":
-                   sb.writeln('self.SetUniverseSelection(FutureUniverseSelectionModel())')
-
-                 if factors[1] == "EMA Cross Universe":
-                   sb.writeln('fastPeriod = 10')
-                   sb.writeln('slowPeriod = 30')
-                   sb.writeln('count = 10')
-                   sb.writeln('self.SetUniverseSelection(EmaCrossUniverseSelectionModel(fastPeriod, slowPeriod, count))')
-
-                 if factors[1] == "Coarse Universe":
-                   sb.writeln('self.SetUniverseSelection(CoarseFundamentalUniverseSelectionModel(self.CoarseSelectionFunction))')
-
-                 if factors[1] == "Coarse-Fine Universe":
-                   sb.writeln('self.__numberOfSymbols = 100')
-                   sb.writeln('self.__numberOfSymbolsFine = 5')
-                   sb.writeln('self.SetUniverseSelection(FineFundamentalUniverseSelectionModel(self.CoarseSelectionFunction, self.FineSelectionFunction, None, None))')
-
-                 if factors[1] == "Scheduled Universe":
-                   sb.writeln('# selection will run on mon/tues/thurs at 00:00/06:00/12:00/18:00')
-                   sb.writeln('self.SetUniverseSelection(ScheduledUniverseSelectionModel(')
-                   with sb.indent:
-                              sb.writeln('self.DateRules.Every(DayOfWeek.Monday, DayOfWeek.Tuesday, DayOfWeek.Thursday),')
-                              sb.writeln('self.TimeRules.Every(timedelta(hours = 12)),')
-                              sb.writeln('self.SelectSymbols')
-                   sb.writeln('))')
-
-                 if factors[1] == "Manual Selection":
-                   sb.writeln('symbols = [ Symbol.Create("SPY", SecurityType.Equity, Market.USA) ]')
-                   sb.writeln('self.SetUniverseSelection( ManualUniverseSelectionModel(symbols) )')
-
-                 if factors[1] == "None":
-                     pass
-
-
-                 sb.writeln()
-                 sb.writeln()
-         with sb.indent:
-          sb.writeln('def OnData(self, data):')
-          with sb.indent:
-                 sb.writeln('# if not self.Portfolio.Invested:')
-                 sb.writeln('#    self.SetHoldings("SPY", 1)')
-
-
-    source = sb.end()
-
-    if os.path.isfile('main.py'):
-        os.remove('main.py')
-    else:
-        pass
-
-    with open('main.py', 'a') as file:
-        print(source, file=file)
-    print("Just created the main.py file!")
-    os.system('lean cloud push')
-
-
-@app.command()
-def library():
-        print("\n")
-        text="The Catalog"
-        cprint(figlet_format(text, font="slant"), "yellow")
-        print("\n")
-        style = style_from_dict({
-            Token.Separator: '#cc5454',
-            Token.QuestionMark: '#673ab7 bold',
-            Token.Selected: '#ffba26',  # default
-            Token.Pointer: '#673ab7 bold',
-            Token.Instruction: '',  # default
-            Token.Answer: '#ffba26 bold',
-            Token.Question: '',
-        })
-
-        questions = [
-            {
-                'type': 'list',
-                'message': 'Choose one of these algorithm from Quantconnect library',
-                'name': 'catalog',
-                'choices': [
-                    Separator('\n= Our Super Catalog ='),
-                    {
-                        'name': 'Simple RSI Strategy'
-                    },
-                    {
-                        'name': 'Sentiment analysis'
-                    },
-                    {
-                        'name': 'Combining Mean Reversion and Momentum in Forex Market'
-                    },
-                    {
-                        'name': 'CAPM Alpha Ranking Strategy on Dow 30 Companies'
-                    },
-                    {
-                        'name': 'Pairs Trading Copula Method'
-                    },
-                    {
-                        'name': 'Pairs Trading Cointegration Method'
-                    },
-                    {
-                        'name': 'Dynamic Breakout II'
-                    },
-                    {
-                        'name': 'Dual Thrust'
-                    },
-                    {
-                        'name': 'Use Crude Oil to Predict Equity Returns'
-                    },
-                    {
-                        'name': 'Intraday Dynamic Pairs Trading using Correlation and Cointegration Approach'
-                    },
-                    {
-                        'name': 'Momentum Strategy Based on the Low Frequency Component of Forex Market'
-                    },
-                    {
-                        'name': 'Stock Selection Strategy Based on Fundamental Factors'
-                    },
-                    {
-                        'name': 'Fundamental Factor Long Short Strategy'
-                    },
-                    {
-                        'name': 'Short-Term Reversal Strategy in Stocks'
-                    },
-                    {
-                        'name': 'Asset Class Trend Following'
-                    },
-                    {
-                        'name': 'Asset Class Momentum'
-                    },
-                    {
-                        'name': 'Sector Momentum'
-                    },
-                    {
-                        'name': 'Overnight Anomaly'
-                    },
-                    {
-                        'name': 'Forex Carry Trade'
-                    },
-                    {
-                        'name': 'Volatility Effect in Stocks'
-                    },
-                    {
-                        'name': 'Forex Momentum'
-                    },
-                    {
-                        'name': 'Pairs Trading with Stocks'
-                    },
-                    {
-                        'name': 'Short Term Reversal'
-                    },
-                    {
-                        'name': 'Momentum Effects in Stocks'
-                    },
-                    {
-                        'name': 'Momentum Effect in Country Equity Indexes'
-                    },
-                    {
-                        'name': 'Mean Reversion Effect in Country Equity Indexes'
-                    },
-                    {
-                        'name': 'Paired Switching'
-                    },
-                    {
-                        'name': 'Small Capitalization Stocks Premium Anomaly'
-                    },
-                    {
-                        'name': 'Liquidity Effect in Stocks'
-                    },
-                    {
-                        'name': 'Volatility Risk Premium Effect'
-                    },
-                    {
-                        'name': 'Momentum Effect in Commodities Futures'
-                    },
-                    {
-                        'name': 'Book-to-Market Value Anomaly'
-                    },
-                    {
-                        'name': 'Term Structure Effect in Commodities'
-                    },
-                    {
-                        'name': 'Gold Market Timing'
-                    },
-                    {
-                        'name': 'Turn of the Month in Equity Indexes'
-                    },
-                    {
-                        'name': 'Momentum-Short Term Reversal Strategy'
-                    },
-                    {
-                        'name': 'Pairs Trading with Country ETFs'
-                    },
-                    {
-                        'name': 'Accrual Anomaly'
-                    },
-                    {
-                        'name': 'Asset Growth Effect'
-                    },
-                    {
-                        'name': 'Momentum and State of Market Filters'
-                    },
-                    {
-                        'name': 'Sentiment and Style Rotation Effect in Stocks'
-                    },
-                    {
-                        'name': 'Momentum and Style Rotation Effect'
-                    },
-                    {
-                        'name': 'Trading with WTI BRENT Spread'
-                    },
-                    {
-                        'name': 'ROA Effect within Stocks'
-                    },
-                    {
-                        'name': 'Momentum Effect in REITs'
-                    },
-                    {
-                        'name': 'Option Expiration Week Effect'
-                    },
-                    {
-                        'name': 'January Effect in Stocks'
-                    },
-                    {
-                        'name': 'Momentum and Reversal Combined with Volatility Effect in Stock'
-                    },
-                    {
-                        'name': 'Earnings Quality Factor'
-                    },
-                    {
-                        'name': 'January Barometer'
-                    },
-                    {
-                        'name': 'Lunar Cycle in Equity Market'
-                    },
-                    {
-                        'name': 'VIX Predicts Stock Index Returns'
-                    },
-                    {
-                        'name': 'Combining Momentum Effect with Volume'
-                    },
-                    {
-                        'name': 'Short Term Reversal with Futures'
-                    },
-                    {
-                        'name': 'Pre-Holiday Effect'
-                    },
-                    {
-                        'name': 'Beta Factors in Stocks'
-                    },
-                    {
-                        'name': 'Price Earnings Anomaly'
-                    },
-                    {
-                        'name': 'Exploiting Term Structure of VIX Futures'
-                    },
-                    {
-                        'name': '12 Month Cycle in Cross-Section of Stocks Returns'
-                    },
-                    {
-                        'name': 'Momentum Effect in Stocks in Small Portfolios'
-                    },
-                    {
-                        'name': 'Value Effect within Countries'
-                    },
-                    {
-                        'name': 'Standardized Unexpected Earnings'
-                    },
-                    {
-                        'name': 'Seasonality Effect based on Same-Calendar Month Returns'
-                    },
-                    {
-                        'name': 'Risk Premia in Forex Markets'
-                    },
-                    {
-                        'name': 'Expected Idiosyncratic Skewness'
-                    },
-                    {
-                        'name': 'Mean-Reversion Statistical Arbitrage Strategy in Stocks'
-                    },
-                    {
-                        'name': 'Fama French Five Factors'
-                    },
-                    {
-                        'name': 'Improved Momentum Strategy on Commodities Futures'
-                    },
-                    {
-                        'name': 'Commodities Futures Trend Following'
-                    },
-                    {
-                        'name': 'G-Score Investing'
-                    },
-                    {
-                        'name': 'Benzinga News Algorithm'
-                    },
-                    {
-                        'name': 'Cached Alternative Data Algorithm'
-                    },
-                    {
-                        'name': 'SEC Report 8K Algorithm'
-                    },
-                    {
-                        'name': 'Smart Insider Transaction Algorithm'
-                    },
-                    {
-                        'name': 'Tiingo News Algorithm'
-                    },
-                    {
-                        'name': 'Trading Economics Algorithm'
-                    },
-                    {
-                        'name': 'US Treasury Yield Curve Rate Algorithm'
-                    },
-                ],
-
-
-
-                'validate': lambda answer: 'You must choose one of these' \
-                    if len(answer) == 0 else True
-
-            }]
-        answers = prompt(questions, style=style)
-        for n in answers:
-            strategy = answers[n]
-
-        strategy = urlify(strategy)
-        filename = "%s.py" % strategy
-        url = "https://raw.githubusercontent.com/ssantoshp/StrategyLibraryQC/main/"+filename
-        response = requests.get(url)
-        if os.path.isfile('main.py'):
-            os.remove('main.py')
-        else:
-            pass
-        with open('main.py', 'a') as file:
-            print(response.text, file=file)
-        print("Just created the main.py file!")
-        print("\n")
-        print("You can also find the code here: "+url)
-        os.system('lean cloud push')
-    
-
-
-
-@app.command()
-def create(name: str):
-    print("\n")
-    text="Quantconnect"
-    cprint(figlet_format(text, font="slant"), "yellow")
-    print("\n")
-    try:
-        os.system('lean create-project "'+ name +'"')
-    except:
-        os.system('lean login')
-        os.system('lean create-project "'+ name +'"')
-    print("\n")
-    os.system('lean cloud push --project "'+ name +'"')
-
-@app.command()
-def backtest():
-    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
-    CURR_DIR = os.getcwd()
-    way = os.path.dirname(CURR_DIR)
-    os.chdir(way)
-    try:
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud backtest "'+ path +'" --push --open')
-    except:
-        os.system('lean login')
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud backtest "'+ path +'" --push --open')
-    print("\n")
-    
-
-@app.command()
-def live():
-    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
-    CURR_DIR = os.getcwd()
-    way = os.path.dirname(CURR_DIR)
-    os.chdir(way)
-    try:
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud live "'+ path +'" --push --open')
-    except:
-        os.system('lean login')
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud live "'+ path +'" --push --open')
-    
-    print("\n")
-
-@app.command()
-def optimize():
-    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
-    CURR_DIR = os.getcwd()
-    way = os.path.dirname(CURR_DIR)
-    os.chdir(way)
-    try:
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud optimize "'+ path +'" --push')
-    except:
-        os.system('lean login')
-        os.system('lean cloud push --project "'+ path +'"')
-        os.system('lean cloud optimize "'+ path +'" --push')
-    
-    print("\n")
-
-
-
-
-    
-
-
+from __future__ import print_function, unicode_literals, with_statement
+import time
+_STARTED = time.perf_counter()
+import typer
+from typing import List
+import pathlib
+import os.path
+import os
+
+from wizardry.builder import SourceBuilder, PySourceBuilder
+from wizardry.manifest import push_project
+from wizardry.runner import run_lean
+from wizardry.trace import TRACER, span
+_IMPORTED = time.perf_counter()
+
+
+def banner(text):
+    """
+    Draw ``text`` as a figlet banner. colorama, termcolor and pyfiglet (and
+    its fonts) are only loaded here, so commands that never draw a banner
+    don't pay for them.
+    """
+    import sys
+    from colorama import init
+    from termcolor import cprint
+    from pyfiglet import figlet_format
+    init(strip=not sys.stdout.isatty())
+    print("\n")
+    cprint(figlet_format(text, font="slant"), "yellow")
+    print("\n")
+
+
+def report_source(status):
+    """Tell what ``write_source`` did to main.py."""
+    print({
+        'created': "Just created the main.py file!",
+        'updated': "Just updated the generated parts of main.py, the rest of it is untouched!",
+        'replaced': "Just replaced the main.py file, the previous one is in main.py.bak!",
+        'unchanged': "main.py is already up to date.",
+    }[status])
+
+
+def exit_on_failure(code, command):
+    """Stop with the exit code of ``command`` when it failed."""
+    if code:
+        typer.echo("%s failed with exit code %d." % (command, code), err=True)
+        raise typer.Exit(code if code > 0 else 1)
+
+
+def check_directory(directory):
+    """Print the problems of the project in ``directory``, return whether none is an error."""
+    from wizardry.validate import check_project, format_problem
+    problems = check_project(directory)
+    for path, problem in problems:
+        typer.echo(format_problem(path, problem), err=True)
+    return not any(not problem.warning for _, problem in problems)
+
+app = typer.Typer()
+
+@app.callback()
+def main(ctx: typer.Context,
+         trace: str = typer.Option(None, help="Write the timings of the command to this file, in Chrome trace format or as JSON lines if it ends with .jsonl.")):
+    TRACER.add('import', _STARTED, _IMPORTED)
+    started = time.perf_counter()
+    def finish():
+        TRACER.add('command', started, time.perf_counter())
+        if ctx.invoked_subcommand != 'stats':
+            TRACER.record(ctx.invoked_subcommand)
+        if trace:
+            TRACER.export(trace)
+    ctx.call_on_close(finish)
+
+@app.command()
+def framework(spec: str = typer.Option(None, help="Generate every variant of a YAML/JSON spec file, without prompts."),
+              out_dir: str = typer.Option("variants", help="Directory receiving the variants of --spec."),
+              parameterized: bool = typer.Option(False, "--parameterized", help="Read the constants of the components from the parameters of config.json."),
+              no_check: bool = typer.Option(False, "--no-check", help="Push without checking main.py offline first.")):
+    if spec:
+        from wizardry.batch import SpecError, generate_variants
+        try:
+            with span('codegen') as attributes:
+                count = attributes['variants'] = generate_variants(spec, out_dir, parameterized)
+        except SpecError as e:
+            typer.echo("Invalid spec: %s" % e, err=True)
+            raise typer.Exit(1)
+        print("Just created %d variants in %s!" % (count, out_dir))
+        return
+
+    banner("The Algorithmic Wizard")
+    print("Let's build a strategy!")
+    print("\n")
+    from wizardry import prompts
+    with span('prompt'):
+        answers = prompts.prompt(prompts.framework_questions, style=prompts.style)
+
+    from wizardry.codegen import config_parameters, generate
+    from wizardry.project import update_config, write_source
+    with span('codegen'):
+        source = generate(answers, parameterized)
+        if parameterized:
+            update_config(os.getcwd(), config_parameters(answers))
+        status = write_source(os.getcwd(), source + '\n')
+    report_source(status)
+    if not no_check:
+        with span('check'):
+            valid = check_directory(os.getcwd())
+        if not valid:
+            typer.echo("Not pushing main.py, it would fail in the cloud (--no-check to push anyway).", err=True)
+            raise typer.Exit(1)
+    push_project(os.getcwd())
+
+
+library_app = typer.Typer(help="Explore and fork strategies of the QuantConnect library.")
+app.add_typer(library_app, name="library")
+
+cache_app = typer.Typer(help="Inspect and prune the local strategy cache.")
+library_app.add_typer(cache_app, name="cache")
+
+
+@library_app.callback(invoke_without_command=True)
+def library(ctx: typer.Context,
+            offline: bool = typer.Option(False, help="Only use strategies from the local cache, no network.")):
+        if ctx.invoked_subcommand is not None:
+            return
+        banner("The Catalog")
+        from wizardry import prompts
+        with span('prompt'):
+            answers = prompts.prompt(prompts.library_questions, style=prompts.style)
+        for n in answers:
+            strategy = answers[n]
+
+        from wizardry.library import LibraryError, fetch, load_manifest, strategy_url
+        url = strategy_url(strategy)
+        sha256 = None if offline else load_manifest().get(strategy_url(strategy, ''))
+        try:
+            source = fetch(url, offline=offline, sha256=sha256)
+        except LibraryError as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(1)
+        from wizardry.project import write_source
+        report_source(write_source(os.getcwd(), source))
+        print("\n")
+        print("You can also find the code here: "+url)
+        push_project(os.getcwd())
+
+
+@library_app.command()
+def sync(workers: int = typer.Option(8, help="Number of strategies downloaded at the same time.")):
+    from wizardry.library import STRATEGIES, sync as sync_library
+    from wizardry.search import SearchIndex
+    with typer.progressbar(length=len(STRATEGIES), label="Syncing the catalog") as bar:
+        summary = sync_library(workers=workers, progress=lambda: bar.update(1))
+    SearchIndex().update()
+    print("%d downloaded, %d already up to date." % (summary['downloaded'], summary['unchanged']))
+    for name, error in summary['failed']:
+        typer.echo("Failed: %s (%s)" % (name, error), err=True)
+    if summary['failed']:
+        raise typer.Exit(1)
+
+
+@library_app.command()
+def search(query: str,
+           limit: int = typer.Option(10, help="Maximum number of strategies to show."),
+           json: bool = typer.Option(False, "--json", help="Print the results as JSON.")):
+    from wizardry.search import SearchIndex
+    index = SearchIndex()
+    index.update()
+    results = index.search(query, limit=limit)
+    if json:
+        import json as json_module
+        print(json_module.dumps(results, indent=2))
+        return
+    if not results:
+        print("No strategy matches %r." % query)
+    for result in results:
+        print("%7.2f  %s  [%s]" % (result['score'], result['name'], ', '.join(result['tags'] + result['assets'])))
+
+
+@library_app.command()
+def manifest(directory: str = typer.Argument(..., help="Directory of the strategy files to publish.")):
+    from wizardry.library import MANIFEST, write_manifest
+    count = write_manifest(directory)
+    print("Wrote the checksums of %d strategies to %s" % (count, os.path.join(directory, MANIFEST)))
+
+
+@cache_app.command()
+def stats():
+    from wizardry.cache import StrategyCache
+    info = StrategyCache().stats()
+    print("Cache directory: %s" % info['root'])
+    print("Strategies: %d (%d distinct files)" % (info['entries'], info['blobs']))
+    print("Size: %.1f KB of %.1f KB" % (info['size'] / 1024.0, info['max_size'] / 1024.0))
+
+
+@cache_app.command()
+def prune(max_size: int = typer.Option(None, help="Size in bytes to shrink the cache to, defaults to the cache limit.")):
+    from wizardry.cache import StrategyCache
+    evicted = StrategyCache().prune(max_size)
+    print("Evicted %d strategies from the cache." % evicted)
+
+
+results_app = typer.Typer(help="Collect and compare the results of local backtests.")
+app.add_typer(results_app, name="results")
+
+
+@results_app.command()
+def ingest(paths: List[str] = typer.Argument(..., help="Result JSON files or lean output directories."),
+           project: str = typer.Option(None, help="Project to file the results under, guessed from their path by default.")):
+    from wizardry.results import ResultStore
+    missing = []
+    added = ResultStore().ingest(paths, project=project, missing=missing)
+    for path in missing:
+        typer.echo("No such file or directory: %s" % path, err=True)
+    for name, count in sorted(added.items()):
+        print("%s: %d new runs" % (name, count))
+    if not added:
+        print("No new results found.")
+    if missing:
+        raise typer.Exit(1)
+
+
+@results_app.command()
+def query(where: List[str] = typer.Option(None, help="Condition on a statistic, e.g. 'sharpe_ratio>1', can be repeated."),
+          project: str = typer.Option("*", help="Glob of the projects to query."),
+          columns: str = typer.Option(None, help="Comma separated columns to show, e.g. 'project,run,sharpe_ratio'."),
+          sort: str = typer.Option(None, help="Column to sort by, prefixed with - for descending order."),
+          limit: int = typer.Option(20, help="Maximum number of runs to show."),
+          aggregate: bool = typer.Option(False, "--aggregate", help="Show the count, mean, min and max per project instead of runs."),
+          json: bool = typer.Option(False, "--json", help="Print the results as JSON.")):
+    from wizardry.results import DEFAULT_COLUMNS, ResultStore, ResultsError, format_table
+    columns = [column.strip() for column in columns.split(',')] if columns else list(DEFAULT_COLUMNS)
+    store = ResultStore()
+    try:
+        if aggregate:
+            rows = store.aggregate(columns, where=where or (), projects=project)
+        else:
+            rows = store.query(where=where or (), columns=columns, projects=project, sort=sort, limit=limit)
+    except ResultsError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    if json:
+        import json as json_module
+        print(json_module.dumps(rows, indent=2))
+        return
+    if aggregate:
+        stats = [column for column in columns if column not in ('project', 'run')]
+        header = ['project', 'runs'] + ['%s_%s' % (column, name) for column in stats for name in ('mean', 'min', 'max')]
+        rows = [dict({'project': row['project'], 'runs': row['runs']},
+                     **{'%s_%s' % (column, name): row[column][name] for column in stats for name in ('mean', 'min', 'max')})
+                for row in rows]
+        columns = header
+    for line in format_table(rows, columns):
+        print(line)
+
+
+@results_app.command()
+def curve(project: str, run: str):
+    import datetime
+    from wizardry.results import ResultStore, ResultsError
+    try:
+        times, values = ResultStore().curve(project, run)
+    except ResultsError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    print("time,equity")
+    for time, value in zip(times, values):
+        print("%s,%s" % (datetime.datetime.fromtimestamp(int(time), datetime.timezone.utc).isoformat(), value))
+
+
+@app.command()
+def check(directories: List[str] = typer.Argument(None, help="Project directories (or globs, e.g. 'variants/*') to check, the current one by default.")):
+    import glob
+    paths = [path for pattern in directories or [os.getcwd()] for path in sorted(glob.glob(pattern)) if os.path.isdir(path)]
+    if not paths:
+        typer.echo("No project matches %s." % ', '.join(directories), err=True)
+        raise typer.Exit(1)
+    failed = [path for path in paths if not check_directory(path)]
+    if failed:
+        typer.echo("%d of %d projects would fail in the cloud." % (len(failed), len(paths)), err=True)
+        raise typer.Exit(1)
+    print("No problem found in %d project%s." % (len(paths), 's' if len(paths) > 1 else ''))
+
+@app.command()
+def screen(data: str = typer.Argument(None, help="Daily bars: a directory of per-symbol CSV files or lean zips, or one CSV/Parquet file with symbol, date and close columns. Defaults to the daily US equities of the lean.json data folder."),
+           alpha: List[str] = typer.Option(None, help="Alpha to screen (RSI, EMA Cross, MACD, Historical Returns), can be repeated, all of them by default."),
+           parameter: List[str] = typer.Option(None, help="Values of a parameter to try, e.g. 'rsi_period=14,30,60', can be repeated."),
+           top: int = typer.Option(20, help="Number of variants to show."),
+           json: bool = typer.Option(False, "--json", help="Print the results as JSON.")):
+    import time
+    from wizardry.screen import ALPHAS, ScreenError, default_data, load_bars, parse_values, screen as screen_variants, variants
+    from wizardry.results import format_table
+    try:
+        data = data or default_data(os.getcwd())
+        started = time.perf_counter()
+        with span('load'):
+            bars = load_bars(data)
+        parameters = dict(parse_values(text) for text in parameter or [])
+        candidates = list(variants(alpha or list(ALPHAS), parameters))
+        with span('screen') as attributes:
+            rows = screen_variants(bars, candidates)
+            attributes.update(symbols=len(bars.symbols), days=len(bars.dates), variants=len(rows))
+    except ScreenError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    if json:
+        import json as json_module
+        print(json_module.dumps(rows[:top], indent=2))
+        return
+    print("%d variants on %d symbols over %d days in %.1fs, no costs, best first:"
+          % (len(rows), len(bars.symbols), len(bars.dates), time.perf_counter() - started))
+    for line in format_table(rows[:top], ['alpha', 'parameters', 'sharpe', 'return', 'hit_rate', 'exposure', 'turnover']):
+        print(line)
+
+@app.command()
+def simulate(data: str = typer.Argument(None, help="Daily bars, as for wizardry screen. Defaults to the daily US equities of the lean.json data folder."),
+             portfolio: List[str] = typer.Option(None, help="Portfolio model to simulate (Equal Weighting, Confidence Weighted Portfolio, Mean-Variance, Black Litterman), can be repeated, all of them by default."),
+             risk: List[str] = typer.Option(None, help="Risk model to simulate (None, Maximum Drawdown, Maximum Unrealized Profit Percent Per Security, Trailing Stop Risk Management Model), can be repeated, all of them by default."),
+             alpha: List[str] = typer.Option(None, help="Alpha giving the insights, can be repeated. Every symbol is long without any."),
+             universes: int = typer.Option(1, help="Number of random universes to simulate."),
+             size: int = typer.Option(None, help="Symbols in each universe, all of them by default."),
+             seed: int = typer.Option(0, help="Seed of the random universes."),
+             rebalance: int = typer.Option(21, help="Days between rebalances."),
+             lookback: int = typer.Option(63, help="Days of returns of the covariance."),
+             limit: List[str] = typer.Option(None, help="Limit of a risk model, e.g. 'max_drawdown=0.05', can be repeated."),
+             weights: str = typer.Option(None, help="Save the target weights of every rebalance to this .npz file."),
+             json: bool = typer.Option(False, "--json", help="Print the results as JSON.")):
+    import time
+    from wizardry.screen import ScreenError, default_data, load_bars, parse_values
+    from wizardry.simulate import PORTFOLIOS, RISKS, SimulationError, sample_universes, simulate as simulate_models
+    from wizardry.results import format_table
+    try:
+        data = data or default_data(os.getcwd())
+        started = time.perf_counter()
+        with span('load'):
+            bars = load_bars(data)
+        limits = {}
+        for text in limit or []:
+            name, values = parse_values(text)
+            if name not in RISKS.values() or len(values) != 1:
+                raise SimulationError("invalid limit %r, expected e.g. 'max_drawdown=0.05'" % text)
+            limits[name] = values[0]
+        members = sample_universes(len(bars.symbols), universes, size, seed)
+        paths = {} if weights else None
+        with span('simulate') as attributes:
+            rows = simulate_models(bars, portfolio or PORTFOLIOS, risk or tuple(RISKS), tuple(alpha or ()), members,
+                                   rebalance, lookback, limits, weights=paths)
+            attributes.update(symbols=len(bars.symbols), days=len(bars.dates), universes=len(members))
+    except (ScreenError, SimulationError) as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    if weights:
+        import numpy
+        numpy.savez_compressed(weights, symbols=numpy.array(bars.symbols), members=members,
+                               **{name.lower().replace(' ', '_').replace('-', '_'): path for name, path in paths.items()})
+    if json:
+        import json as json_module
+        print(json_module.dumps(rows, indent=2))
+        return
+    print("%d universes of %d symbols over %d days in %.1fs, annualized, averaged over the universes:"
+          % (len(members), int(members.sum(axis=1).max()), len(bars.dates), time.perf_counter() - started))
+    for line in format_table(rows, ['portfolio', 'risk', 'return', 'volatility', 'sharpe', 'drawdown', 'turnover', 'stops', 'iterations']):
+        print(line)
+
+@app.command("stats")
+def phase_stats(command: str = typer.Option(None, help="Only summarize the runs of this command, e.g. backtest."),
+                runs: int = typer.Option(50, help="Number of recent runs to summarize.")):
+    from wizardry.trace import load_history, summarize
+    history = load_history(command=command, runs=runs)
+    if not history:
+        print("No run recorded yet.")
+        return
+    print("Timings of the last %d runs%s, in seconds:" % (len(history), " of %s" % command if command else ""))
+    print("%-28s %7s %9s %9s %10s" % ('phase', 'count', 'p50', 'p95', 'total'))
+    for row in summarize(history):
+        print("%-28s %7d %9.3f %9.3f %10.3f" % (row['phase'], row['count'], row['p50'], row['p95'], row['total']))
+
+@app.command()
+def serve():
+    from wizardry.serve import serve as serve_lean
+    serve_lean()
+
+
+@app.command()
+def create(name: str = typer.Argument(None),
+           from_list: str = typer.Option(None, "--from-list", help="File listing the names of the projects to create, one per line."),
+           push: bool = typer.Option(False, "--push", help="Register the new projects in the cloud now instead of at their first push."),
+           concurrency: int = typer.Option(8, help="Number of projects created (and pushed, with --push) at the same time.")):
+    from wizardry.scaffold import create_projects, read_names
+    if (name is None) == (from_list is None):
+        typer.echo("Give either a project name or --from-list.", err=True)
+        raise typer.Exit(1)
+    if from_list is None:
+        banner("Quantconnect")
+        names = [name]
+    else:
+        try:
+            names = read_names(from_list)
+        except OSError as e:
+            typer.echo("Can't read %s: %s" % (from_list, e), err=True)
+            raise typer.Exit(1)
+    started = time.monotonic()
+    created = []
+    for project, (directory, error) in zip(names, create_projects(names, workers=concurrency)):
+        if error:
+            typer.echo("%s: %s" % (project, error), err=True)
+        else:
+            created.append(directory)
+    if created:
+        print("Created %d project(s) in %.2fs." % (len(created), time.monotonic() - started))
+    if push and created:
+        from wizardry.manifest import push_projects
+        failed = sum(1 for code in push_projects(created, concurrency) if code)
+        if failed:
+            typer.echo("lean cloud push failed for %d project(s)." % failed, err=True)
+            raise typer.Exit(1)
+    if len(created) < len(names):
+        raise typer.Exit(1)
+
+@app.command()
+def dedupe(projects: List[str] = typer.Argument(..., help="Globs of project directories to deduplicate (e.g. 'variants/*').")):
+    from wizardry.manifest import dedupe_projects
+    from wizardry.scheduler import find_projects
+    from wizardry.store import ContentStore
+    directories = find_projects(projects)
+    if not directories:
+        typer.echo("No project matches %s." % ' '.join(projects), err=True)
+        raise typer.Exit(1)
+    store = ContentStore()
+    linked, saved = dedupe_projects(directories, store)
+    store.prune()
+    print("Cloned %d identical files of %d projects, %.1f kB freed." % (linked, len(directories), saved / 1024))
+
+@app.command()
+def backtest(force_push: bool = typer.Option(False, "--force-push", help="Push even if no file changed since the last push."),
+             projects: List[str] = typer.Option(None, help="Glob of project directories to backtest in parallel (e.g. 'variants/*'), can be repeated."),
+             concurrency: int = typer.Option(4, help="Number of backtests running at the same time with --projects."),
+             rate_limit: float = typer.Option(30, help="Maximum number of lean commands started per minute with --projects."),
+             timeout: float = typer.Option(3600, help="Seconds before a backtest of --projects is given up and retried."),
+             retries: int = typer.Option(1, help="Number of retries of a failed backtest with --projects."),
+             output: str = typer.Option("backtests.csv", help="Summary table of --projects, .csv or .parquet."),
+             local: bool = typer.Option(False, "--local", help="Backtest with lean backtest on the data folder of lean.json instead of the cloud."),
+             no_cache: bool = typer.Option(False, "--no-cache", help="With --local, run again even if an identical backtest is stored.")):
+    if local:
+        import time
+        from wizardry.memo import BacktestError, local_backtest
+        try:
+            result, cached = local_backtest(os.getcwd(), use_cache=not no_cache)
+        except BacktestError as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(1)
+        if cached:
+            print("Unchanged since the backtest of %s, showing its results (--no-cache to run again)."
+                  % time.strftime('%Y-%m-%d %H:%M', time.localtime(result['created'])))
+        elif result.get('output_dir') and os.path.isdir(result['output_dir']):
+            from wizardry.results import ResultStore
+            ResultStore().ingest([result['output_dir']], project=result['project'])
+        for name, value in result['statistics'].items():
+            print("%-40s %s" % (name, value))
+        return
+
+    if projects:
+        from wizardry.scheduler import backtest_projects, find_projects, write_summary
+        directories = find_projects(projects)
+        if not directories:
+            typer.echo("No project matches %s." % ', '.join(projects), err=True)
+            raise typer.Exit(1)
+        done = []
+        def progress(row):
+            done.append(row)
+            print("[%d/%d] %s: %s %s" % (len(done), len(directories), row['project'], row['status'],
+                                         row['error'] or 'Sharpe %s' % row['sharpe']))
+        rows = backtest_projects(directories, concurrency=concurrency, rate_limit=rate_limit,
+                                 timeout=timeout, retries=retries, force_push=force_push,
+                                 progress=progress)
+        write_summary(rows, output)
+        print("Summary of %d backtests written to %s" % (len(rows), output))
+        return
+
+    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
+    CURR_DIR = os.getcwd()
+    way = os.path.dirname(CURR_DIR)
+    os.chdir(way)
+    exit_on_failure(push_project(CURR_DIR, force=force_push), "lean cloud push")
+    exit_on_failure(run_lean(['cloud', 'backtest', path, '--open']), "lean cloud backtest")
+    print("\n")
+
+
+@app.command()
+def watch(debounce: float = typer.Option(0.5, help="Seconds without a save before a backtest starts."),
+          local: bool = typer.Option(False, "--local", help="Backtest with lean backtest on the data folder of lean.json instead of the cloud."),
+          polling: bool = typer.Option(False, "--polling", help="Scan the project for changes instead of using inotify.")):
+    from wizardry.watch import Watch
+    watcher = Watch(os.getcwd(), debounce=debounce, local=local, polling=polling)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    summary = watcher.summary()
+    if summary:
+        print("\n%d backtests, started %.2fs after the save (median), %.2fs at worst."
+              % (summary['backtests'], summary['median'], summary['max']))
+
+@app.command()
+def live(force_push: bool = typer.Option(False, "--force-push", help="Push even if no file changed since the last push.")):
+    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
+    CURR_DIR = os.getcwd()
+    way = os.path.dirname(CURR_DIR)
+    os.chdir(way)
+    exit_on_failure(push_project(CURR_DIR, force=force_push), "lean cloud push")
+    exit_on_failure(run_lean(['cloud', 'live', path, '--open']), "lean cloud live")
+    print("\n")
+
+@app.command()
+def optimize(force_push: bool = typer.Option(False, "--force-push", help="Push even if no file changed since the last push."),
+             local: bool = typer.Option(False, "--local", help="Sweep the parameters of --grid with local backtests instead of the cloud."),
+             grid: str = typer.Option(None, help="YAML/JSON spec of the strategy and the parameters to sweep with --local."),
+             workers: int = typer.Option(2, help="Number of local backtests running at the same time."),
+             out_dir: str = typer.Option(os.path.join("optimizations", "wizardry"), help="Directory receiving the trials and the checkpoint of --local."),
+             timeout: float = typer.Option(None, help="Seconds before a local backtest is given up.")):
+    if local:
+        from wizardry.batch import SpecError
+        from wizardry.optimizer import Optimization
+        from wizardry.results import format_table
+        if not grid:
+            typer.echo("--local needs a --grid spec of the parameters to sweep.", err=True)
+            raise typer.Exit(1)
+        try:
+            optimization = Optimization(grid, out_dir, workers=workers, timeout=timeout)
+        except SpecError as e:
+            typer.echo("Invalid spec: %s" % e, err=True)
+            raise typer.Exit(1)
+        if optimization.load():
+            print("Resuming from %d finished backtests." % len(optimization.results))
+        try:
+            best = optimization.run()
+        except KeyboardInterrupt:
+            typer.echo("Interrupted, run the same command again to resume.", err=True)
+            raise typer.Exit(130)
+        names = sorted(optimization.trials[0])
+        rows = [dict(row['parameters'], trial=row['trial'], status=row['status'],
+                     objective=row.get('objective')) for row in best]
+        for line in format_table(rows, ['trial'] + names + ['objective', 'status']):
+            print(line)
+        return
+
+    path = os.path.basename(os.path.normpath(pathlib.Path().absolute()))
+    CURR_DIR = os.getcwd()
+    way = os.path.dirname(CURR_DIR)
+    os.chdir(way)
+    exit_on_failure(push_project(CURR_DIR, force=force_push), "lean cloud push")
+    exit_on_failure(run_lean(['cloud', 'optimize', path]), "lean cloud optimize")
+    print("\n")
@@ -0,0 +1,235 @@
+"""
+Code generation for the ``framework`` command. Turns the answers of the
+framework questions (or of a batch spec) into the source of ``main.py``.
+
+The generated regions are bounded by ``# wizardry:begin <name>`` and
+``# wizardry:end <name>`` comments: the imports, the ``models`` the
+components define next to the algorithm class, one region per section in
+``Initialize`` and the ``methods`` the components add to the class. They are
+written even when empty, so ``main.py`` can be regenerated
+without touching the code written around them (see ``wizardry.project``).
+
+The component catalog (see ``wizardry.catalog``) is compiled once into
+lookup tables of pre-indented source fragments, so rendering a strategy is
+a handful of dictionary lookups and a join, whatever the catalog size.
+Components with tunable constants keep their fragment as a template, only
+formatted again when the answers override one of its ``parameters``.
+
+In parameterized mode the constants are read with ``self.GetParameter`` at
+the top of ``Initialize`` instead, falling back to their values, and are
+meant to be written to the ``parameters`` of ``config.json`` too (see
+``Engine.parameters``). The source then stays the same whatever the values,
+so a sweep can push and compile a single project.
+"""
+from wizardry.builder import FastSourceBuilder
+from wizardry.catalog import BASE_IMPORTS, CATALOG
+
+#order of the framework questions, as used by ``factors``
+FIELDS = ('alpha', 'universe', 'portfolio', 'execution', 'risk', 'start', 'cash')
+
+#options offered for each component, ``alpha`` is a multiple choice
+CHOICES = {field: tuple(section) for field, section in CATALOG}
+
+#tunable constant -> (field, component, default value)
+PARAMETERS = {
+    parameter: (field, name, default)
+    for field, section in CATALOG
+    for name, component in section.items()
+    for parameter, default in component.parameters
+}
+
+CLASS_NAME = 'DancingBlueOwl'
+
+
+def _fragment(lines, level):
+    """Render ``lines`` at indentation ``level`` with a FastSourceBuilder."""
+    sb = FastSourceBuilder()
+    for i in range(level):
+        sb.indent()
+    for line in lines:
+        sb.writeln(line)
+    return sb.end()
+
+
+class Engine(object):
+    """
+    Renders algorithms from a compiled component catalog.
+
+    Every component is rendered once, at construction, into the exact text
+    it contributes to ``Initialize``. Headers are cached per set of extra
+    imports, so a sweep over thousands of variants only builds a few.
+    """
+    def __init__(self, catalog=CATALOG, class_name=CLASS_NAME):
+        catalog = tuple(catalog)
+        self.sections = [field for field, section in catalog]
+        self.tables = {}
+        self.rank = {}
+        for field, section in catalog:
+            self.tables[field] = {name: self.compile(component) for name, component in section.items()}
+            self.rank[field] = {name: i for i, name in enumerate(section)}
+        self.markers = {field: (_fragment([MARKER + 'begin ' + field], 2), _fragment([MARKER + 'end ' + field], 2))
+                        for field in self.sections + ['parameters']}
+        self.markers['models'] = (_fragment([MARKER + 'begin models'], 0), _fragment([MARKER + 'end models'], 0))
+        self.markers['methods'] = (_fragment([MARKER + 'begin methods'], 1), _fragment([MARKER + 'end methods'], 1))
+        self.class_name = class_name
+        self.footer = _fragment([
+            'def OnData(self, data):',
+            '    # if not self.Portfolio.Invested:',
+            '    #    self.SetHoldings("SPY", 1)',
+            '    pass',
+        ], 1)
+        self._headers = {}
+
+    @staticmethod
+    def compile(component):
+        """
+        The fragment of ``component`` with its default parameters, the
+        imports it adds, its template, its default parameters, its
+        fragment reading the parameters from variables of the same name,
+        its methods and its classes.
+        """
+        template = _fragment(component.lines, 2)
+        defaults = dict(component.parameters)
+        return (template.format(**defaults) if defaults else template,
+                tuple(i for i in component.imports if i not in BASE_IMPORTS),
+                template, defaults,
+                template.format(**{name: name for name in defaults}) if defaults else template,
+                _fragment(component.methods, 1), _fragment(component.classes, 0))
+
+    def header(self, imports=(), classes=()):
+        """The imports, the ``models`` region of ``classes``, the class line and ``Initialize`` signature."""
+        try:
+            return self._headers[imports, classes]
+        except KeyError:
+            begin, end = self.markers['models']
+            header = ''.join([
+                _fragment((MARKER + 'begin imports',) + BASE_IMPORTS + imports + (MARKER + 'end imports', ''), 0),
+                begin, '\n\n'.join(classes), end, '\n\n',
+                _fragment(('class {0}(QCAlgorithm):'.format(self.class_name), '', '    def Initialize(self):'), 0),
+            ])
+            self._headers[imports, classes] = header
+            return header
+
+    def selected(self, field, value):
+        """The compiled fragments picked by ``value`` in ``field``."""
+        table = self.tables[field]
+        if isinstance(value, str):
+            value = [value]
+        elif field == 'alpha':
+            #alphas are written in catalog order, whatever the answer order
+            value = sorted(set(value), key=lambda name: self.rank[field].get(name, -1))
+        try:
+            return [table[name] for name in value]
+        except KeyError as e:
+            raise ValueError('unknown %s: %s' % (field, e.args[0]))
+
+    def parameters(self, answers, overrides=True):
+        """
+        The parameters of the components selected by ``answers`` with their
+        values: the ``parameters`` of the answers (with ``overrides``), else
+        the defaults.
+        """
+        overrides = (answers.get('parameters') or {}) if overrides else {}
+        values = {}
+        for field in self.sections:
+            for fragment, needs, template, defaults, named, methods, classes in self.selected(field, answers[field]):
+                for name, default in defaults.items():
+                    values[name] = overrides.get(name, default)
+        return values
+
+    def render(self, answers, parameterized=False):
+        """
+        Render the algorithm for ``answers``, a mapping with a value for
+        every name in ``FIELDS``, and optionally an ``end`` date and the
+        ``parameters`` overriding the defaults of the catalog. With
+        ``parameterized``, the parameters are read with ``GetParameter``.
+        Returns the source of ``main.py``.
+        """
+        parts = [None]
+        imports = []
+        methods = []
+        classes = []
+        parameters = answers.get('parameters')
+        if answers.get('end'):
+            parts.append(_INITIALIZE_END.format(answers['start'], answers['cash'], answers['end']))
+        else:
+            parts.append(_INITIALIZE.format(answers['start'], answers['cash']))
+        if parameterized:
+            #the fallbacks and casts come from the catalog, the values live in config.json:
+            #every variant gets the same source
+            values = self.parameters(answers, overrides=False)
+            if values:
+                begin, end = self.markers['parameters']
+                parts.append(begin)
+                parts.extend(_PARAMETER.format(name=name, value=value, type=type(value).__name__)
+                             for name, value in values.items())
+                parts.append(end)
+                parts.append('\n')
+        for field in self.sections:
+            begin, end = self.markers[field]
+            parts.append(begin)
+            for fragment, needs, template, defaults, named, method, models in self.selected(field, answers[field]):
+                if parameterized:
+                    fragment = named
+                elif parameters and defaults:
+                    fragment = template.format(**{name: parameters.get(name, default)
+                                                  for name, default in defaults.items()})
+                parts.append(fragment)
+                imports.extend(i for i in needs if i not in imports)
+                if method and method not in methods:
+                    methods.append(method)
+                if models and models not in classes:
+                    classes.append(models)
+            parts.append(end)
+            parts.append('\n')
+        parts[0] = self.header(tuple(imports), tuple(classes))
+        begin, end = self.markers['methods']
+        parts.extend([begin, '\n'.join(methods), end, '\n', self.footer])
+        return ''.join(parts)
+
+
+#prefix of the comments bounding the generated regions
+MARKER = '# wizardry:'
+
+_INITIALIZE = _fragment([
+    MARKER + 'begin settings',
+    'self.SetStartDate({0}) # Set Start Date',
+    'self.SetCash({1}) # Set Strategy Cash',
+    MARKER + 'end settings',
+    '#self.AddEquity("SPY", Resolution.Minute)',
+    '',
+], 2)
+
+_INITIALIZE_END = _fragment([
+    MARKER + 'begin settings',
+    'self.SetStartDate({0}) # Set Start Date',
+    'self.SetEndDate({2}) # Set End Date',
+    'self.SetCash({1}) # Set Strategy Cash',
+    MARKER + 'end settings',
+    '#self.AddEquity("SPY", Resolution.Minute)',
+    '',
+], 2)
+
+_PARAMETER = _fragment([
+    '{name} = {type}(self.GetParameter("{name}") or {value!r})',
+], 2)
+
+ENGINE = Engine()
+
+
+def generate(answers, parameterized=False):
+    """
+    Render the algorithm for ``answers``, a mapping with a value for every
+    name in ``FIELDS``. Returns the source of ``main.py``. With
+    ``parameterized``, the tunable constants are read from the parameters
+    of the project, see ``config_parameters``.
+    """
+    return ENGINE.render(answers, parameterized)
+
+
+def config_parameters(answers):
+    """
+    The ``parameters`` block of ``config.json`` matching the parameterized
+    source of ``answers``. lean expects every value as a string.
+    """
+    return {name: str(value) for name, value in ENGINE.parameters(answers).items()}
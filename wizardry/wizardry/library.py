@@ -0,0 +1,303 @@
+"""
+Fetching strategies from the StrategyLibraryQC repository, through the
+local ``StrategyCache``.
+
+Bodies are streamed in chunks straight into the cache and checked against
+the SHA-256 published in the ``manifest.json`` of the repository when there
+is one. That manifest also lets ``sync`` skip the strategies whose cached
+copy already has the published hash, without any request.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+from wizardry.cache import ChecksumError, StrategyCache
+from wizardry.trace import span
+
+BASE_URL = "https://raw.githubusercontent.com/ssantoshp/StrategyLibraryQC/main/"
+
+#every strategy of the catalog, in the order the picker shows them
+STRATEGIES = (
+    'Simple RSI Strategy',
+    'Sentiment analysis',
+    'Combining Mean Reversion and Momentum in Forex Market',
+    'CAPM Alpha Ranking Strategy on Dow 30 Companies',
+    'Pairs Trading Copula Method',
+    'Pairs Trading Cointegration Method',
+    'Dynamic Breakout II',
+    'Dual Thrust',
+    'Use Crude Oil to Predict Equity Returns',
+    'Intraday Dynamic Pairs Trading using Correlation and Cointegration Approach',
+    'Momentum Strategy Based on the Low Frequency Component of Forex Market',
+    'Stock Selection Strategy Based on Fundamental Factors',
+    'Fundamental Factor Long Short Strategy',
+    'Short-Term Reversal Strategy in Stocks',
+    'Asset Class Trend Following',
+    'Asset Class Momentum',
+    'Sector Momentum',
+    'Overnight Anomaly',
+    'Forex Carry Trade',
+    'Volatility Effect in Stocks',
+    'Forex Momentum',
+    'Pairs Trading with Stocks',
+    'Short Term Reversal',
+    'Momentum Effects in Stocks',
+    'Momentum Effect in Country Equity Indexes',
+    'Mean Reversion Effect in Country Equity Indexes',
+    'Paired Switching',
+    'Small Capitalization Stocks Premium Anomaly',
+    'Liquidity Effect in Stocks',
+    'Volatility Risk Premium Effect',
+    'Momentum Effect in Commodities Futures',
+    'Book-to-Market Value Anomaly',
+    'Term Structure Effect in Commodities',
+    'Gold Market Timing',
+    'Turn of the Month in Equity Indexes',
+    'Momentum-Short Term Reversal Strategy',
+    'Pairs Trading with Country ETFs',
+    'Accrual Anomaly',
+    'Asset Growth Effect',
+    'Momentum and State of Market Filters',
+    'Sentiment and Style Rotation Effect in Stocks',
+    'Momentum and Style Rotation Effect',
+    'Trading with WTI BRENT Spread',
+    'ROA Effect within Stocks',
+    'Momentum Effect in REITs',
+    'Option Expiration Week Effect',
+    'January Effect in Stocks',
+    'Momentum and Reversal Combined with Volatility Effect in Stock',
+    'Earnings Quality Factor',
+    'January Barometer',
+    'Lunar Cycle in Equity Market',
+    'VIX Predicts Stock Index Returns',
+    'Combining Momentum Effect with Volume',
+    'Short Term Reversal with Futures',
+    'Pre-Holiday Effect',
+    'Beta Factors in Stocks',
+    'Price Earnings Anomaly',
+    'Exploiting Term Structure of VIX Futures',
+    '12 Month Cycle in Cross-Section of Stocks Returns',
+    'Momentum Effect in Stocks in Small Portfolios',
+    'Value Effect within Countries',
+    'Standardized Unexpected Earnings',
+    'Seasonality Effect based on Same-Calendar Month Returns',
+    'Risk Premia in Forex Markets',
+    'Expected Idiosyncratic Skewness',
+    'Mean-Reversion Statistical Arbitrage Strategy in Stocks',
+    'Fama French Five Factors',
+    'Improved Momentum Strategy on Commodities Futures',
+    'Commodities Futures Trend Following',
+    'G-Score Investing',
+    'Benzinga News Algorithm',
+    'Cached Alternative Data Algorithm',
+    'SEC Report 8K Algorithm',
+    'Smart Insider Transaction Algorithm',
+    'Tiingo News Algorithm',
+    'Trading Economics Algorithm',
+    'US Treasury Yield Curve Rate Algorithm',
+)
+
+#seconds to wait for the connection and for the response
+TIMEOUT = (5, 30)
+
+#bytes read at a time from a response
+CHUNK_SIZE = 64 * 1024
+
+#file listing the SHA-256 of every strategy, next to them
+MANIFEST = 'manifest.json'
+
+
+class LibraryError(Exception):
+    """Raised when a strategy can't be fetched nor served from the cache."""
+
+
+def urlify(s):
+
+    # Remove all non-word characters (everything except numbers and letters)
+    s = re.sub(r"[^\w\s]", '', s)
+
+    # Replace all runs of whitespace with a single dash
+    s = re.sub(r"\s+", '%20', s)
+
+    return s
+
+
+def strategy_url(name, base_url=BASE_URL):
+    """The raw URL of the strategy called ``name`` in the catalog."""
+    return base_url + "%s.py" % urlify(name)
+
+
+def conditional_headers(entry):
+    """Headers revalidating the cache ``entry`` (which may be ``None``)."""
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def fetch(url, cache=None, offline=False, session=None, timeout=TIMEOUT, sha256=None):
+    """
+    The source of the strategy at ``url``, checked against ``sha256`` if
+    given.
+
+    A cached copy with the expected hash is served without any request.
+    Otherwise it is revalidated with ``If-None-Match``/``If-Modified-Since``
+    and served on ``304 Not Modified``, or when the network is unreachable.
+    With ``offline`` the cache is used without any request.
+    """
+    cache = cache or StrategyCache()
+    entry = cache.get(url)
+    if offline or (entry is not None and sha256 is not None and entry['sha256'] == sha256):
+        if entry is None:
+            raise LibraryError("%s is not in the local cache, fetch it once without --offline" % url)
+        return cache.read(url).decode('utf-8')
+
+    own_session = session is None
+    session = session or make_session(1)
+    try:
+        response, blob = download(session, url, conditional_headers(entry), cache, sha256,
+                                  retries=0, timeout=timeout)
+    except LibraryError:
+        if entry is None or (sha256 is not None and entry['sha256'] != sha256):
+            raise
+        return cache.read(url).decode('utf-8')
+    finally:
+        if own_session:
+            session.close()
+
+    if response.status_code == 304 and entry is not None:
+        return cache.read(url).decode('utf-8')
+    if blob is None:
+        raise LibraryError("Can't download %s: HTTP %d" % (url, response.status_code))
+    cache.add(url, *blob, etag=response.headers.get('ETag'),
+              last_modified=response.headers.get('Last-Modified'))
+    return cache.read(url).decode('utf-8')
+
+
+def load_manifest(cache=None, session=None, base_url=BASE_URL, timeout=TIMEOUT):
+    """
+    The published ``{path: sha256}`` of the strategies under ``base_url``,
+    paths being relative to it. Empty when no manifest is published.
+    """
+    try:
+        manifest = json.loads(fetch(base_url + MANIFEST, cache, session=session, timeout=timeout))
+        return {path: info['sha256'] for path, info in manifest['files'].items()}
+    except (LibraryError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def write_manifest(directory):
+    """
+    Write the ``manifest.json`` of the strategies (``.py`` files) in
+    ``directory``, to publish with them. Returns the number of strategies.
+    """
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(directory, name), 'rb') as file:
+            data = file.read()
+        files[quote(name)] = {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}
+    with open(os.path.join(directory, MANIFEST), 'w') as file:
+        json.dump({'files': files}, file, indent=1, sort_keys=True)
+        file.write('\n')
+    return len(files)
+
+
+def make_session(connections):
+    """A keep-alive ``requests.Session`` pooling up to ``connections``."""
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def download(session, url, headers, cache, sha256=None, retries=3, backoff=0.5, timeout=TIMEOUT):
+    """
+    GET ``url`` and stream a ``200`` body into a blob of ``cache``, checked
+    against ``sha256`` if given. Connection errors, ``429`` and ``5xx``
+    answers are retried up to ``retries`` times with an exponential
+    backoff. Returns the response and the ``(sha256, size)`` of the blob,
+    ``None`` for any other status.
+    """
+    import requests
+    with span('fetch', url=url) as attributes:
+        for attempt in range(retries + 1):
+            attributes['attempts'] = attempt + 1
+            try:
+                with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                    attributes['status'] = response.status_code
+                    if response.status_code == 200:
+                        blob = cache.write_blob(response.iter_content(CHUNK_SIZE), sha256)
+                        attributes['bytes'] = blob[1]
+                        return response, blob
+                    if response.status_code != 429 and response.status_code < 500:
+                        return response, None
+                    error = 'HTTP %d' % response.status_code
+            except requests.RequestException as e:
+                error = str(e)
+            except ChecksumError as e:
+                raise LibraryError("%s doesn't match the published checksum (%s)" % (url, e))
+            if attempt == retries:
+                raise LibraryError("Can't download %s: %s" % (url, error))
+            time.sleep(backoff * 2 ** attempt)
+
+
+def sync(names=STRATEGIES, cache=None, workers=8, retries=3, backoff=0.5,
+         base_url=BASE_URL, progress=None):
+    """
+    Download every strategy of ``names`` into the cache, ``workers`` at a
+    time over one pooled session. Cached strategies with the hash of the
+    published manifest are skipped, others are revalidated, so a second
+    sync only transfers what changed. ``progress`` is called once per
+    finished strategy.
+
+    Returns a dict counting the ``downloaded`` and ``unchanged`` strategies,
+    with the ``failed`` ones as a list of ``(name, error)``.
+    """
+    cache = cache or StrategyCache()
+    session = make_session(workers)
+    summary = {'downloaded': 0, 'unchanged': 0, 'failed': []}
+    with session:
+        manifest = load_manifest(cache, session, base_url)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for name in names:
+                url = strategy_url(name, base_url)
+                entry = cache.get(url)
+                sha256 = manifest.get(strategy_url(name, ''))
+                if entry is not None and sha256 is not None and entry['sha256'] == sha256:
+                    summary['unchanged'] += 1
+                    if progress is not None:
+                        progress()
+                    continue
+                futures[pool.submit(download, session, url, conditional_headers(entry), cache, sha256,
+                                    retries, backoff)] = (name, url)
+            #the index of the cache is only touched from this thread
+            for future in as_completed(futures):
+                name, url = futures[future]
+                try:
+                    response, blob = future.result()
+                    if response.status_code == 304 and cache.get(url) is not None:
+                        cache.touch(url)
+                        summary['unchanged'] += 1
+                    elif blob is not None:
+                        cache.add(url, *blob, etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
+                        summary['downloaded'] += 1
+                    else:
+                        raise LibraryError("Can't download %s: HTTP %d" % (url, response.status_code))
+                except LibraryError as e:
+                    summary['failed'].append((name, str(e)))
+                if progress is not None:
+                    progress()
+    return summary
@@ -0,0 +1,250 @@
+"""
+Skipping ``lean cloud push`` when a project hasn't changed.
+
+After each successful push the SHA-256 of every file lean uploads is
+recorded in ``<project>/.wizardry/manifest.json`` (lean ignores hidden
+directories, so the manifest itself is never pushed). A file whose size and
+modification time match the manifest isn't even read again. The files
+themselves go to the shared ``ContentStore``, which tells what changed line
+by line and deduplicates identical files across projects.
+"""
+import json
+import os
+
+from wizardry.runner import run, run_all, run_lean
+from wizardry.store import ContentStore, file_sha256
+from wizardry.trace import span
+
+MANIFEST = os.path.join('.wizardry', 'manifest.json')
+
+#files lean cloud push uploads, besides config.json
+SOURCE_SUFFIXES = ('.py', '.cs', '.ipynb', '.css', '.html')
+
+#directories lean never uploads
+SKIPPED_DIRECTORIES = ('bin', 'obj', 'backtests', 'live', 'optimizations', 'storage')
+
+
+def is_project_file(path):
+    """Whether lean pushes the file at ``path``, relative to the project."""
+    parts = path.replace(os.sep, '/').split('/')
+    if any(part.startswith('.') or part in SKIPPED_DIRECTORIES for part in parts[:-1]):
+        return False
+    return parts[-1].endswith(SOURCE_SUFFIXES) or parts == ['config.json']
+
+
+def project_files(directory):
+    """Paths, relative to ``directory``, of the files lean pushes."""
+    files = []
+    for root, directories, names in os.walk(directory):
+        directories[:] = sorted(
+            name for name in directories
+            if not name.startswith('.') and name not in SKIPPED_DIRECTORIES
+            and not os.path.isfile(os.path.join(root, name, 'pyvenv.cfg'))
+        )
+        for name in sorted(names):
+            path = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+            if is_project_file(path):
+                files.append(path)
+    return files
+
+
+class PushManifest(object):
+    """The state of a project directory as of its last successful push."""
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST)
+        try:
+            with open(self.path) as file:
+                self.files = json.load(file)['files']
+        except (OSError, ValueError, KeyError):
+            self.files = {}
+
+    def scan(self):
+        """
+        The current state of the project, ``{path: {sha256, size, mtime_ns}}``.
+        Files with the size and mtime recorded in the manifest aren't hashed.
+        """
+        state = {}
+        for path in project_files(self.directory):
+            stat = os.stat(os.path.join(self.directory, path))
+            known = self.files.get(path)
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                state[path] = known
+                continue
+            state[path] = {
+                'sha256': file_sha256(os.path.join(self.directory, path)),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+        return state
+
+    def save(self, state):
+        """Record ``state`` as pushed."""
+        self.files = state
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as file:
+            json.dump({'files': state}, file, indent=1, sort_keys=True)
+
+
+def project_location(directory):
+    """
+    The lean workspace holding the project in ``directory`` (the closest
+    parent with a ``lean.json``, else the parent directory) and the name of
+    the project in that workspace.
+    """
+    directory = os.path.abspath(directory)
+    workspace = os.path.dirname(directory)
+    while not os.path.isfile(os.path.join(workspace, 'lean.json')):
+        parent = os.path.dirname(workspace)
+        if parent == workspace:
+            workspace = os.path.dirname(directory)
+            break
+        workspace = parent
+    return workspace, os.path.relpath(directory, workspace).replace(os.sep, '/')
+
+
+#what dedupe may share between projects: editor settings and notebooks. config.json (lean
+#writes the cloud id of the project to it) and the sources stay each project's own
+SHAREABLE_DIRECTORIES = ('.idea', '.vscode')
+SHAREABLE_SUFFIXES = ('.ipynb',)
+
+
+def is_shareable(path):
+    """Whether dedupe may share the file at ``path``, relative to the project."""
+    parts = path.replace(os.sep, '/').split('/')
+    return parts[0] in SHAREABLE_DIRECTORIES or parts[-1].endswith(SHAREABLE_SUFFIXES)
+
+
+def shareable_files(directory):
+    """Paths of the files of the project in ``directory`` which dedupe may share."""
+    files = []
+    for root, directories, names in os.walk(directory):
+        directories[:] = sorted(
+            name for name in directories
+            if name != '.wizardry' and name not in SKIPPED_DIRECTORIES
+            and not os.path.isfile(os.path.join(root, name, 'pyvenv.cfg'))
+        )
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if (not name.startswith('.tmp-') and is_shareable(os.path.relpath(path, directory))
+                    and os.path.isfile(path) and not os.path.islink(path)):
+                files.append(path)
+    return files
+
+
+def dedupe_projects(directories, store=None):
+    """
+    Make the identical editor settings and notebooks of the projects in
+    ``directories`` share their storage. Returns ``(linked, saved)``, see
+    ``ContentStore.dedupe``.
+    """
+    store = store or ContentStore()
+    with span('dedupe', projects=len(directories)) as attributes:
+        linked, saved = store.dedupe([path for directory in directories for path in shareable_files(directory)])
+        attributes.update(linked=linked, bytes=saved)
+    return linked, saved
+
+
+class Push(object):
+    """
+    A pending ``lean cloud push`` of the project in ``directory``: what it
+    holds now against what its remote project was last sent, according to
+    its manifest or else to the content store.
+    """
+    def __init__(self, directory, store):
+        self.directory = os.path.abspath(directory)
+        self.store = store
+        self.manifest = PushManifest(self.directory)
+        self.state = self.manifest.scan()
+        self.workspace, self.name = project_location(self.directory)
+        self.previous = ({path: info['sha256'] for path, info in self.manifest.files.items()}
+                         or store.pushed(self.workspace, self.name))
+        self.changes = sorted(path for path in set(self.state) | set(self.previous)
+                              if path not in self.state or self.state[path]['sha256'] != self.previous.get(path))
+
+    @property
+    def needed(self):
+        return not self.previous or bool(self.changes)
+
+    @property
+    def command(self):
+        return ['cloud', 'push', '--project', self.name], self.workspace
+
+    def deltas(self):
+        """``{path: (added, removed, size)}`` of the changed files, see ``ContentStore.deltas``."""
+        return self.store.deltas(self.directory, self.state, self.previous)
+
+    def skipped(self):
+        if self.state != self.manifest.files:
+            #only modification times moved (or the manifest is new), remember them for the next scan
+            self.manifest.save(self.state)
+
+    def done(self):
+        self.manifest.save(self.state)
+        self.store.record(self.workspace, self.name, self.directory, self.state)
+
+
+def describe(deltas):
+    return ', '.join('%s +%d -%d' % (path, added, removed) for path, (added, removed, _) in sorted(deltas.items()))
+
+
+def push_project(directory, force=False, run=run_lean, log=print, store=None):
+    """
+    ``lean cloud push`` the project in ``directory``, unless none of its
+    files changed since the last push (or ``force`` is set). ``run`` runs
+    the lean command. Returns the exit code of the push, 0 when skipped.
+    """
+    with span('push') as attributes:
+        push = Push(directory, store or ContentStore())
+        if not force and not push.needed:
+            log("No changes since the last push, skipping it.")
+            attributes['skipped'] = True
+            push.skipped()
+            return 0
+        attributes.update(files=len(push.changes),
+                          bytes=sum(push.state[path]['size'] for path in push.changes if path in push.state))
+        if push.previous:
+            deltas = push.deltas()
+            if deltas:
+                log("Changed since the last push: %s" % describe(deltas))
+            attributes['delta_bytes'] = sum(delta[2] for delta in deltas.values())
+        args, workspace = push.command
+        code = attributes['exit_code'] = run(args, cwd=workspace)
+        if code == 0:
+            push.done()
+        return code
+
+
+def push_projects(directories, concurrency=4, force=False, store=None):
+    """
+    ``lean cloud push`` the projects in ``directories`` in one go, at most
+    ``concurrency`` at a time, skipping those unchanged since their last
+    push (unless ``force`` is set). A project never pushed is created in
+    the cloud. Returns the exit code of each push, 0 when skipped.
+    """
+    store = store or ContentStore()
+    codes = []
+    pending = []
+    for directory in directories:
+        push = Push(directory, store)
+        codes.append(0)
+        if force or push.needed:
+            pending.append((len(codes) - 1, push))
+        else:
+            push.skipped()
+    with span('push', projects=len(pending)) as attributes:
+        attributes['delta_bytes'] = sum(delta[2] for _, push in pending if push.previous
+                                        for delta in push.deltas().values())
+        results = run_all([push.command for _, push in pending], concurrency) if pending else []
+        if any(result.code and result.auth_failed for result in results):
+            print("lean needs you to log in to QuantConnect.")
+            if run(['login']).code == 0:
+                retried = [index for index, result in enumerate(results) if result.code]
+                for index, result in zip(retried, run_all([pending[index][1].command for index in retried], concurrency)):
+                    results[index] = result
+        for (index, push), result in zip(pending, results):
+            codes[index] = result.code
+            if result.code == 0:
+                push.done()
+        attributes['failed'] = sum(1 for code in codes if code)
+    return codes
@@ -0,0 +1,176 @@
+"""
+Local backtests (``wizardry backtest --local``) and their memoized results.
+
+A local backtest runs ``lean backtest`` on the data folder configured in the
+workspace's ``lean.json``. Its statistics are stored under a key hashing
+everything that can change the outcome: the project files (main.py and the
+other sources), config.json, the workspace's lean.json and the start date
+and cash of the algorithm. Running an unchanged strategy again returns the
+stored statistics without starting lean at all.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+
+from wizardry.cache import atomic_write, cache_dir
+from wizardry.manifest import PushManifest, project_location
+from wizardry.runner import tee_lean
+
+
+class BacktestError(Exception):
+    """Raised when a local backtest fails."""
+
+
+#stored results older than this many days or past this count are evicted
+MAX_AGE_DAYS = 30
+MAX_ENTRIES = 1000
+
+
+def algorithm_settings(source):
+    """The start date and cash an algorithm sets, as written in its source."""
+    start = re.search(r'SetStartDate\(([^)]*)\)', source)
+    cash = re.search(r'SetCash\(([^)]*)\)', source)
+    return (start.group(1).strip() if start else None,
+            cash.group(1).strip() if cash else None)
+
+
+def backtest_key(directory):
+    """The memoization key of the project in ``directory``."""
+    directory = os.path.abspath(directory)
+    digest = hashlib.sha256()
+    for path, info in sorted(PushManifest(directory).scan().items()):
+        digest.update(('%s\0%s\n' % (path, info['sha256'])).encode('utf-8'))
+    workspace, name = project_location(directory)
+    lean_json = os.path.join(workspace, 'lean.json')
+    if os.path.isfile(lean_json):
+        with open(lean_json, 'rb') as file:
+            digest.update(b'lean.json\0' + hashlib.sha256(file.read()).hexdigest().encode('ascii'))
+    main = os.path.join(directory, 'main.py')
+    if os.path.isfile(main):
+        with open(main) as file:
+            digest.update(('start\0%s\ncash\0%s\n' % algorithm_settings(file.read())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _remove(path):
+    """Remove the entry at ``path``, unless a concurrent prune already did."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BacktestMemo(object):
+    """
+    Statistics of past local backtests, one JSON file per key. Entries are
+    evicted least recently used first beyond ``max_entries``, and once they
+    haven't been used for ``max_age_days``.
+    """
+    def __init__(self, root=None, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS):
+        self.root = root or cache_dir('backtests')
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.json')
+
+    def get(self, key):
+        """The stored result for ``key``, ``None`` if there is none."""
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                result = json.load(file)
+        except (OSError, ValueError):
+            return None
+        try:
+            expired = time.time() - os.path.getmtime(path) > self.max_age
+            if not expired:
+                os.utime(path)
+        except FileNotFoundError:
+            #evicted meanwhile, by another trial of a sweep say: what was read still holds
+            expired = False
+        if expired:
+            _remove(path)
+            return None
+        return result
+
+    def put(self, key, result):
+        """Store ``result`` (a JSON-serializable dict) for ``key``."""
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self._path(key), json.dumps(result, indent=1).encode('utf-8'))
+        self.prune()
+
+    def prune(self):
+        """Evict expired entries and the least recently used extra ones."""
+        now = time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.root, '*.json')):
+            try:
+                used = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if now - used > self.max_age:
+                _remove(path)
+            else:
+                entries.append((used, path))
+        entries.sort()
+        for used, path in entries[:max(0, len(entries) - self.max_entries)]:
+            _remove(path)
+
+
+def read_statistics(output_dir, output=''):
+    """
+    The statistics of a finished local backtest: from the result JSON lean
+    wrote in ``output_dir``, else from the ``STATISTICS::`` lines of its
+    console ``output``.
+    """
+    for path in sorted(glob.glob(os.path.join(output_dir, '*.json'))):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and isinstance(data.get('statistics'), dict) and data['statistics']:
+            return data['statistics']
+    statistics = {}
+    for match in re.finditer(r'STATISTICS::\s+(.+?)\s+(\S+)\s*$', output, re.MULTILINE):
+        statistics[match.group(1)] = match.group(2)
+    return statistics
+
+
+def local_backtest(directory, use_cache=True, memo=None, run=tee_lean):
+    """
+    Backtest the project in ``directory`` locally, or return the stored
+    result of an identical run unless ``use_cache`` is false. Returns the
+    result dict and whether it came from the store.
+    """
+    directory = os.path.abspath(directory)
+    memo = memo or BacktestMemo()
+    key = backtest_key(directory)
+    if use_cache:
+        result = memo.get(key)
+        if result is not None:
+            return result, True
+    workspace, name = project_location(directory)
+    output_dir = os.path.join(directory, 'backtests', time.strftime('wizardry-%Y-%m-%d_%H-%M-%S'))
+    code, output = run(['backtest', name, '--output', output_dir], cwd=workspace)
+    if code:
+        raise BacktestError("lean backtest exited with code %d" % code)
+    start, cash = None, None
+    if os.path.isfile(os.path.join(directory, 'main.py')):
+        with open(os.path.join(directory, 'main.py')) as file:
+            start, cash = algorithm_settings(file.read())
+    result = {
+        'key': key,
+        'project': name,
+        'created': time.time(),
+        'start': start,
+        'cash': cash,
+        'output_dir': output_dir,
+        'statistics': read_statistics(output_dir, output),
+    }
+    memo.put(key, result)
+    return result, False
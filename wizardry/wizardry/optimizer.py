@@ -0,0 +1,257 @@
+"""
+Local parameter sweeps: ``wizardry optimize --local --grid params.yaml``.
+
+The spec holds the framework choices of the strategy (as a ``framework
+--spec`` variant) and the catalog parameters to sweep, e.g.::
+
+    alpha: EMA Cross
+    universe: Large Cap Equities
+    portfolio: Equal Weighting
+    execution: Immediate
+    risk: Maximum Drawdown
+    start: 2015, 1, 1
+    end: 2021, 1, 1
+    cash: 100000
+    parameters:
+      ema_fast: [20, 50]
+      ema_slow: {min: 100, max: 300, step: 50}
+      max_drawdown: [0.01, 0.02, 0.05]
+    search: grid          # or random, with samples and seed
+    objective: sharpe_ratio
+    rungs: 3              # successive halving, 1 to backtest every trial fully
+    eta: 3
+
+Every trial is a project directory under the output directory, backtested
+with ``lean backtest`` (each backtest is its own lean process, ``workers`` of
+them at a time). Successive halving first backtests every trial on the last
+``1/eta**(rungs-1)`` of the period, keeps the best ``1/eta`` of them for a
+``eta`` times longer period, and so on until the survivors run on the whole
+period. Results are checkpointed after each backtest, so running the same
+sweep again resumes where it stopped.
+"""
+import datetime
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from wizardry.batch import SpecError, check_answers, load_spec
+from wizardry.cache import atomic_write
+from wizardry.codegen import PARAMETERS, config_parameters, generate
+from wizardry.memo import BacktestError, local_backtest
+from wizardry.project import update_config, write_source
+from wizardry.results import column_name, parse_number
+from wizardry.runner import capture_lean
+
+CHECKPOINT = 'checkpoint.json'
+
+#keys of a sweep spec which aren't framework answers
+SETTINGS = ('parameters', 'search', 'samples', 'seed', 'objective', 'rungs', 'eta')
+
+
+def parse_date(value):
+    """``'2017, 1, 1'`` (or a date) -> ``datetime.date(2017, 1, 1)``."""
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date(*(int(part) for part in str(value).split(',')))
+    except (TypeError, ValueError):
+        raise SpecError('invalid date %r, expected e.g. 2017, 1, 1' % (value,))
+
+
+def format_date(date):
+    return '%d, %d, %d' % (date.year, date.month, date.day)
+
+
+def parameter_values(name, values):
+    """The values swept for a parameter: a list, or a ``{min, max, step}`` range."""
+    if isinstance(values, list):
+        if not values:
+            raise SpecError('no value for %s' % name)
+        return values
+    if isinstance(values, dict) and {'min', 'max', 'step'} <= set(values):
+        low, high, step = values['min'], values['max'], values['step']
+        if step <= 0 or high < low:
+            raise SpecError('invalid range for %s' % name)
+        count = int(math.floor((high - low) / step + 1e-9)) + 1
+        integral = all(isinstance(value, int) for value in (low, high, step))
+        return [low + i * step if integral else round(low + i * step, 10) for i in range(count)]
+    if isinstance(values, (int, float)):
+        return [values]
+    raise SpecError('%s must be a list of values or a {min, max, step} range' % name)
+
+
+def typed_values(name, values):
+    """
+    ``values`` of the parameter ``name`` as the type of its default, which
+    the generated source casts them to: an integer parameter can't take 12.5.
+    """
+    default = PARAMETERS[name][2]
+    typed = []
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SpecError('%s takes numbers, not %r' % (name, value))
+        if isinstance(default, int):
+            if not float(value).is_integer():
+                raise SpecError('%s takes whole numbers, not %r' % (name, value))
+            value = int(value)
+        typed.append(value)
+    return typed
+
+
+def trials(spec, answers):
+    """The parameter combinations to backtest, as a list of dicts."""
+    sweep = spec.get('parameters') or {}
+    if not sweep:
+        raise SpecError('the spec has no parameters to sweep')
+    selected = {(field, name) for field in ('alpha', 'universe', 'portfolio', 'execution', 'risk')
+                for name in (answers[field] if field == 'alpha' else [answers[field]])}
+    for name in sweep:
+        if name not in PARAMETERS:
+            raise SpecError('unknown parameter %s, choose from: %s' % (name, ', '.join(sorted(PARAMETERS))))
+        if PARAMETERS[name][:2] not in selected:
+            raise SpecError('%s only applies to the %s %s' % (name, PARAMETERS[name][1], PARAMETERS[name][0]))
+    names = sorted(sweep)
+    grid = [typed_values(name, parameter_values(name, sweep[name])) for name in names]
+    search = spec.get('search', 'grid')
+    if search == 'grid':
+        return [dict(zip(names, values)) for values in itertools.product(*grid)]
+    if search == 'random':
+        rng = random.Random(spec.get('seed', 0))
+        combinations = []
+        for i in range(int(spec.get('samples', 20)) * 10):
+            combination = dict(zip(names, (rng.choice(values) for values in grid)))
+            if combination not in combinations:
+                combinations.append(combination)
+            if len(combinations) == int(spec.get('samples', 20)):
+                break
+        return combinations
+    raise SpecError('unknown search %r, use grid or random' % search)
+
+
+def rung_fractions(rungs, eta):
+    """The share of the backtest period run at each rung, the last one being 1."""
+    return [1.0 / eta ** (rungs - 1 - rung) for rung in range(rungs)]
+
+
+def rung_start(start, end, fraction):
+    """The start date of a backtest covering the last ``fraction`` of the period."""
+    return end - datetime.timedelta(days=int(round((end - start).days * fraction)))
+
+
+class Optimization(object):
+    """
+    A parameter sweep of ``spec`` (a mapping or the path of a spec file)
+    with its trials and checkpoint in ``directory``.
+    """
+    def __init__(self, spec, directory, workers=2, timeout=None, memo=None, log=print):
+        if isinstance(spec, str):
+            spec = load_spec(spec)
+        if not isinstance(spec, dict):
+            raise SpecError('a spec must be a mapping')
+        self.spec = spec
+        self.directory = os.path.abspath(directory)
+        self.workers = workers
+        self.timeout = timeout
+        self.memo = memo
+        self.log = log
+        self.answers = check_answers({key: value for key, value in spec.items() if key not in SETTINGS + ('end',)})
+        self.start = parse_date(spec['start'])
+        self.end = parse_date(spec.get('end') or datetime.date.today())
+        if self.end <= self.start:
+            raise SpecError('end must be after start')
+        self.objective = str(spec.get('objective', 'sharpe_ratio'))
+        self.eta = int(spec.get('eta', 3))
+        self.rungs = int(spec.get('rungs', 3))
+        if self.eta < 2 or self.rungs < 1:
+            raise SpecError('eta must be at least 2 and rungs at least 1')
+        self.trials = trials(spec, self.answers)
+        #with the end resolved: a sweep ending today is another sweep tomorrow
+        self.fingerprint = hashlib.sha256(json.dumps(dict(spec, end=format_date(self.end)), sort_keys=True,
+                                                     default=str).encode('utf-8')).hexdigest()
+        self.results = {}
+        self._checkpoint = os.path.join(self.directory, CHECKPOINT)
+
+    def load(self):
+        """Resume from the checkpoint of an identical sweep, if any."""
+        try:
+            with open(self._checkpoint) as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get('fingerprint') != self.fingerprint:
+            self.log("The spec changed since the last run, starting over.")
+            return 0
+        self.results = checkpoint['results']
+        return len(self.results)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        checkpoint = {'fingerprint': self.fingerprint, 'trials': self.trials, 'results': self.results}
+        atomic_write(self._checkpoint, json.dumps(checkpoint, indent=1).encode('utf-8'))
+
+    def score(self, result):
+        """The objective of a result, higher is better, ``-inf`` if it failed."""
+        value = result.get('objective')
+        if result['status'] != 'ok' or value is None:
+            return -math.inf
+        return -value if self.objective.startswith('-') else value
+
+    def evaluate(self, trial, rung, fraction):
+        """Backtest ``trial`` over the last ``fraction`` of the period."""
+        directory = os.path.join(self.directory, 'trial-%04d' % (trial + 1))
+        os.makedirs(directory, exist_ok=True)
+        start = format_date(rung_start(self.start, self.end, fraction))
+        answers = dict(self.answers, start=start, end=format_date(self.end))
+        #the source is the same for every trial, only config.json differs
+        write_source(directory, generate(answers, parameterized=True) + '\n')
+        update_config(directory, config_parameters(dict(answers, parameters=self.trials[trial])))
+        run = lambda args, cwd: capture_lean(args, cwd=cwd, timeout=self.timeout)
+        try:
+            result, cached = local_backtest(directory, memo=self.memo, run=run)
+        except BacktestError as e:
+            return {'status': 'failed', 'start': start, 'error': str(e)}
+        except subprocess.TimeoutExpired:
+            return {'status': 'timeout', 'start': start, 'error': 'timed out after %ss' % self.timeout}
+        statistics = {column_name(name): parse_number(value) for name, value in result['statistics'].items()}
+        return {'status': 'ok', 'start': start, 'objective': statistics.get(self.objective.lstrip('-')),
+                'statistics': result['statistics'], 'output_dir': result['output_dir']}
+
+    def run(self):
+        """
+        Run (or resume) the sweep. Returns the trials of the last rung, best
+        first, as dicts with their ``trial`` number, ``parameters``,
+        ``rung`` and result.
+        """
+        fractions = rung_fractions(self.rungs, self.eta)
+        survivors = list(range(len(self.trials)))
+        for rung, fraction in enumerate(fractions):
+            pending = [trial for trial in survivors if '%d/%d' % (rung, trial) not in self.results]
+            self.log("Rung %d/%d: %d trials on %.0f%% of the period, %d to run."
+                     % (rung + 1, len(fractions), len(survivors), 100 * fraction, len(pending)))
+            pool = ThreadPoolExecutor(max_workers=self.workers)
+            try:
+                futures = {pool.submit(self.evaluate, trial, rung, fraction): trial for trial in pending}
+                for future in as_completed(futures):
+                    trial = futures[future]
+                    result = self.results['%d/%d' % (rung, trial)] = future.result()
+                    self.save()
+                    self.log("  trial-%04d %s: %s" % (trial + 1, result['status'],
+                                                      result.get('error') or '%s %s' % (self.objective, result['objective'])))
+            except BaseException:
+                #let the backtests already running end (lean got the Ctrl+C too)
+                #so none of them writes to the trials once we return
+                pool.shutdown(cancel_futures=True)
+                raise
+            pool.shutdown()
+            survivors.sort(key=lambda trial: self.score(self.results['%d/%d' % (rung, trial)]), reverse=True)
+            if rung < len(fractions) - 1:
+                survivors = survivors[:max(1, int(math.ceil(len(survivors) / float(self.eta))))]
+        rung = len(fractions) - 1
+        return [dict(self.results['%d/%d' % (rung, trial)], trial='trial-%04d' % (trial + 1),
+                     parameters=self.trials[trial], rung=rung + 1)
+                for trial in survivors]
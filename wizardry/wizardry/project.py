@@ -0,0 +1,162 @@
+"""
+The files of a lean project which wizardry writes: ``main.py`` and the
+``parameters`` of ``config.json``.
+
+Generated sources mark their regions with ``# wizardry:begin <name>`` and
+``# wizardry:end <name>`` comments. Regenerating ``main.py`` only replaces
+the regions, so code written around them (``OnData``, helper methods...)
+survives, and files are only written, atomically, when their content
+changes: an unchanged project keeps its modification times and the push
+and backtest caches stay valid.
+"""
+import json
+import os
+import re
+
+from wizardry.cache import atomic_write
+
+MARKER = re.compile(r'^[ \t]*# wizardry:(begin|end) (\w+)[ \t]*$')
+
+#permissions of the project files wizardry creates
+MODE = 0o644
+
+
+def _write(path, text):
+    try:
+        info = os.stat(path)
+        #a file an older ``wizardry dedupe`` hardlinked to a blob is read-only, its copy needn't be
+        mode = info.st_mode & 0o777 if info.st_nlink == 1 else MODE
+    except OSError:
+        mode = MODE
+    atomic_write(path, text.encode('utf-8'), mode)
+
+
+def split_regions(source):
+    """
+    ``source`` as a list of plain lines and ``(name, lines)`` regions, the
+    marker lines included. ``None`` if the markers aren't well formed.
+    """
+    parts = []
+    region = None
+    for line in source.splitlines(True):
+        match = MARKER.match(line)
+        if match is None:
+            (region[1] if region else parts).append(line)
+        elif match.group(1) == 'begin':
+            if region is not None or any(isinstance(part, tuple) and part[0] == match.group(2) for part in parts):
+                return None
+            region = (match.group(2), [line])
+        else:
+            if region is None or region[0] != match.group(2):
+                return None
+            region[1].append(line)
+            parts.append(region)
+            region = None
+    return None if region is not None else parts
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip())
+
+
+def merge_regions(old, new):
+    """
+    ``old`` with its regions replaced by those of ``new``. Regions only in
+    ``new`` are inserted after the region preceding them in ``new`` (after
+    the block holding it when they are less indented: the methods after
+    ``Initialize``), those only in ``old`` are dropped. ``None`` if ``old``
+    can't be patched.
+    """
+    old_parts, new_parts = split_regions(old), split_regions(new)
+    if not old_parts or new_parts is None:
+        return None
+    regions = [part for part in new_parts if isinstance(part, tuple)]
+    existing = {part[0] for part in old_parts if isinstance(part, tuple)}
+    if not existing.intersection(name for name, lines in regions):
+        return None
+    #regions new to the file, attached to the region they follow in ``new``
+    following = {}
+    previous = None
+    for name, lines in regions:
+        if name in existing:
+            previous = name
+        else:
+            following.setdefault(previous, []).append(lines)
+    replaced = dict(regions)
+    merged = []
+    #less indented regions waiting for the end of the block they follow
+    dedented = []
+    for part in old_parts:
+        if not isinstance(part, tuple):
+            code = part.strip() and not part.lstrip().startswith('#')
+            if dedented and code and _indent(part) <= _indent(dedented[0][0]):
+                for lines in dedented:
+                    merged.extend(lines + ['\n'])
+                dedented = []
+            merged.append(part)
+            continue
+        name = part[0]
+        if name not in replaced:
+            #drop the blank line separating the region too
+            if merged and merged[-1] == '\n':
+                merged.pop()
+            continue
+        if None in following:
+            merged.extend(line for lines in following.pop(None) for line in lines + ['\n'])
+        merged.extend(replaced[name])
+        for lines in following.get(name, ()):
+            if _indent(lines[0]) < _indent(replaced[name][0]):
+                dedented.append(lines)
+                continue
+            merged.append('\n')
+            merged.extend(lines)
+    for lines in dedented:
+        merged.extend(['\n'] + lines)
+    return ''.join(merged)
+
+
+def write_source(directory, source, name='main.py'):
+    """
+    Write ``source`` to ``name`` in ``directory``. An existing file with
+    wizardry regions only gets its regions replaced. A file without them is
+    replaced, after a copy to ``<name>.bak``. Returns ``'unchanged'``,
+    ``'created'``, ``'updated'`` or ``'replaced'``.
+    """
+    path = os.path.join(directory, name)
+    try:
+        with open(path) as file:
+            old = file.read()
+    except OSError:
+        old = None
+    if old is None:
+        status, content = 'created', source
+    else:
+        content = merge_regions(old, source)
+        status = 'updated'
+        if content is None:
+            status, content = 'replaced', source
+    if content == old:
+        return 'unchanged'
+    if status == 'replaced':
+        _write(path + '.bak', old)
+    _write(path, content)
+    return status
+
+
+def update_config(directory, parameters):
+    """
+    Set the ``parameters`` of the ``config.json`` of the project in
+    ``directory``, keeping its other settings. The file is only rewritten
+    when the parameters changed. Returns whether it was.
+    """
+    path = os.path.join(directory, 'config.json')
+    try:
+        with open(path) as file:
+            config = json.load(file)
+    except (OSError, ValueError):
+        config = {'algorithm-language': 'Python'}
+    if config.get('parameters') == parameters:
+        return False
+    config['parameters'] = parameters
+    _write(path, json.dumps(config, indent=4) + '\n')
+    return True
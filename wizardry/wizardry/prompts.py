@@ -0,0 +1,103 @@
+"""
+PyInquirer questions for the interactive ``framework`` and ``library``
+commands. Only imported by those commands, so the prompt toolkit is never
+loaded by the non-interactive ones.
+"""
+from PyInquirer import style_from_dict, Token, prompt, Separator
+
+from wizardry.codegen import CHOICES
+from wizardry.library import STRATEGIES
+
+style = style_from_dict({
+    Token.Separator: '#cc5454',
+    Token.QuestionMark: '#673ab7 bold',
+    Token.Selected: '#ffba26',  # default
+    Token.Pointer: '#673ab7 bold',
+    Token.Instruction: '',  # default
+    Token.Answer: '#ffba26 bold',
+    Token.Question: '',
+})
+
+
+def _choices(field):
+    return [{'name': name} for name in CHOICES[field]]
+
+
+framework_questions = [
+    {
+        'type': 'checkbox',
+        'message': 'Choose one or several alpha',
+        'name': 'alpha',
+        'choices': [Separator('\n= Alpha =')] + _choices('alpha'),
+
+        'validate': lambda answer: 'You must choose one of these' \
+            if len(answer) == 0 else True
+
+    },
+    {
+        'type': 'list',
+        'message': 'Choose an universe',
+        'name': 'universe',
+        'choices': [Separator('\n= Universe =')] + _choices('universe'),
+        'validate': lambda answer: 'You must choose at least one of these' \
+            if len(answer) == 0 else True
+    },
+
+    {
+        'type': 'list',
+        'message': 'Choose the construction of your portfolio',
+        'name': 'portfolio',
+        'choices': [Separator('\n= Portfolio =')] + _choices('portfolio'),
+        'validate': lambda answer: 'You must choose at least one of these' \
+            if len(answer) == 0 else True
+    },
+    {
+            'type': 'list',
+            'message': 'Choose the type of execution',
+            'name': 'execution',
+            'choices': [Separator('\n= Execution =')] + _choices('execution'),
+            'validate': lambda answer: 'You must choose at least one of these' \
+                if len(answer) == 0 else True
+        },
+            {
+                    'type': 'list',
+                    'message': 'Choose the type of risk management',
+                    'name': 'risk',
+                    'choices': [Separator('\n= Risk =')] + _choices('risk'),
+                    'validate': lambda answer: 'You must choose at least one of these' \
+                        if len(answer) == 0 else True
+                },
+            {
+                    'type': 'input',
+                    'message': 'Type the start date in this format YYYY, MM, DD (e.g : 2017, 1, 1)',
+                    'name': 'start',
+                    'validate': lambda answer: 'You must choose at least one of these' \
+                        if len(answer) == 0 else True
+                },
+            {
+                    'type': 'input',
+                    'message': 'Set Strategy cash (e.g : 100000)',
+                    'name': 'cash',
+                    'validate': lambda answer: 'You must choose at least one of these' \
+                        if len(answer) == 0 else True
+                },
+            {
+                    'type': 'confirm',
+                    'message': 'Build the strategy?',
+                    'name': 'build',
+                    'validate': lambda answer: 'You must choose at least one of these' \
+                        if len(answer) == 0 else True
+                }
+]
+
+
+library_questions = [
+    {
+        'type': 'list',
+        'message': 'Choose one of these algorithm from Quantconnect library',
+        'name': 'catalog',
+        'choices': [Separator('\n= Our Super Catalog =')] + [{'name': name} for name in STRATEGIES],
+        'validate': lambda answer: 'You must choose one of these' \
+            if len(answer) == 0 else True
+
+    }]
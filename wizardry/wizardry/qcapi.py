@@ -0,0 +1,97 @@
+"""
+An index of the QuantConnect API, as data, for checking algorithms offline
+(see ``wizardry.validate``).
+
+``MODULES`` lists the names each module exports to ``from <module> import
+*``, ``ALGORITHM`` the members of ``QCAlgorithm`` reachable as ``self.<name>``
+in an algorithm. It only needs to cover what algorithms written with wizardry
+use: a name missing from here is reported as undefined, so extend it when a
+component of the catalog (see ``wizardry.catalog``) needs more.
+"""
+
+MODULES = {
+    'System': (
+        'Action', 'Array', 'DateTime', 'DayOfWeek', 'Decimal', 'Double', 'Func', 'Int32', 'Int64',
+        'Math', 'Object', 'String', 'TimeSpan',
+    ),
+    'QuantConnect': (
+        'BrokerageName', 'DataNormalizationMode', 'Field', 'Insight', 'InsightDirection',
+        'InsightType', 'Market', 'OptionRight', 'OptionStyle', 'Resolution', 'SecurityType',
+        'Symbol', 'SymbolCache', 'TickType', 'TimeZones', 'Chart', 'Series', 'SeriesType',
+    ),
+    'QuantConnect.Algorithm': (
+        'QCAlgorithm', 'QCAlgorithmFramework',
+    ),
+    'QuantConnect.Indicators': (
+        'AverageTrueRange', 'BollingerBands', 'CommodityChannelIndex', 'ExponentialMovingAverage',
+        'IndicatorDataPoint', 'IndicatorExtensions', 'LinearWeightedMovingAverage', 'Maximum',
+        'Minimum', 'Momentum', 'MomentumPercent', 'MovingAverageConvergenceDivergence',
+        'MovingAverageType', 'RateOfChange', 'RateOfChangePercent', 'RelativeStrengthIndex',
+        'RollingWindow', 'SimpleMovingAverage', 'StandardDeviation', 'Stochastic', 'Sum',
+    ),
+    'QuantConnect.Algorithm.Framework': (
+        'NotifiedSecurityChanges',
+    ),
+    'QuantConnect.Algorithm.Framework.Risk': (
+        'CompositeRiskManagementModel', 'MaximumDrawdownPercentPerSecurity',
+        'MaximumDrawdownPercentPortfolio', 'MaximumSectorExposureRiskManagementModel',
+        'MaximumUnrealizedProfitPercentPerSecurity', 'NullRiskManagementModel',
+        'RiskManagementModel', 'TrailingStopRiskManagementModel',
+    ),
+    'QuantConnect.Algorithm.Framework.Alphas': (
+        'AlphaModel', 'BasePairsTradingAlphaModel', 'CompositeAlphaModel', 'ConstantAlphaModel',
+        'EmaCrossAlphaModel', 'HistoricalReturnsAlphaModel', 'MacdAlphaModel', 'NullAlphaModel',
+        'PearsonCorrelationPairsTradingAlphaModel', 'RsiAlphaModel',
+    ),
+    'QuantConnect.Algorithm.Framework.Selection': (
+        'CoarseFundamentalUniverseSelectionModel', 'EmaCrossUniverseSelectionModel',
+        'FineFundamentalUniverseSelectionModel', 'FundamentalUniverseSelectionModel',
+        'FutureUniverseSelectionModel', 'ManualUniverseSelectionModel', 'NullUniverseSelectionModel',
+        'OptionUniverseSelectionModel', 'QC500UniverseSelectionModel',
+        'ScheduledUniverseSelectionModel', 'UncorrelatedUniverseSelectionModel',
+        'UniverseSelectionModel',
+    ),
+    'QuantConnect.Algorithm.Framework.Execution': (
+        'ExecutionModel', 'ImmediateExecutionModel', 'NullExecutionModel',
+        'StandardDeviationExecutionModel', 'VolumeWeightedAveragePriceExecutionModel',
+    ),
+    'QuantConnect.Algorithm.Framework.Portfolio': (
+        'BlackLittermanOptimizationPortfolioConstructionModel',
+        'ConfidenceWeightedPortfolioConstructionModel', 'EqualWeightingPortfolioConstructionModel',
+        'InsightWeightingPortfolioConstructionModel', 'MeanVarianceOptimizationPortfolioConstructionModel',
+        'NullPortfolioConstructionModel', 'PortfolioConstructionModel', 'PortfolioTarget',
+    ),
+    'datetime': (
+        'date', 'datetime', 'time', 'timedelta', 'timezone',
+    ),
+}
+
+ALGORITHM = (
+    'AD', 'ADX', 'ADXR', 'ALMA', 'AO', 'APO', 'AROON', 'ATR', 'ActiveSecurities', 'AddAlpha',
+    'AddCfd', 'AddChart', 'AddCrypto', 'AddData', 'AddEquity', 'AddForex', 'AddFuture',
+    'AddFutureContract', 'AddIndex', 'AddOption', 'AddOptionContract', 'AddRiskManagement',
+    'AddSecurity', 'AddSecurityInitializer', 'AddUniverse', 'AddUniverseOptions',
+    'AddUniverseSelection', 'BB', 'BOP', 'Benchmark', 'BrokerageModel', 'CCI', 'CMO',
+    'CalculateOrderQuantity', 'Consolidate', 'CurrentSlice', 'DCH', 'DEMA', 'DateRules', 'Debug',
+    'DefaultOrderProperties', 'Download', 'EMA', 'EMV', 'EmitInsights', 'EndDate', 'Error',
+    'ExerciseOption', 'FRAMA', 'FutureChainProvider', 'GetParameter', 'HMA', 'History', 'ICHIMOKU',
+    'Identity', 'Initialize', 'Insights', 'IsMarketOpen', 'IsWarmingUp', 'KAMA', 'KCH', 'LOGR',
+    'LSMA', 'LWMA', 'LimitIfTouchedOrder', 'LimitOrder', 'Liquidate', 'LiveMode', 'Log', 'MACD',
+    'MAX', 'MFI', 'MIN', 'MOM', 'MOMP', 'MarketOnCloseOrder', 'MarketOnOpenOrder', 'MarketOrder',
+    'NATR', 'Name', 'Notify', 'OBV', 'ObjectStore', 'OptionChainProvider', 'PPO', 'PSAR', 'Plot',
+    'Portfolio', 'Quit', 'ROC', 'ROCP', 'ROCR', 'RSI', 'RegisterIndicator', 'RemoveFutureContract',
+    'RemoveOptionContract', 'RemoveSecurity', 'SAR', 'SMA', 'STD', 'STO', 'SUM', 'SWISS',
+    'Schedule', 'Securities', 'SetAccountCurrency', 'SetAlpha', 'SetBenchmark', 'SetBrokerageModel',
+    'SetCash', 'SetEndDate', 'SetExecution', 'SetHoldings', 'SetName', 'SetPortfolioConstruction',
+    'SetRiskFreeInterestRateModel', 'SetRiskManagement', 'SetSecurityInitializer', 'SetStartDate',
+    'SetTimeZone', 'SetUniverseSelection', 'SetWarmUp', 'SetWarmup', 'Settings', 'StartDate',
+    'Status', 'StopLimitOrder', 'StopMarketOrder', 'SubscriptionManager', 'Symbol', 'T3', 'TEMA',
+    'TRIMA', 'TRIX', 'TSI', 'Time', 'TimeRules', 'TimeZone', 'TradeBuilder', 'Train',
+    'Transactions', 'ULTOSC', 'UniverseManager', 'UniverseSettings', 'UtcTime', 'VAR', 'VWAP',
+    'WILR', 'WMA', 'WarmUpIndicator', 'ZLEMA', 'OnAssignmentOrderEvent', 'OnBrokerageMessage',
+    'OnData', 'OnDelistings', 'OnDividends', 'OnEndOfAlgorithm', 'OnEndOfDay', 'OnMarginCall',
+    'OnOrderEvent', 'OnSecuritiesChanged', 'OnSplits', 'OnSymbolChangedEvents', 'OnWarmupFinished',
+)
+
+#base classes of the algorithm class of a project
+ALGORITHM_CLASSES = ('QCAlgorithm', 'QCAlgorithmFramework')
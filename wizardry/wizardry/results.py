@@ -0,0 +1,473 @@
+"""
+A columnar store of backtest results: ``wizardry results``.
+
+Every ingested result JSON (the file lean writes next to a backtest) is
+reduced to its statistics, equity curve and orders, then appended to the
+store under ``<cache dir>/results``, partitioned by project. Each ingestion
+writes a new immutable segment: one ``.npy`` file per column, with the
+variable-length equity curves and orders concatenated and indexed by
+offsets. Queries memory-map only the columns they filter, sort or show, one
+segment at a time, so comparing thousands of runs never loads them whole.
+"""
+import fnmatch
+import glob
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from wizardry.cache import cache_dir
+
+#columns shown by a query unless told otherwise
+DEFAULT_COLUMNS = ('project', 'run', 'sharpe_ratio', 'drawdown', 'net_profit', 'total_trades')
+
+#segments of a project are merged into one past this count
+MAX_SEGMENTS = 32
+
+#files of a lean output directory which aren't full backtest results
+SKIPPED_SUFFIXES = ('-summary.json', '-order-events.json', 'config.json')
+
+#fraction of a second of a lean time: 7 digits, where datetime only parses 3 or 6 before Python 3.11
+FRACTION = re.compile(r'\.(\d+)')
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '=': np.equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+class ResultsError(ValueError):
+    """Raised for an invalid query or an unknown run."""
+
+
+def column_name(statistic):
+    """The column of a lean statistic, e.g. ``Sharpe Ratio`` -> ``sharpe_ratio``."""
+    return re.sub(r'[^a-z0-9]+', '_', statistic.lower()).strip('_')
+
+
+def parse_number(value):
+    """
+    The number in a lean statistic such as ``1.25``, ``3.1%`` or
+    ``$101,000.00``, ``None`` if it isn't one.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'[^\d+\-.]*([+-]?[\d.]+(?:[eE][+-]?\d+)?)\s*%?', str(value).replace(',', '').strip())
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def parse_condition(condition):
+    """``'sharpe_ratio>1'`` -> ``('sharpe_ratio', '>', 1.0)``."""
+    match = re.fullmatch(r'\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(\S+)\s*', condition)
+    value = parse_number(match.group(3)) if match else None
+    if value is None:
+        raise ResultsError("Invalid condition %r, expected e.g. 'sharpe_ratio>1'" % condition)
+    return match.group(1), match.group(2), value
+
+
+def _get(data, key):
+    #lean results use camelCase keys, older versions PascalCase
+    return data.get(key, data.get(key[:1].upper() + key[1:]))
+
+
+def _timestamp(value):
+    """Seconds since the epoch of a lean time, ISO string or number."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return 0
+    value = FRACTION.sub(lambda match: '.' + match.group(1)[:6].ljust(6, '0'), value.replace('Z', '+00:00'), 1)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def is_result(data):
+    return isinstance(data, dict) and isinstance(_get(data, 'statistics'), dict)
+
+
+def parse_result(data):
+    """
+    The ``statistics`` (column -> number), ``equity`` curve (times, values)
+    and ``orders`` (time, symbol, quantity, price) of a lean result JSON.
+    """
+    statistics = {}
+    for name, value in _get(data, 'statistics').items():
+        number = parse_number(value)
+        if number is not None:
+            statistics[column_name(name)] = number
+    times, values = [], []
+    chart = (_get(data, 'charts') or {}).get('Strategy Equity') or {}
+    series = (_get(chart, 'series') or {}).get('Equity') or {}
+    for point in _get(series, 'values') or ():
+        if isinstance(point, dict):
+            times.append(_timestamp(_get(point, 'x')))
+            values.append(float(_get(point, 'y')))
+        else:
+            #candlestick points: time, open, high, low, close
+            times.append(int(point[0]))
+            values.append(float(point[-1]))
+    orders = []
+    raw = _get(data, 'orders') or {}
+    for order in (raw.values() if isinstance(raw, dict) else raw):
+        symbol = _get(order, 'symbol')
+        if isinstance(symbol, dict):
+            symbol = _get(symbol, 'value')
+        orders.append((_timestamp(_get(order, 'time')), str(symbol),
+                       float(_get(order, 'quantity') or 0), float(_get(order, 'price') or 0)))
+    return {'statistics': statistics, 'equity': (times, values), 'orders': orders}
+
+
+def result_files(paths, missing=None):
+    """
+    The result JSON files at ``paths``, directories searched recursively.
+    Paths which don't exist are skipped, and added to the ``missing`` list.
+    """
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        if not os.path.isdir(path):
+            if missing is not None:
+                missing.append(path)
+            continue
+        for root, directories, names in os.walk(path):
+            directories.sort()
+            files.extend(os.path.join(root, name) for name in sorted(names)
+                         if name.endswith('.json') and not name.endswith(SKIPPED_SUFFIXES))
+    return files
+
+
+def guess_run(path):
+    """
+    The project and run of a result file. lean writes them to
+    ``<project>/backtests/<timestamp>/<id>.json``.
+    """
+    parts = os.path.abspath(path)[:-len('.json')].split(os.sep)
+    if 'backtests' in parts[1:-1]:
+        index = len(parts) - 1 - parts[::-1].index('backtests')
+        return parts[index - 1], '/'.join(parts[index + 1:])
+    return parts[-2], parts[-1]
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _merge_offsets(offsets):
+    merged, shift = [np.zeros(1, dtype=np.int64)], 0
+    for offset in offsets:
+        merged.append(np.asarray(offset[1:]) + shift)
+        shift += int(offset[-1])
+    return np.concatenate(merged)
+
+
+class Segment(object):
+    """One immutable batch of runs, its columns memory-mapped on demand."""
+    def __init__(self, path):
+        self.path = path
+        self._meta = None
+        self.size = len(self.array('created'))
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            with open(os.path.join(self.path, 'meta.json')) as file:
+                self._meta = json.load(file)
+        return self._meta
+
+    def array(self, name):
+        path = os.path.join(self.path, name + '.npy')
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            #empty arrays can't be memory-mapped
+            return np.load(path)
+
+    def column(self, name):
+        """The numeric column ``name``, NaN for runs without it."""
+        if name == 'created':
+            return self.array('created')
+        if os.path.isfile(os.path.join(self.path, 'stat.%s.npy' % name)):
+            return self.array('stat.' + name)
+        return np.full(self.size, np.nan)
+
+    def slice(self, kind, row):
+        """The part of the concatenated ``kind`` arrays belonging to ``row``."""
+        offsets = self.array(kind + '_offset')
+        return slice(int(offsets[row]), int(offsets[row + 1]))
+
+
+class ResultStore(object):
+    """
+    Backtest results under ``root``, one directory per project holding its
+    segments. Segments are only ever added (or merged by ``compact``).
+    """
+    def __init__(self, root=None):
+        self.root = root or cache_dir('results')
+
+    def _partition(self, project):
+        return os.path.join(self.root, quote(project, safe=''))
+
+    def projects(self, pattern='*'):
+        """The projects with results, those matching the glob ``pattern``."""
+        try:
+            names = sorted(unquote(name) for name in os.listdir(self.root) if not name.startswith('.'))
+        except OSError:
+            return []
+        return [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+
+    def segments(self, project):
+        return sorted(glob.glob(os.path.join(self._partition(project), 'seg-*')))
+
+    def sources(self, project):
+        """SHA-256 of every result file already ingested for ``project``."""
+        return {source for path in self.segments(project) for source in Segment(path).meta['sources']}
+
+    def ingest(self, paths, project=None, missing=None):
+        """
+        Append the results found at ``paths`` (files or lean output
+        directories) to the store, under ``project`` or the project each
+        file was written by. Files ingested before are skipped, paths which
+        don't exist are added to ``missing``. Returns the number of runs
+        added per project.
+        """
+        batches = {}
+        for path in result_files(paths, missing):
+            with open(path, 'rb') as file:
+                raw = file.read()
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except ValueError:
+                continue
+            if not is_result(data):
+                continue
+            name, run = guess_run(path)
+            batches.setdefault(project or name, []).append(
+                (run, hashlib.sha256(raw).hexdigest(), parse_result(data)))
+        added = {}
+        for name, results in batches.items():
+            known = self.sources(name)
+            fresh = []
+            for run, source, result in results:
+                if source not in known:
+                    known.add(source)
+                    fresh.append((run, source, result))
+            if fresh:
+                self.append(name, fresh)
+                added[name] = len(fresh)
+        return added
+
+    def append(self, project, results):
+        """Write the ``(run, source, parsed result)`` of ``results`` as a new segment."""
+        statistics = sorted({key for _, _, result in results for key in result['statistics']})
+        symbols = sorted({order[1] for _, _, result in results for order in result['orders']})
+        codes = {symbol: code for code, symbol in enumerate(symbols)}
+        equity = [result['equity'] for _, _, result in results]
+        orders = [result['orders'] for _, _, result in results]
+        arrays = {'created': np.full(len(results), time.time())}
+        for key in statistics:
+            arrays['stat.' + key] = np.array([result['statistics'].get(key, np.nan)
+                                              for _, _, result in results], dtype=np.float64)
+        arrays['equity_offset'] = _offsets([len(times) for times, _ in equity])
+        arrays['equity_time'] = np.fromiter(itertools.chain.from_iterable(times for times, _ in equity),
+                                            dtype=np.int64)
+        arrays['equity_value'] = np.fromiter(itertools.chain.from_iterable(values for _, values in equity),
+                                             dtype=np.float64)
+        arrays['order_offset'] = _offsets([len(run) for run in orders])
+        flat = list(itertools.chain.from_iterable(orders))
+        arrays['order_time'] = np.array([order[0] for order in flat], dtype=np.int64)
+        arrays['order_symbol'] = np.array([codes[order[1]] for order in flat], dtype=np.int32)
+        arrays['order_quantity'] = np.array([order[2] for order in flat], dtype=np.float64)
+        arrays['order_price'] = np.array([order[3] for order in flat], dtype=np.float64)
+        meta = {
+            'project': project,
+            'runs': [run for run, _, _ in results],
+            'sources': [source for _, source, _ in results],
+            'statistics': statistics,
+            'symbols': symbols,
+        }
+        self._write(project, meta, arrays)
+        if len(self.segments(project)) > MAX_SEGMENTS:
+            self.compact(project)
+
+    def _write(self, project, meta, arrays):
+        partition = self._partition(project)
+        name = 'seg-%020d-%s' % (time.time_ns(), uuid.uuid4().hex[:8])
+        tmp = os.path.join(partition, '.tmp-' + name)
+        os.makedirs(tmp)
+        try:
+            for column, array in arrays.items():
+                np.save(os.path.join(tmp, column + '.npy'), array)
+            with open(os.path.join(tmp, 'meta.json'), 'w') as file:
+                json.dump(meta, file)
+            #readers only ever see complete segments
+            os.rename(tmp, os.path.join(partition, name))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def compact(self, project):
+        """Merge the segments of ``project`` into one."""
+        paths = self.segments(project)
+        if len(paths) < 2:
+            return
+        segments = [Segment(path) for path in paths]
+        statistics = sorted(set().union(*(segment.meta['statistics'] for segment in segments)))
+        symbols = sorted(set().union(*(segment.meta['symbols'] for segment in segments)))
+        arrays = {'created': np.concatenate([segment.array('created') for segment in segments])}
+        for key in statistics:
+            arrays['stat.' + key] = np.concatenate([segment.column(key) for segment in segments])
+        for kind, columns in (('equity', ('time', 'value')), ('order', ('time', 'quantity', 'price'))):
+            arrays[kind + '_offset'] = _merge_offsets([segment.array(kind + '_offset') for segment in segments])
+            for column in columns:
+                arrays['%s_%s' % (kind, column)] = np.concatenate(
+                    [segment.array('%s_%s' % (kind, column)) for segment in segments])
+        #renumber the symbol codes of every segment into the merged symbols
+        arrays['order_symbol'] = np.concatenate([
+            np.searchsorted(symbols, segment.meta['symbols']).astype(np.int32)[segment.array('order_symbol')]
+            for segment in segments
+        ])
+        meta = {
+            'project': project,
+            'runs': [run for segment in segments for run in segment.meta['runs']],
+            'sources': [source for segment in segments for source in segment.meta['sources']],
+            'statistics': statistics,
+            'symbols': symbols,
+        }
+        self._write(project, meta, arrays)
+        for path in paths:
+            shutil.rmtree(path)
+
+    def _select(self, projects, conditions):
+        """``(segment, matching rows)`` of every segment, in store order."""
+        for project in self.projects(projects):
+            for path in self.segments(project):
+                segment = Segment(path)
+                mask = np.ones(segment.size, dtype=bool)
+                for column, operator, value in conditions:
+                    values = segment.column(column)
+                    with np.errstate(invalid='ignore'):
+                        mask &= OPERATORS[operator](values, value) & ~np.isnan(values)
+                rows = np.flatnonzero(mask)
+                if len(rows):
+                    yield segment, rows
+
+    def query(self, where=(), columns=DEFAULT_COLUMNS, projects='*', sort=None, limit=None):
+        """
+        The runs of the projects matching ``projects`` which meet every
+        condition of ``where``, as dicts of their ``columns``. ``sort`` names
+        a column to sort by, prefixed with ``-`` for descending order; runs
+        without it come last.
+        """
+        key = sort.lstrip('-') if sort else None
+        needed = {column for column in columns if column not in ('project', 'run')}
+        if key:
+            needed.add(key)
+        matches = []
+        for segment, rows in self._select(projects, [parse_condition(condition) for condition in where]):
+            matches.append((segment, rows, {column: np.asarray(segment.column(column)[rows])
+                                            for column in needed}))
+        starts = _offsets([len(rows) for _, rows, _ in matches])
+        if key:
+            values = np.concatenate([values[key] for _, _, values in matches]) if matches else np.zeros(0)
+            order = np.argsort(-values if sort.startswith('-') else values, kind='stable')
+        else:
+            order = np.arange(starts[-1])
+        order = order[:limit]
+        results = []
+        for index, match in zip(order, np.searchsorted(starts, order, side='right') - 1):
+            segment, rows, values = matches[match]
+            local = index - starts[match]
+            row = {}
+            for column in columns:
+                if column == 'project':
+                    row[column] = segment.meta['project']
+                elif column == 'run':
+                    row[column] = segment.meta['runs'][rows[local]]
+                else:
+                    value = values[column][local]
+                    row[column] = None if np.isnan(value) else float(value)
+            results.append(row)
+        return results
+
+    def aggregate(self, columns, where=(), projects='*'):
+        """
+        Per project, the number of ``runs`` meeting ``where`` and the
+        ``mean``, ``min`` and ``max`` of each of the numeric ``columns``.
+        """
+        columns = [column for column in columns if column not in ('project', 'run')]
+        conditions = [parse_condition(condition) for condition in where]
+        summaries = {}
+        for segment, rows in self._select(projects, conditions):
+            project = segment.meta['project']
+            summary = summaries.setdefault(project, {
+                'project': project,
+                'runs': 0,
+                'columns': {column: [0, 0.0, np.inf, -np.inf] for column in columns},
+            })
+            summary['runs'] += len(rows)
+            for column in columns:
+                values = np.asarray(segment.column(column)[rows])
+                values = values[~np.isnan(values)]
+                if len(values):
+                    state = summary['columns'][column]
+                    state[0] += len(values)
+                    state[1] += float(values.sum())
+                    state[2] = min(state[2], float(values.min()))
+                    state[3] = max(state[3], float(values.max()))
+        results = []
+        for project in sorted(summaries):
+            summary = summaries[project]
+            row = {'project': project, 'runs': summary['runs']}
+            for column, (count, total, low, high) in summary['columns'].items():
+                row[column] = ({'mean': total / count, 'min': low, 'max': high} if count
+                               else {'mean': None, 'min': None, 'max': None})
+            results.append(row)
+        return results
+
+    def curve(self, project, run):
+        """The equity curve of ``run``: times (epoch seconds) and values."""
+        for path in reversed(self.segments(project)):
+            segment = Segment(path)
+            if run in segment.meta['runs']:
+                part = segment.slice('equity', segment.meta['runs'].index(run))
+                return (np.asarray(segment.array('equity_time')[part]),
+                        np.asarray(segment.array('equity_value')[part]))
+        raise ResultsError("No run %r of project %r in the results" % (run, project))
+
+
+def format_table(rows, columns):
+    """``rows`` as lines of aligned text under a header of ``columns``."""
+    def cell(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return '%.4g' % value
+        return str(value)
+    cells = [[cell(row[column]) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[i]) for line in cells]) for i, column in enumerate(columns)]
+    return ['  '.join(text.ljust(width) for text, width in zip(line, widths)).rstrip()
+            for line in [list(columns)] + cells]
@@ -0,0 +1,317 @@
+"""
+The single way wizardry runs lean commands.
+
+Every command is an asyncio subprocess whose stdout and stderr are read
+line by line as they come: shown (or not), scanned for authentication
+failures and kept, up to the last ``MAX_OUTPUT`` characters, for the
+caller to parse. A command can be given a timeout, is terminated (then
+killed) when the task running it is cancelled, and independent commands
+can run concurrently with ``run_all``.
+
+A command goes to the ``wizardry serve`` worker when one is running, so it
+doesn't pay the lean CLI start-up, and to the ``lean`` executable otherwise.
+Commands needing a terminal (``lean login``, the prompts of ``lean cloud
+live``...) run with ours, unpiped: a prompt has no newline to wait for.
+
+asyncio is only imported once a command runs, it would otherwise add to
+the start-up of every wizardry command.
+"""
+import codecs
+import collections
+import re
+import socket
+import subprocess
+import sys
+import threading
+
+from wizardry import serve
+from wizardry.trace import lean_phase, span
+
+#characters of output kept, the last ones: lean prints its results at the end
+MAX_OUTPUT = 1024 * 1024
+
+#longest line read at once, longer ones are passed on in pieces
+LINE_LIMIT = 64 * 1024
+
+#seconds a cancelled or timed out lean has to exit before it is killed
+GRACE = 5
+
+#exit code of a command cancelled before it finished
+CANCELLED = -1
+
+#what lean prints when it needs ``lean login``
+AUTH_FAILURE = re.compile(r'lean login|not logged in|invalid credentials|unauthori[sz]ed|authentication failed', re.I)
+
+
+class Result(collections.namedtuple('Result', 'code output auth_failed timed_out')):
+    """The exit code and output of a lean command, whether it asked for a login and whether it timed out."""
+
+
+class Output(object):
+    """
+    The output of a command: written through to our stdout or stderr when
+    ``echo`` is set, scanned line by line for authentication failures, and
+    kept up to its last ``limit`` characters.
+    """
+    def __init__(self, echo=True, limit=MAX_OUTPUT):
+        self.echo = echo
+        self.limit = limit
+        self.chunks = collections.deque()
+        self.kept = 0
+        self.size = 0
+        self.auth_failed = False
+        self._line = ''
+
+    def write(self, text, stream=None):
+        if not text:
+            return 0
+        if self.echo:
+            stream = stream or sys.stdout
+            stream.write(text)
+            stream.flush()
+        self.size += len(text)
+        self.chunks.append(text)
+        self.kept += len(text)
+        while self.kept - len(self.chunks[0]) >= self.limit:
+            self.kept -= len(self.chunks.popleft())
+        lines = (self._line + text).split('\n')
+        self._line = lines.pop()[-LINE_LIMIT:]
+        if not self.auth_failed and any(AUTH_FAILURE.search(line) for line in lines):
+            self.auth_failed = True
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        """Scan the last line, if the output didn't end with a newline."""
+        if not self.auth_failed and AUTH_FAILURE.search(self._line):
+            self.auth_failed = True
+        self._line = ''
+
+    def text(self):
+        """The output kept, with a note of what was dropped before it."""
+        text = ''.join(self.chunks)[-self.limit:]
+        dropped = self.size - len(text)
+        return ('[%d characters of output dropped]\n' % dropped if dropped else '') + text
+
+
+async def _pump(stream, output, target):
+    """Copy the lines of ``stream`` to ``output`` until its end."""
+    import asyncio
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        try:
+            data = await stream.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            output.write(decoder.decode(e.partial, final=True), target)
+            return
+        except asyncio.LimitOverrunError as e:
+            data = await stream.readexactly(e.consumed)
+        output.write(decoder.decode(data), target)
+
+
+async def _stop(process):
+    """Terminate ``process``, killing it if it lingers."""
+    import asyncio
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), GRACE)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def _submit(sock, args, cwd, output, timeout):
+    """
+    Run the command on the worker connected to ``sock``. The code is
+    ``None`` if the worker is busy with another job.
+    """
+    import asyncio
+    with sock:
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(serve.submit, sock, args, cwd, output), timeout), False
+        except asyncio.TimeoutError:
+            #the worker finishes the job, we only stop waiting for it
+            return 1, True
+        except (OSError, ValueError) as e:
+            output.write("Lost the wizardry serve worker: %s\n" % e, sys.stderr)
+            return 1, False
+        finally:
+            #wakes up the thread waiting for the worker, if it still is
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+async def _spawn(args, cwd, output, timeout):
+    """Run the command with the lean executable."""
+    import asyncio
+    interactive = serve.is_interactive(args)
+    pipe = None if interactive else asyncio.subprocess.PIPE
+    try:
+        process = await asyncio.create_subprocess_exec('lean', *args, cwd=cwd, stdout=pipe, stderr=pipe,
+                                                       limit=LINE_LIMIT)
+    except OSError as e:
+        output.write("Can't run lean: %s\n" % e, sys.stderr)
+        return 127, False
+    steps = [process.wait()]
+    if not interactive:
+        steps += [_pump(process.stdout, output, sys.stdout), _pump(process.stderr, output, sys.stderr)]
+    try:
+        await asyncio.wait_for(asyncio.gather(*steps), timeout)
+    except asyncio.TimeoutError:
+        await _stop(process)
+        return process.returncode, True
+    except asyncio.CancelledError:
+        await _stop(process)
+        raise
+    return process.returncode, False
+
+
+async def execute(args, cwd=None, timeout=None, echo=True, worker=True):
+    """
+    Run ``lean <args>`` in ``cwd`` (the current directory by default), on
+    the worker when ``worker`` is set and one is running. The output is
+    shown as it comes when ``echo`` is set. Gives up after ``timeout``
+    seconds. Returns a ``Result``.
+    """
+    args = [str(arg) for arg in args]
+    output = Output(echo)
+    with span(lean_phase(args)) as attributes:
+        sock = None
+        if worker and args and not serve.is_interactive(args):
+            sock = serve.connect()
+        code = None
+        if sock is not None:
+            code, timed_out = await _submit(sock, args, cwd, output, timeout)
+            attributes['worker'] = code is not None
+        if code is None:
+            code, timed_out = await _spawn(args, cwd, output, timeout)
+        output.close()
+        attributes.update(exit_code=code, bytes=output.size)
+        if timed_out:
+            attributes['timeout'] = timeout
+    return Result(code, output.text(), output.auth_failed, timed_out)
+
+
+def run(args, cwd=None, timeout=None, echo=True, worker=True):
+    """Run ``lean <args>`` to its end, see ``execute``."""
+    import asyncio
+    return asyncio.run(execute(args, cwd, timeout, echo, worker))
+
+
+def run_all(commands, concurrency=4, timeout=None, echo=False):
+    """
+    Run the independent ``(args, cwd)`` ``commands`` at the same time, at
+    most ``concurrency`` of them at once, with the lean executable. Their
+    output isn't shown by default, it would be interleaved. Returns their
+    ``Result`` in the order of ``commands``.
+    """
+    import asyncio
+
+    async def run_commands():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(args, cwd):
+            async with semaphore:
+                return await execute(args, cwd, timeout, echo, worker=False)
+
+        return await asyncio.gather(*(one(args, cwd) for args, cwd in commands))
+
+    return asyncio.run(run_commands())
+
+
+def run_lean(args, cwd=None, login=True):
+    """
+    Run ``lean <args>`` in ``cwd`` (the current directory by default) and
+    return its exit code. When it fails asking for a login (and ``login``
+    is set), ``lean login`` runs and then the command again.
+    """
+    result = run(args, cwd)
+    if login and result.code and result.auth_failed and list(args[:1]) != ['login']:
+        print("lean needs you to log in to QuantConnect.")
+        if run(['login'], cwd).code == 0:
+            result = run(args, cwd)
+    return result.code
+
+
+def capture_lean(args, cwd=None, timeout=None):
+    """
+    Run ``lean <args>`` with the lean executable, collecting its output
+    instead of showing it. Returns ``(exit code, output)``, raises
+    ``subprocess.TimeoutExpired`` after ``timeout`` seconds.
+    """
+    result = run(args, cwd, timeout, echo=False, worker=False)
+    if result.timed_out:
+        raise subprocess.TimeoutExpired(['lean'] + list(args), timeout, result.output)
+    return result.code, result.output
+
+
+def tee_lean(args, cwd=None):
+    """
+    Run ``lean <args>`` with the lean executable, showing its output as it
+    comes while collecting it. Returns ``(exit code, output)``.
+    """
+    result = run(args, cwd, worker=False)
+    return result.code, result.output
+
+
+class Job(object):
+    """
+    A lean command running in the background, on its own thread and event
+    loop, which can be polled, waited for or cancelled.
+    """
+    def __init__(self, args, cwd=None, timeout=None, echo=True):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(execute(args, cwd, timeout, echo, worker=False))
+        self.result = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        import asyncio
+        try:
+            self.result = self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            self.result = Result(CANCELLED, '', False, False)
+        finally:
+            self.loop.close()
+
+    @property
+    def returncode(self):
+        """The exit code, ``None`` while running."""
+        return self.result.code if self.result is not None else None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return self.returncode
+
+    def cancel(self):
+        """Stop the command (terminating lean) and wait for it."""
+        if self.thread.is_alive():
+            try:
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                #the loop just closed
+                pass
+        self.thread.join()
+
+
+def start_lean(args, cwd=None):
+    """
+    Start ``lean <args>`` with the lean executable, its output going to
+    ours, and return the running ``Job``.
+    """
+    return Job(args, cwd)
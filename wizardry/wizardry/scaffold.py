@@ -0,0 +1,143 @@
+"""
+Creating lean projects without lean: ``wizardry create``.
+
+A new project is rendered from the templates in ``wizardry/templates``,
+read once per process, into a hidden directory next to it which is then
+renamed into place, so a project is either there whole or not at all.
+Nothing reaches the cloud: the project is registered there by its first
+``lean cloud push``, or by ``push_projects`` for many projects at once.
+"""
+import functools
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from wizardry.trace import span
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+#file of the project -> its template, {{project}} is the name of the project
+FILES = (
+    ('.idea/misc.xml', 'misc.xml.tmpl'),
+    ('.idea/modules.xml', 'modules.xml.tmpl'),
+    ('.idea/{{project}}.iml', 'module.iml.tmpl'),
+    ('.idea/workspace.xml', 'workspace.xml.tmpl'),
+    ('.vscode/launch.json', 'launch.json.tmpl'),
+    ('.vscode/settings.json', 'settings.json.tmpl'),
+    ('config.json', 'config.json.tmpl'),
+    ('main.py', 'main.py.tmpl'),
+    ('research.ipynb', 'research.ipynb.tmpl'),
+)
+
+#permissions of the files and directories of a new project
+MODE = 0o644
+DIRECTORY_MODE = 0o755
+
+#characters lean accepts in a project name, "/" nesting it in folders
+VALID_NAME = re.compile(r'^[\w\- ]+(/[\w\- ]+)*$')
+
+
+class ScaffoldError(ValueError):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def load_templates(directory=TEMPLATES):
+    """``{template: text}`` of every template of ``FILES``."""
+    templates = {}
+    for _, template in FILES:
+        with open(os.path.join(directory, template), encoding='utf-8') as file:
+            templates[template] = file.read()
+    return templates
+
+
+def class_name(name):
+    """The algorithm class of the project ``name``: ``my-rsi 2`` gives ``MyRsi2``."""
+    words = re.findall(r'[A-Za-z0-9]+', name.rsplit('/', 1)[-1])
+    identifier = ''.join(word[0].upper() + word[1:] for word in words)
+    if not identifier or identifier[0].isdigit():
+        identifier = 'Algorithm' + identifier
+    return identifier
+
+
+def render(name, templates=None):
+    """``{path: text}`` of the files of the project ``name``."""
+    templates = templates or load_templates()
+    values = {'{{project}}': name.rsplit('/', 1)[-1], '{{class}}': class_name(name)}
+
+    def fill(text):
+        for placeholder, value in values.items():
+            text = text.replace(placeholder, value)
+        return text
+
+    return {fill(path): fill(templates[template]) for path, template in FILES}
+
+
+def check_name(name):
+    name = name.strip().strip('/')
+    if not VALID_NAME.match(name) or any(part.strip() in ('', '.', '..') for part in name.split('/')):
+        raise ScaffoldError("%r isn't a valid project name" % name)
+    return name
+
+
+def create_project(name, workspace='.'):
+    """
+    Create the project ``name`` in the lean ``workspace`` and return its
+    directory. Raises ``ScaffoldError`` if it already exists.
+    """
+    name = check_name(name)
+    directory = os.path.join(os.path.abspath(workspace), *name.split('/'))
+    if os.path.exists(directory):
+        raise ScaffoldError("A project named %r already exists" % name)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        for path, text in render(name).items():
+            target = os.path.join(staging, *path.split('/'))
+            os.makedirs(os.path.dirname(target), mode=DIRECTORY_MODE, exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.chmod(target, MODE)
+        os.chmod(staging, DIRECTORY_MODE)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            raise ScaffoldError("A project named %r already exists" % name)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return directory
+
+
+def read_names(path):
+    """The project names listed in the file at ``path``, one per line, ``#`` starting a comment."""
+    names = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.split('#', 1)[0].strip()
+            if line and line not in names:
+                names.append(line)
+    return names
+
+
+def create_projects(names, workspace='.', workers=8):
+    """
+    Create the projects ``names`` in ``workspace``, ``workers`` at a time.
+    Returns ``(directory, error)`` for each name, in order, one of them
+    ``None``.
+    """
+    load_templates()
+
+    def create(name):
+        try:
+            return create_project(name, workspace), None
+        except (ScaffoldError, OSError) as e:
+            return None, str(e)
+
+    with span('scaffold') as attributes:
+        attributes['projects'] = len(names)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(create, names))
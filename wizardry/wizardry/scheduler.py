@@ -0,0 +1,166 @@
+"""
+Backtesting many projects at once: ``wizardry backtest --projects``.
+
+Projects are backtested in the cloud by a bounded pool of workers. Every
+lean call waits for the shared ``RateLimiter`` so the QuantConnect API isn't
+flooded, jobs which fail or run past their timeout are retried, and the
+statistics lean prints for each backtest are collected into one summary
+table written as CSV (or Parquet, with pyarrow installed).
+"""
+import csv
+import glob
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from wizardry.manifest import project_location, push_project
+from wizardry.runner import capture_lean
+from wizardry.trace import span
+
+#columns of the summary table
+COLUMNS = ('project', 'status', 'attempts', 'seconds', 'sharpe', 'drawdown',
+           'net_profit', 'backtest_id', 'url', 'error')
+
+#summary columns filled from the statistics table lean prints
+KEY_STATISTICS = (
+    ('sharpe', 'Sharpe Ratio'),
+    ('drawdown', 'Drawdown'),
+    ('net_profit', 'Net Profit'),
+)
+
+ERROR_MARKER = 'An error occurred during this backtest:'
+
+
+class RateLimiter(object):
+    """Spaces out calls so at most ``per_minute`` start every minute."""
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            with span('queue'):
+                time.sleep(start - now)
+
+
+def parse_backtest(output):
+    """
+    The ``statistics`` (name -> value), ``backtest_id``, ``url`` and
+    ``error`` found in the output of ``lean cloud backtest``.
+    """
+    result = {'statistics': {}, 'backtest_id': None, 'url': None, 'error': None}
+    lines = output.splitlines()
+    for number, line in enumerate(lines):
+        cells = [cell.strip() for cell in re.split(r'[│|┃]', line)]
+        if len(cells) >= 6:
+            for key, value in zip(cells[1:-1:2], cells[2:-1:2]):
+                if key and key != 'Statistic':
+                    result['statistics'][key] = value
+        elif line.startswith('Backtest id:'):
+            result['backtest_id'] = line.split(':', 1)[1].strip()
+        elif line.startswith('Backtest url:'):
+            result['url'] = line.split(':', 1)[1].strip()
+        elif ERROR_MARKER in line:
+            result['error'] = ' '.join(lines[number + 1:]).strip() or 'backtest failed'
+            break
+    return result
+
+
+def find_projects(patterns):
+    """Directories matching the glob ``patterns`` which hold a main.py."""
+    projects = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if os.path.isfile(os.path.join(path, 'main.py')) and path not in projects:
+                projects.append(path)
+    return projects
+
+
+def backtest_project(directory, limiter, timeout=None, retries=1, backoff=5,
+                     force_push=False):
+    """
+    Push (if needed) and backtest the project in ``directory``, retrying a
+    failed or timed out attempt ``retries`` times. Returns a summary row.
+    """
+    workspace, name = project_location(directory)
+    row = dict.fromkeys(COLUMNS)
+    row.update(project=name, status='failed', attempts=0)
+    started = time.monotonic()
+
+    def run(args, cwd):
+        limiter.wait()
+        code, output = capture_lean(args, cwd=cwd, timeout=timeout)
+        if code:
+            row['error'] = output.strip().splitlines()[-1] if output.strip() else 'exit code %d' % code
+        return code
+
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        row['attempts'] += 1
+        try:
+            if push_project(directory, force=force_push, run=run, log=lambda message: None):
+                row['status'] = 'failed'
+                continue
+            limiter.wait()
+            code, output = capture_lean(['cloud', 'backtest', name], cwd=workspace, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            row.update(status='timeout', error='timed out after %ss' % timeout)
+            continue
+        parsed = parse_backtest(output)
+        row.update(backtest_id=parsed['backtest_id'], url=parsed['url'])
+        if code == 0 and parsed['error'] is None:
+            for column, statistic in KEY_STATISTICS:
+                row[column] = parsed['statistics'].get(statistic)
+            row.update(status='ok', error=None)
+            break
+        row.update(status='failed', error=parsed['error'] or 'exit code %d' % code)
+    row['seconds'] = round(time.monotonic() - started, 1)
+    return row
+
+
+def backtest_projects(directories, concurrency=4, rate_limit=30, timeout=None,
+                      retries=1, backoff=5, force_push=False, progress=None):
+    """
+    Backtest every project of ``directories`` with ``concurrency`` workers,
+    starting at most ``rate_limit`` lean commands per minute. ``progress``
+    is called with each summary row as it completes. Returns the rows in the
+    order of ``directories``.
+    """
+    limiter = RateLimiter(rate_limit)
+    rows = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(backtest_project, directory, limiter, timeout, retries,
+                               backoff, force_push): directory
+                   for directory in directories}
+        for future in as_completed(futures):
+            row = future.result()
+            rows[futures[future]] = row
+            if progress is not None:
+                progress(row)
+    return [rows[directory] for directory in directories]
+
+
+def write_summary(rows, path):
+    """Write the summary ``rows`` to ``path``, as Parquet if it ends so."""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError('Writing Parquet needs pyarrow (pip install pyarrow), or use a .csv file')
+        table = pyarrow.table({column: [row[column] for row in rows] for column in COLUMNS})
+        pyarrow.parquet.write_table(table, path)
+        return
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,370 @@
+"""
+``wizardry screen``: a quick plausibility check of the ``framework`` alphas
+on local daily bars, before any lean backtest.
+
+The indicators behind ``RSI``, ``EMA Cross``, ``MACD`` and ``Historical
+Returns`` are computed for every symbol at once, as ``(symbols, days)``
+NumPy arrays, and turned into crude positions:
+
+- RSI: long under 30, short over 70 (Wilder smoothing).
+- EMA Cross: the sign of the fast EMA minus the slow one.
+- MACD: the sign of the signal line over the price, past 1% (simple
+  moving averages, as the generated ``MacdAlphaModel``).
+- Historical Returns: the sign of the return over the lookback.
+
+A combination of alphas holds the average of their positions. Every
+variant is scored by the daily P&L of holding its positions (an equal
+weight of every symbol) from one close to the next, with no costs: a
+ranking of what deserves a real backtest, not a backtest.
+
+Exponential averages are recurrences, computed here by blocks of days
+over which the recurrence is a cumulative sum, so there is no loop over
+the days (see ``ema``).
+"""
+import csv
+import glob
+import io
+import itertools
+import json
+import math
+import os
+import zipfile
+
+import numpy as np
+
+from wizardry.codegen import PARAMETERS
+from wizardry.manifest import project_location
+
+#the alphas which can be screened -> the parameters they use
+ALPHAS = {
+    'RSI': ('rsi_period',),
+    'EMA Cross': ('ema_fast', 'ema_slow'),
+    'MACD': ('macd_fast', 'macd_slow', 'macd_signal'),
+    'Historical Returns': ('returns_lookback',),
+}
+
+RSI_LOW, RSI_HIGH = 30, 70
+
+#MacdAlphaModel's bounce threshold, of the signal line over the price
+MACD_THRESHOLD = 0.01
+
+TRADING_DAYS = 252
+
+#scale of the prices in lean's equity data files
+LEAN_PRICE_SCALE = 10000.0
+
+#largest growth of the weights within an ``ema`` block, bounding its rounding errors
+_BLOCK_GROWTH = 1e3
+
+
+class ScreenError(ValueError):
+    """Raised when bars can't be read or a variant can't be screened."""
+
+
+class Bars(object):
+    """
+    Daily closes of many symbols on a common calendar: ``close`` is a
+    ``(symbols, days)`` array, forward filled, and ``valid`` tells where a
+    symbol had a bar of its own.
+    """
+    def __init__(self, symbols, dates, close, valid):
+        self.symbols = symbols
+        self.dates = dates
+        self.close = close
+        self.valid = valid
+        #the returns from every close to the next, 0 unless both bars are the symbol's own
+        self.held = valid[:, :-1] & valid[:, 1:]
+        self.returns = np.where(self.held, close[:, 1:] / close[:, :-1] - 1, 0.0)
+
+    @classmethod
+    def from_series(cls, series):
+        """Bars from ``{symbol: (dates, closes)}``, dates as ``YYYYMMDD`` ints."""
+        if not series:
+            raise ScreenError('no bars found')
+        symbols = sorted(series)
+        dates = np.unique(np.concatenate([series[symbol][0] for symbol in symbols]))
+        close = np.full((len(symbols), len(dates)), np.nan)
+        for row, symbol in enumerate(symbols):
+            days, closes = series[symbol]
+            close[row, np.searchsorted(dates, days)] = closes
+        valid = np.isfinite(close) & (close > 0)
+        close[~valid] = np.nan
+        return cls(symbols, dates, fill(close), valid)
+
+
+def fill(close):
+    """Forward fill the gaps of every row, and back fill its leading ones."""
+    days = np.arange(close.shape[1])
+    filled = np.take_along_axis(close, np.maximum.accumulate(np.where(np.isfinite(close), days, 0), axis=1), axis=1)
+    first = np.argmax(np.isfinite(close), axis=1)
+    filled = np.where(days < first[:, None], close[np.arange(len(close)), first][:, None], filled)
+    #symbols without any bar
+    return np.nan_to_num(filled, nan=1.0)
+
+
+def _dates(values):
+    """``20170103``, ``2017-01-03`` or ``20170103 00:00`` strings -> ``YYYYMMDD`` ints."""
+    values = np.char.replace(np.char.strip(np.asarray(values, dtype=str)), '-', '')
+    try:
+        return values.astype('U8').astype(np.int64)
+    except ValueError as e:
+        raise ScreenError('unreadable date: %s' % e)
+
+
+def _read_table(text, name):
+    """The columns of a CSV text, by lower case header name (or by lean's column order)."""
+    first = text[:text.find('\n')] if '\n' in text else text
+    if first[:1].isdigit():
+        header = ['date', 'open', 'high', 'low', 'close', 'volume'][:first.count(',') + 1]
+        body = text
+    else:
+        header = [column.strip().lower() for column in next(csv.reader([first]))]
+        body = text[len(first) + 1:]
+    if not body.strip():
+        return {column: np.array([]) for column in header}
+    rows = np.loadtxt(io.StringIO(body), delimiter=',', dtype=str, ndmin=2)
+    if rows.shape[1] != len(header):
+        raise ScreenError('%s: expected %d columns' % (name, len(header)))
+    return dict(zip(header, rows.T))
+
+
+def _date_column(table, name):
+    for column in ('date', 'time', 'datetime', 'timestamp'):
+        if column in table:
+            return table[column]
+    raise ScreenError('%s has no date column' % name)
+
+
+def read_symbol_file(path):
+    """The ``(dates, closes)`` of a per-symbol CSV file or lean daily zip."""
+    name = os.path.basename(path)
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            text = archive.read(archive.namelist()[0]).decode('utf-8')
+        scale = LEAN_PRICE_SCALE
+    else:
+        with open(path) as file:
+            text = file.read()
+        scale = 1.0
+    table = _read_table(text, name)
+    if 'close' not in table:
+        raise ScreenError('%s has no close column' % name)
+    return _dates(_date_column(table, name)), table['close'].astype(float) / scale
+
+
+def read_long_file(path):
+    """``{symbol: (dates, closes)}`` of a CSV or Parquet file with symbol, date and close columns."""
+    name = os.path.basename(path)
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ScreenError('Reading Parquet needs pyarrow (pip install pyarrow), or use a CSV file')
+        columns = pyarrow.parquet.read_table(path).to_pydict()
+        table = {column.lower(): np.asarray(values) for column, values in columns.items()}
+    else:
+        with open(path) as file:
+            table = _read_table(file.read(), name)
+    if 'symbol' not in table or 'close' not in table:
+        raise ScreenError('%s needs symbol, date and close columns' % name)
+    symbols = table['symbol'].astype(str)
+    dates = _dates(_date_column(table, name))
+    closes = table['close'].astype(float)
+    order = np.argsort(symbols, kind='stable')
+    names, starts = np.unique(symbols[order], return_index=True)
+    return {symbol: (dates[rows], closes[rows])
+            for symbol, rows in zip(names, np.split(order, starts[1:]))}
+
+
+def load_bars(path):
+    """
+    The bars at ``path``: a directory of per-symbol files (``SPY.csv``, or
+    lean's ``spy.zip``), or a single CSV/Parquet file of every symbol.
+    """
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.zip')))
+        series = {}
+        for file in files:
+            symbol = os.path.splitext(os.path.basename(file))[0].upper()
+            series[symbol] = read_symbol_file(file)
+        return Bars.from_series(series)
+    if os.path.isfile(path):
+        return Bars.from_series(read_long_file(path))
+    raise ScreenError('%s does not exist' % path)
+
+
+def default_data(directory):
+    """The daily US equities of the data folder of the lean workspace of ``directory``."""
+    workspace = directory
+    if not os.path.isfile(os.path.join(workspace, 'lean.json')):
+        workspace = project_location(directory)[0]
+    try:
+        with open(os.path.join(workspace, 'lean.json')) as file:
+            #lean.json has // comments
+            settings = json.loads(''.join(line for line in file if not line.strip().startswith('//')))
+    except (OSError, ValueError):
+        raise ScreenError('no lean.json found, give the path of the bars to screen')
+    return os.path.join(workspace, settings.get('data-folder', 'data'), 'equity', 'usa', 'daily')
+
+
+def parse_values(text):
+    """``'rsi_period=14,30'`` -> ``('rsi_period', [14, 30])``."""
+    name, sep, values = text.partition('=')
+    try:
+        if not sep:
+            raise ValueError
+        return name.strip(), [int(value) if value.strip().lstrip('-').isdigit() else float(value)
+                              for value in values.split(',')]
+    except ValueError:
+        raise ScreenError("invalid parameter %r, expected e.g. 'rsi_period=14,30,60'" % text)
+
+
+def ema(values, alpha):
+    """
+    The exponential moving average of every row of ``values``, starting at
+    its first value: ``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]``.
+
+    Over a block of ``k`` days, ``y`` is ``d**(j+1) * (y0 + alpha *
+    cumsum(d**-(i+1) * x))`` with ``d = 1 - alpha``, so each block is a
+    cumulative sum. Blocks are kept short enough for ``d**-k`` not to lose
+    precision, which only takes a few of them even for slow averages.
+    """
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return values.astype(float)
+    block = max(1, int(math.log(_BLOCK_GROWTH) / -math.log(decay)))
+    result = np.empty(values.shape)
+    state = values[:, 0].astype(float)
+    for start in range(0, values.shape[1], block):
+        chunk = values[:, start:start + block]
+        powers = decay ** np.arange(1, chunk.shape[1] + 1)
+        result[:, start:start + block] = powers * (state[:, None] + alpha * np.cumsum(chunk / powers, axis=1))
+        state = result[:, start + chunk.shape[1] - 1]
+    return result
+
+
+def sma(values, period):
+    """The simple moving average of every row, NaN for its first ``period - 1`` days."""
+    result = np.full(values.shape, np.nan)
+    sums = np.cumsum(values, axis=1)
+    result[:, period - 1:] = sums[:, period - 1:]
+    result[:, period:] -= sums[:, :-period]
+    return result / period
+
+
+def rsi(close, period):
+    """The relative strength index of every row, with Wilder's smoothing."""
+    change = np.diff(close, axis=1, prepend=close[:, :1])
+    gains = ema(np.maximum(change, 0), 1.0 / period)
+    losses = ema(np.maximum(-change, 0), 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + gains / losses)
+    result[losses == 0] = 100
+    result[(losses == 0) & (gains == 0)] = 50
+    return result
+
+
+def _warm(position, days):
+    position[:, :days] = 0
+    return position
+
+
+def rsi_positions(close, rsi_period):
+    value = rsi(close, rsi_period)
+    position = np.where(value < RSI_LOW, 1.0, np.where(value > RSI_HIGH, -1.0, 0.0))
+    return _warm(position, rsi_period)
+
+
+def ema_cross_positions(close, ema_fast, ema_slow):
+    position = np.sign(ema(close, 2.0 / (ema_fast + 1)) - ema(close, 2.0 / (ema_slow + 1)))
+    return _warm(position, max(ema_fast, ema_slow))
+
+
+def macd_positions(close, macd_fast, macd_slow, macd_signal):
+    macd = sma(close, macd_fast) - sma(close, macd_slow)
+    warm = max(macd_fast, macd_slow) - 1
+    signal = np.full(close.shape, np.nan)
+    if warm < close.shape[1]:
+        signal[:, warm:] = sma(macd[:, warm:], macd_signal)
+    with np.errstate(invalid='ignore'):
+        normalized = signal / close
+        position = np.where(normalized > MACD_THRESHOLD, 1.0, np.where(normalized < -MACD_THRESHOLD, -1.0, 0.0))
+    return position
+
+
+def returns_positions(close, returns_lookback):
+    position = np.zeros(close.shape)
+    position[:, returns_lookback:] = np.sign(close[:, returns_lookback:] / close[:, :-returns_lookback] - 1)
+    return position
+
+
+POSITIONS = {
+    'RSI': rsi_positions,
+    'EMA Cross': ema_cross_positions,
+    'MACD': macd_positions,
+    'Historical Returns': returns_positions,
+}
+
+
+def variants(alphas=tuple(ALPHAS), parameters=None):
+    """
+    Every combination of ``alphas`` with every value of the parameters
+    they use, as ``(alphas, parameters)`` pairs. ``parameters`` maps a
+    parameter to its values, the catalog default being used otherwise.
+    """
+    parameters = parameters or {}
+    for name in alphas:
+        if name not in ALPHAS:
+            raise ScreenError("%s can't be screened, choose from: %s" % (name, ', '.join(ALPHAS)))
+    for name in parameters:
+        if name not in PARAMETERS or not any(name in ALPHAS[alpha] for alpha in alphas):
+            raise ScreenError('%s is not a parameter of %s' % (name, ', '.join(alphas)))
+        if not all(isinstance(value, int) and value > 0 for value in parameters[name]):
+            raise ScreenError('%s must be a number of days' % name)
+    for size in range(1, len(alphas) + 1):
+        for combination in itertools.combinations(alphas, size):
+            names = [name for alpha in combination for name in ALPHAS[alpha]]
+            grid = [parameters.get(name) or [PARAMETERS[name][2]] for name in names]
+            for values in itertools.product(*grid):
+                yield combination, dict(zip(names, values))
+
+
+def score(bars, position):
+    """The crude performance of holding ``position`` from every close to the next."""
+    changes = np.abs(np.diff(position, axis=1))
+    position = position[:, :-1]
+    pnl = position * bars.returns
+    held = max(int(np.count_nonzero(bars.held)), 1)
+    active = int(np.count_nonzero((position != 0) & bars.held))
+    daily = pnl.sum(axis=0) / np.maximum(bars.held.sum(axis=0), 1)
+    deviation = daily.std()
+    return {
+        'sharpe': float(daily.mean() / deviation * math.sqrt(TRADING_DAYS)) if deviation > 0 else 0.0,
+        'return': float(np.prod(1 + daily) - 1),
+        'hit_rate': int(np.count_nonzero(pnl > 0)) / float(active) if active else None,
+        'exposure': float(np.abs(position).sum(where=bars.held)) / held,
+        'turnover': float(changes.sum(where=bars.held)) / held,
+    }
+
+
+def screen(bars, candidates):
+    """
+    Score every ``(alphas, parameters)`` candidate on ``bars``. Returns one
+    row per candidate, best Sharpe ratio first.
+    """
+    positions = {}
+    rows = []
+    for alphas, parameters in candidates:
+        combined = np.zeros(bars.close.shape)
+        for alpha in alphas:
+            arguments = tuple((name, parameters[name]) for name in ALPHAS[alpha])
+            key = (alpha, arguments)
+            if key not in positions:
+                positions[key] = POSITIONS[alpha](bars.close, **dict(arguments))
+            combined += positions[key]
+        row = {'alpha': ' + '.join(alphas),
+               'parameters': ' '.join('%s=%s' % item for item in sorted(parameters.items()))}
+        row.update(score(bars, combined / len(alphas)))
+        rows.append(row)
+    rows.sort(key=lambda row: row['sharpe'], reverse=True)
+    return rows
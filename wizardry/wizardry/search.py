@@ -0,0 +1,224 @@
+"""
+Full-text search over the strategy library.
+
+The index is an inverted index (term -> strategy -> weight) built from the
+strategy names, their tags, the asset classes they trade and the tokens of
+their cached source. It is serialized next to the strategy cache and only
+loaded by ``wizardry library search``. Updates are incremental: a strategy
+is only re-indexed when its cached source changed.
+
+The index of the catalog before any sync (names, tags and asset classes) is
+shipped prebuilt in ``wizardry/data/search.json``, so a first search only
+indexes the strategies already in the cache. Rebuild it with
+``build_prebuilt`` when the catalog or the weights change.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+
+from wizardry.cache import StrategyCache, atomic_write
+from wizardry.library import BASE_URL, STRATEGIES, strategy_url
+
+VERSION = 2
+
+PREBUILT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'search.json')
+
+#weight of a match in the name, in the tags, in the asset classes and in the source
+NAME_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+ASSET_WEIGHT = 2.0
+SOURCE_WEIGHT = 1.0
+
+ASSET_CLASSES = {
+    'equity': ('addequity', 'stock', 'equit', 'etf', 'reit', 'dow 30'),
+    'forex': ('addforex', 'forex'),
+    'futures': ('addfuture', 'future', 'commodit'),
+    'options': ('addoption', 'option'),
+    'crypto': ('addcrypto', 'crypto'),
+    'cfd': ('addcfd',),
+}
+
+#tag -> hints in the name of a strategy
+TAGS = {
+    'momentum': ('momentum', 'trend', 'breakout', 'thrust'),
+    'mean reversion': ('reversion', 'reversal', 'pairs', 'paired', 'cointegration', 'copula'),
+    'pairs trading': ('pairs', 'paired', 'cointegration', 'copula'),
+    'arbitrage': ('arbitrage', 'spread'),
+    'factor': ('factor', 'fundamental', 'capm', 'beta', 'value', 'book-to-market', 'capitalization',
+               'liquidity', 'earnings', 'accrual', 'roa ', 'skewness', 'score', 'growth'),
+    'anomaly': ('anomaly', 'premi', 'effect', 'overnight', 'turn of the month'),
+    'seasonality': ('month', 'overnight', 'seasonal', 'january', 'holiday', 'week', 'lunar', 'cycle'),
+    'market timing': ('timing', 'barometer', 'filter', 'predict'),
+    'volatility': ('volatility', 'vix'),
+    'carry': ('carry', 'term structure', 'yield'),
+    'technical': ('rsi', 'macd', 'breakout', 'thrust', 'moving average', 'bollinger'),
+    'machine learning': ('learning', 'neural', 'svm', 'forest', 'hidden markov', 'classif'),
+    'alternative data': ('sentiment', 'news', 'alternative data', 'sec report', 'insider', 'economics'),
+}
+
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'as', 'at', 'based', 'by', 'for', 'from', 'if', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'using', 'with', 'within',
+    'self', 'def', 'import', 'return', 'none', 'true', 'false', 'not',
+))
+
+
+def tokenize(text):
+    """Lower-case terms of ``text``, camelCase split and plural-stripped."""
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text)
+    terms = []
+    for term in re.findall(r'[a-z0-9]+', text.lower()):
+        if len(term) < 2 or term in STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def asset_classes(name, source=''):
+    """The asset classes a strategy trades, guessed from name and source."""
+    text = (name + ' ' + source).lower()
+    return sorted(asset for asset, hints in ASSET_CLASSES.items()
+                  if any(hint in text for hint in hints))
+
+
+def tags(name):
+    """The tags of a strategy, guessed from its name."""
+    text = name.lower()
+    return sorted(tag for tag, hints in TAGS.items() if any(hint in text for hint in hints))
+
+
+class SearchIndex(object):
+    """
+    An inverted index of the strategy catalog, persisted as JSON at
+    ``path`` (next to the strategy cache by default).
+    """
+    def __init__(self, path=None, cache=None, base_url=BASE_URL):
+        self.cache = cache or StrategyCache()
+        self.base_url = base_url
+        self.path = path or os.path.join(self.cache.root, 'search.json')
+        self.docs = {}
+        self.postings = {}
+        self._loaded = False
+
+    def load(self):
+        """
+        Read the serialized index, once, else the prebuilt one. An index of
+        a stale format or of another ``base_url`` is dropped.
+        """
+        if self._loaded:
+            return self
+        for path in (self.path, PREBUILT):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if data.get('version') == VERSION and data.get('base_url') == self.base_url:
+                self.docs = data['docs']
+                self.postings = data['postings']
+                break
+        self._loaded = True
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {'version': VERSION, 'base_url': self.base_url, 'docs': self.docs, 'postings': self.postings}
+        atomic_write(self.path, json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+    def _remove(self, name):
+        for term in self.docs.pop(name, {}).get('terms', ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(name, None)
+                if not posting:
+                    del self.postings[term]
+
+    def _add(self, name, url, sha256, source):
+        weights = {}
+        terms = tokenize(name)
+        for term in terms:
+            #shorter names match a term more specifically
+            weights[term] = weights.get(term, 0) + NAME_WEIGHT * (1 + 1.0 / len(terms))
+        labels = tags(name)
+        for term in set(tokenize(' '.join(labels))):
+            weights[term] = weights.get(term, 0) + TAG_WEIGHT
+        assets = asset_classes(name, source)
+        for term in assets:
+            weights[term] = weights.get(term, 0) + ASSET_WEIGHT
+        counts = {}
+        for term in tokenize(source):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            weights[term] = weights.get(term, 0) + SOURCE_WEIGHT * (1 + math.log(count))
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[name] = round(weight, 3)
+        self.docs[name] = {'url': url, 'sha256': sha256, 'tags': labels, 'assets': assets,
+                           'terms': sorted(weights)}
+
+    def update(self, names=STRATEGIES):
+        """
+        Bring the index up to date with the strategy cache, re-indexing only
+        the strategies whose cached source changed. Returns how many were
+        (re-)indexed and saves the index if any.
+        """
+        self.load()
+        updated = 0
+        for name in set(self.docs) - set(names):
+            self._remove(name)
+            updated += 1
+        for name in names:
+            url = strategy_url(name, self.base_url)
+            entry = self.cache.get(url)
+            sha256 = entry['sha256'] if entry else None
+            doc = self.docs.get(name)
+            if doc is not None and doc['sha256'] == sha256:
+                continue
+            source = ''
+            if entry is not None:
+                with open(self.cache.blob_path(sha256), 'rb') as file:
+                    source = file.read().decode('utf-8', 'replace')
+            self._remove(name)
+            self._add(name, url, sha256, source)
+            updated += 1
+        if updated:
+            self.save()
+        return updated
+
+    def search(self, query, limit=10):
+        """
+        The best ``limit`` strategies for ``query``, as dicts with their
+        ``name``, ``score``, ``url``, ``tags``, ``assets`` and whether
+        they're ``cached``.
+        Each query term scores its weight in a strategy times its IDF.
+        """
+        self.load()
+        total = len(self.docs)
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + total / float(len(posting)))
+            for name, weight in posting.items():
+                scores[name] = scores.get(name, 0) + weight * idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{
+            'name': name,
+            'score': round(score, 3),
+            'url': self.docs[name]['url'],
+            'tags': self.docs[name]['tags'],
+            'assets': self.docs[name]['assets'],
+            'cached': self.docs[name]['sha256'] is not None,
+        } for name, score in ranked]
+
+
+def build_prebuilt(path=PREBUILT):
+    """Write the index of the catalog with no strategy cached to ``path``, see ``PREBUILT``."""
+    with tempfile.TemporaryDirectory() as root:
+        index = SearchIndex(path=path, cache=StrategyCache(root))
+        index._loaded = True
+        index.update()
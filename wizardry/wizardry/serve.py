@@ -0,0 +1,226 @@
+"""
+``wizardry serve``: a long-lived worker running lean commands in-process.
+
+Every ``lean`` invocation otherwise pays the CLI's Python start-up, imports
+and configuration loading. The worker imports the ``lean`` package once and
+then runs the jobs it receives over a local socket (a Unix socket, or a
+localhost TCP port where those are unavailable), so a push followed by a
+backtest costs a single start-up.
+
+The protocol is one JSON object per line. A connection starts with
+``{"token": "..."}``, the secret published with the address of the worker
+(readable by its user only), so other local users can't run commands on
+the worker through the TCP port. A job is
+``{"args": [...], "cwd": "..."}``, the worker answers with any number of
+``{"out": "..."}`` messages carrying the command's output and a final
+``{"exit": code}``.
+
+Every connection is served by a thread of its own, so an idle or stalled
+client doesn't hold up the others, and is dropped once silent, or not
+reading, for ``TIMEOUT`` seconds. Jobs are run one at a time though, since
+they change the working directory of the worker: a job arriving while
+another runs is answered ``{"busy": true}`` and the client runs lean itself.
+"""
+import contextlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+
+from wizardry.cache import atomic_write, cache_dir
+
+#where the running worker publishes its address
+ADDRESS_FILE = cache_dir('serve.json')
+
+#commands which need a terminal (they prompt), never sent to the worker: a
+#command, or a command and its subcommand
+#seconds a connection may stay silent, or not read its output, before it is dropped
+TIMEOUT = 300
+
+INTERACTIVE = ('login', 'logout', 'init', 'create-project', 'live', 'optimize', 'cloud live', 'cloud optimize')
+
+
+def is_interactive(args):
+    """Whether ``lean <args>`` needs a terminal."""
+    args = [str(arg) for arg in args[:2]]
+    return bool(args) and (args[0] in INTERACTIVE or ' '.join(args) in INTERACTIVE)
+
+
+def execute(args, cwd, out):
+    """
+    Run ``lean <args>`` in ``cwd`` inside this process, writing its output
+    to ``out``. Returns the exit code.
+    """
+    from lean.main import main
+    previous = os.getcwd(), sys.argv
+    os.chdir(cwd)
+    sys.argv = ['lean'] + list(args)
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            try:
+                main()
+                return 0
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else int(e.code is not None)
+    finally:
+        os.chdir(previous[0])
+        sys.argv = previous[1]
+
+
+class _Output(object):
+    """A file-like object forwarding writes to the client as messages."""
+    def __init__(self, send):
+        self.send = send
+
+    def write(self, text):
+        if text:
+            self.send({'out': text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class LeanHandler(socketserver.StreamRequestHandler):
+    timeout = TIMEOUT
+
+    def handle(self):
+        gone = []
+
+        def send(message):
+            #the output of a client which stopped reading is dropped, its job still ends
+            if gone:
+                return
+            try:
+                self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+                self.wfile.flush()
+            except OSError:
+                gone.append(True)
+
+        try:
+            hello = json.loads(self.rfile.readline().decode('utf-8'))
+        except (OSError, ValueError):
+            return
+        if not (isinstance(hello, dict) and isinstance(hello.get('token'), str)
+                and hmac.compare_digest(hello['token'], self.server.token)):
+            return
+        try:
+            for line in self.rfile:
+                if not self.server.lock.acquire(blocking=False):
+                    send({'busy': True})
+                    continue
+                try:
+                    job = json.loads(line.decode('utf-8'))
+                    code = self.server.executor(job['args'], job.get('cwd') or os.getcwd(), _Output(send))
+                except Exception as e:
+                    send({'out': 'wizardry serve: %s\n' % e})
+                    code = 1
+                finally:
+                    self.server.lock.release()
+                send({'exit': code})
+                if gone:
+                    return
+        except OSError:
+            #silent for TIMEOUT seconds
+            return
+
+
+def make_server(address=None, executor=execute):
+    """
+    A server listening on ``address``: a path for a Unix socket, or a
+    ``(host, port)`` tuple. Defaults to a socket in the cache directory.
+    """
+    if address is None:
+        address = cache_dir('lean.sock') if hasattr(socket, 'AF_UNIX') else ('127.0.0.1', 0)
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)
+        os.makedirs(os.path.dirname(address), exist_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(address, LeanHandler)
+        os.chmod(address, 0o600)
+    else:
+        server = socketserver.ThreadingTCPServer(address, LeanHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.executor = executor
+    server.token = secrets.token_hex(16)
+    return server
+
+
+def publish(server, path=None):
+    """Record the address of ``server`` so clients can find it."""
+    path = path or ADDRESS_FILE
+    address = server.server_address
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps({'pid': os.getpid(), 'token': server.token,
+                                   'address': address if isinstance(address, str) else list(address)}).encode('utf-8'))
+
+
+def serve(address=None):
+    """Warm up the lean package and run jobs until interrupted."""
+    import lean.main
+    server = make_server(address)
+    publish(server)
+    print("Serving lean commands on %s, Ctrl+C to stop." % (server.server_address,))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            os.remove(ADDRESS_FILE)
+        if isinstance(server.server_address, str):
+            with contextlib.suppress(OSError):
+                os.remove(server.server_address)
+
+
+def connect(path=None):
+    """A socket connected to the running worker, ``None`` without one."""
+    path = path or ADDRESS_FILE
+    try:
+        with open(path) as file:
+            published = json.load(file)
+        address, token = published['address'], published['token']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = tuple(address)
+    try:
+        sock.connect(address)
+        sock.sendall(json.dumps({'token': token}).encode('utf-8') + b'\n')
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def submit(sock, args, cwd=None, out=None):
+    """
+    Run ``lean <args>`` on the worker connected to ``sock``, writing the
+    output to ``out`` (stdout by default). Returns the exit code, ``None``
+    if the worker is busy with the job of another client.
+    """
+    out = out or sys.stdout
+    job = {'args': list(args), 'cwd': os.path.abspath(cwd or os.getcwd())}
+    sock.sendall(json.dumps(job).encode('utf-8') + b'\n')
+    reader = sock.makefile('rb')
+    for line in reader:
+        message = json.loads(line.decode('utf-8'))
+        if 'exit' in message:
+            return message['exit']
+        if message.get('busy'):
+            return None
+        out.write(message['out'])
+        out.flush()
+    raise ConnectionError('wizardry serve closed the connection')
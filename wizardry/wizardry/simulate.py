@@ -0,0 +1,434 @@
+"""
+``wizardry simulate``: what the ``framework`` portfolio construction and
+risk management models do with a universe, on local daily bars, before
+any lean backtest.
+
+Insights come from the ``wizardry screen`` positions of the chosen alphas
+(every symbol long without any), and every ``rebalance`` days each
+portfolio model turns them into target weights:
+
+- Equal Weighting: ``1/n`` of every symbol with an insight.
+- Confidence Weighted Portfolio: the share of the alphas agreeing on a
+  symbol, scaled down when they add up to more than 1.
+- Mean-Variance: the minimum variance weights, in the direction of the
+  insights, as ``MeanVarianceOptimizationPortfolioConstructionModel``.
+- Black Litterman: the insights as views (the trailing mean return, in
+  their direction) on an equal weight prior, then the mean-variance
+  weights of the posterior returns with a risk aversion of 2.5.
+
+The optimized portfolios are fully invested (their absolute weights add
+up to 1). Between rebalances the holdings drift with the prices and the
+risk models liquidate a symbol until the next rebalance once its loss
+(``Maximum Drawdown``), profit (``Maximum Unrealized Profit...``) or loss
+from its best price (``Trailing Stop...``) passes the catalog limit.
+``Sector Exposure`` needs sector data, which the bars don't have.
+
+Many universes (random subsets of the symbols) are simulated together:
+the weights of all of them are a ``(universes, symbols)`` array. The
+covariance of every rebalance is estimated once for all universes, as
+the ``lookback`` days of demeaned returns (a ``(days, symbols)`` factor,
+never a ``symbols x symbols`` matrix) shrunk towards its diagonal by
+Ledoit-Wolf, and
+the optimizations are solved by accelerated projected gradient, each
+rebalance starting from the weights of the previous one.
+"""
+import math
+
+import numpy as np
+
+from wizardry.codegen import PARAMETERS
+from wizardry.screen import ALPHAS, POSITIONS, TRADING_DAYS
+
+PORTFOLIOS = ('Equal Weighting', 'Confidence Weighted Portfolio', 'Mean-Variance', 'Black Litterman')
+
+#the risk models which can be simulated -> the catalog parameter of their limit
+RISKS = {
+    'None': None,
+    'Maximum Drawdown': 'max_drawdown',
+    'Maximum Unrealized Profit Percent Per Security': 'max_profit',
+    'Trailing Stop Risk Management Model': 'trailing_stop',
+}
+
+#days of returns of the covariance, and days between rebalances (lean's defaults)
+LOOKBACK = 63
+REBALANCE = 21
+
+RISK_AVERSION = 2.5
+
+#precision of the optimized weights, relative to the gradient
+TOLERANCE = 1e-3
+MAX_ITERATIONS = 2000
+CHECK_EVERY = 5
+
+#floor of the variance of a symbol whose price didn't move
+MIN_VARIANCE = 1e-12
+
+
+class SimulationError(ValueError):
+    """Raised when a simulation can't be run."""
+
+
+def insights(bars, alphas=()):
+    """
+    The directions (-1, 0 or 1) and confidences (0 to 1) of the insights of
+    ``alphas`` on every symbol and day, with the catalog parameters.
+    """
+    for alpha in alphas:
+        if alpha not in ALPHAS:
+            raise SimulationError("%s can't be simulated, choose from: %s" % (alpha, ', '.join(ALPHAS)))
+    if not alphas:
+        return np.ones(bars.close.shape), np.ones(bars.close.shape)
+    combined = np.zeros(bars.close.shape)
+    for alpha in alphas:
+        combined += POSITIONS[alpha](bars.close, **{name: PARAMETERS[name][2] for name in ALPHAS[alpha]})
+    combined /= len(alphas)
+    return np.sign(combined), np.abs(combined)
+
+
+def sample_universes(symbols, count=1, size=None, seed=0):
+    """``count`` random universes of ``size`` of the symbols, as a ``(count, symbols)`` mask."""
+    if size is None or size >= symbols:
+        return np.ones((count, symbols), bool)
+    if size < 1:
+        raise SimulationError('a universe needs at least one symbol')
+    rng = np.random.default_rng(seed)
+    members = np.zeros((count, symbols), bool)
+    for row in members:
+        row[rng.choice(symbols, size, replace=False)] = True
+    return members
+
+
+def window_statistics(returns, held, days, lookback):
+    """
+    The mean and variance of the returns of every symbol over the
+    ``lookback`` days before each of ``days``, and whether the symbol had
+    all of them, all as ``(days, symbols)`` arrays from cumulative sums.
+    """
+    def window_sums(values):
+        sums = np.zeros((values.shape[0], values.shape[1] + 1))
+        np.cumsum(values, axis=1, out=sums[:, 1:])
+        return (sums[:, days] - sums[:, days - lookback]).T
+
+    mean = window_sums(returns) / lookback
+    variance = (window_sums(returns ** 2) - lookback * mean ** 2) / (lookback - 1)
+    complete = window_sums(held.astype(float)) >= lookback - 0.5
+    return mean, np.maximum(variance, MIN_VARIANCE), complete
+
+
+def ledoit_wolf(demeaned):
+    """
+    The Ledoit-Wolf shrinkage intensity of the sample covariance of the
+    ``(symbols, days)`` ``demeaned`` returns towards its diagonal. The sums
+    over pairs of symbols are taken from the ``(days, days)`` gram matrix.
+    """
+    days = demeaned.shape[1]
+    gram = demeaned.T @ demeaned
+    variance = np.einsum('ij,ij->i', demeaned, demeaned) / days
+    #squared norm of the off diagonal sample covariance
+    spread = (gram ** 2).sum() / days ** 2 - (variance ** 2).sum()
+    if spread <= 0:
+        return 1.0
+    #squared norms of the off diagonal of x x' - S for every day x
+    noise = (np.diag(gram) ** 2 - 2 * (gram ** 2).sum(axis=0) / days + (gram ** 2).sum() / days ** 2
+             - ((demeaned ** 2 - variance[:, None]) ** 2).sum(axis=0))
+    return min(noise.sum() / days ** 2, spread) / spread
+
+
+class Covariance(object):
+    """
+    The sample covariance of ``returns`` (a ``(symbols, days)`` window)
+    shrunk towards its diagonal, by the Ledoit-Wolf intensity unless
+    ``shrinkage`` is given, kept as its demeaned ``(days, symbols)``
+    factor.
+    """
+    def __init__(self, returns, variance, shrinkage=None):
+        days = returns.shape[1]
+        demeaned = returns - returns.mean(axis=1, keepdims=True)
+        if shrinkage is None:
+            shrinkage = ledoit_wolf(demeaned)
+        self.factor = (demeaned * math.sqrt((1 - shrinkage) / (days - 1))).T
+        self.variance = variance
+        self.shrinkage = shrinkage
+
+    def dot(self, weights):
+        """The covariance times every row of ``weights``."""
+        return (weights @ self.factor.T) @ self.factor + self.shrinkage * self.variance * weights
+
+    def posterior(self, prior, views, expected):
+        """
+        The Black-Litterman posterior returns given the ``expected`` returns
+        of the ``views`` symbols, each view as uncertain as the prior
+        (``omega = tau * diag(P sigma P')``, tau then cancels out). The view
+        covariance is inverted by the Woodbury identity, in the size of
+        the window.
+        """
+        if not views.any():
+            return prior
+        factor = self.factor[:, views]
+        #P sigma P' + omega is factor' factor plus the shrinkage and omega on the diagonal
+        diagonal = 2 * self.shrinkage * self.variance[views] + np.einsum('ij,ij->j', factor, factor)
+        gap = expected - prior[views]
+        inner = np.eye(len(factor)) + (factor / diagonal) @ factor.T
+        solved = gap / diagonal - (factor.T @ np.linalg.solve(inner, factor @ (gap / diagonal))) / diagonal
+        spread = np.zeros(len(prior))
+        spread[views] = solved
+        return prior + self.dot(spread[None])[0]
+
+
+def project(values, allowed):
+    """
+    The euclidean projection of every row of ``values`` on the simplex of
+    its ``allowed`` entries (non negative, adding up to 1). Rows without
+    any allowed entry are all 0.
+    """
+    masked = np.where(allowed, values, -np.inf)
+    ordered = -np.sort(-masked, axis=1)
+    finite = np.isfinite(ordered)
+    sums = np.cumsum(np.where(finite, ordered, 0.0), axis=1)
+    with np.errstate(invalid='ignore'):
+        kept = finite & (ordered * np.arange(1, values.shape[1] + 1) > sums - 1)
+    count = kept.sum(axis=1)
+    threshold = (sums[np.arange(len(values)), np.maximum(count, 1) - 1] - 1) / np.maximum(count, 1)
+    return np.where(allowed & (count > 0)[:, None], np.maximum(values - threshold[:, None], 0.0), 0.0)
+
+
+def minimize(gradient, allowed, start, lipschitz, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Minimize a convex quadratic over the simplex of the ``allowed`` entries
+    of every row, by accelerated projected gradient (FISTA, restarting its
+    momentum when it stops helping) from ``start``. Stops when the
+    Frank-Wolfe gap, a bound of the objective above its minimum, is under
+    ``tolerance`` times the mean absolute gradient. Returns the minimizers
+    and the number of iterations.
+    """
+    current = project(start, allowed)
+    point, momentum = current, np.ones((len(current), 1))
+    count = np.maximum(allowed.sum(axis=1), 1)
+    for iteration in range(1, max_iterations + 1):
+        following = project(point - gradient(point) / lipschitz, allowed)
+        restart = np.einsum('ij,ij->i', point - following, following - current)[:, None] > 0
+        momentum = np.where(restart, 1.0, momentum)
+        accelerated = (1 + np.sqrt(1 + 4 * momentum ** 2)) / 2
+        point = following + (momentum - 1) / accelerated * (following - current)
+        current, momentum = following, accelerated
+        if iteration % CHECK_EVERY == 0 or iteration == max_iterations:
+            slope = gradient(current)
+            lowest = np.where(allowed, slope, np.inf).min(axis=1, initial=np.inf)
+            gap = np.where(np.isfinite(lowest), np.einsum('ij,ij->i', current, slope) - lowest, 0.0)
+            scale = np.abs(np.where(allowed, slope, 0.0)).sum(axis=1) / count
+            if np.all(gap <= tolerance * scale):
+                break
+    return current, iteration
+
+
+class Problem(object):
+    """
+    The optimizations of a rebalance, one per universe: minimize
+    ``risk_aversion / 2 * w' sigma w - expected' w`` over the weights ``w``
+    in the direction of the insights, whose absolute values add up to 1.
+    Each universe is gathered on its allowed symbols, as the ``(universes,
+    size, days)`` rows of the covariance factor, signed by the directions.
+    """
+    def __init__(self, covariance, allowed, direction, expected, risk_aversion=1.0):
+        size = max(int(allowed.sum(axis=1).max()), 1)
+        self.index = np.argsort(~allowed, axis=1, kind='stable')[:, :size]
+        self.valid = np.take_along_axis(allowed, self.index, axis=1)
+        sign = direction[self.index] * self.valid
+        self.factor = covariance.factor.T[self.index] * sign[:, :, None]
+        self.variance = covariance.variance[self.index]
+        self.shrinkage = covariance.shrinkage
+        self.linear = sign * expected[self.index]
+        self.risk_aversion = risk_aversion
+
+    def gradient(self, share):
+        exposure = np.matmul(share[:, None, :], self.factor)
+        quadratic = np.matmul(self.factor, exposure.transpose(0, 2, 1))[:, :, 0] + self.shrinkage * self.variance * share
+        return self.risk_aversion * quadratic - self.linear
+
+    def lipschitz(self):
+        """
+        The largest curvature of every objective along the simplex, from the
+        small ``(days, days)`` gram matrix of the factor with its mean over
+        the allowed symbols removed (moving along the simplex doesn't change
+        the total weight).
+        """
+        count = np.maximum(self.valid.sum(axis=1), 1)[:, None, None]
+        centered = (self.factor - self.factor.sum(axis=1, keepdims=True) / count) * self.valid[:, :, None]
+        gram = np.einsum('ukt,uks->uts', centered, centered)
+        diagonal = np.where(self.valid, self.variance, 0.0).max(axis=1)
+        return (self.risk_aversion * (np.linalg.eigvalsh(gram)[:, -1] + self.shrinkage * diagonal))[:, None]
+
+    def gather(self, values):
+        return np.take_along_axis(values, self.index, axis=1)
+
+    def scatter(self, values, symbols):
+        result = np.zeros((len(values), symbols))
+        np.put_along_axis(result, self.index, np.where(self.valid, values, 0.0), axis=1)
+        return result
+
+
+class Constructor(object):
+    """
+    Target weights of a portfolio model at every rebalance, for a batch of
+    universes, warm starting its optimizations from the previous targets.
+    """
+    def __init__(self, portfolio, members, warm=True):
+        if portfolio not in PORTFOLIOS:
+            raise SimulationError("%s can't be simulated, choose from: %s" % (portfolio, ', '.join(PORTFOLIOS)))
+        self.portfolio = portfolio
+        self.members = members
+        self.warm = warm
+        self.previous = np.zeros(members.shape)
+        self.iterations = []
+
+    def targets(self, direction, confidence, allowed, covariance=None, mean=None):
+        """The ``(universes, symbols)`` target weights given the insights of a rebalance day."""
+        allowed = self.members & allowed & (direction != 0)
+        count = allowed.sum(axis=1, keepdims=True)
+        if self.portfolio == 'Equal Weighting':
+            share = allowed / np.maximum(count, 1)
+        elif self.portfolio == 'Confidence Weighted Portfolio':
+            share = np.where(allowed, confidence, 0.0)
+            share /= np.maximum(share.sum(axis=1, keepdims=True), 1)
+        else:
+            #optimize the absolute weights, the signs being the directions
+            if self.portfolio == 'Mean-Variance':
+                problem = Problem(covariance, allowed, direction, np.zeros(len(direction)))
+            else:
+                prior = RISK_AVERSION * covariance.dot(np.full((1, len(direction)), 1.0 / len(direction)))[0]
+                views = direction != 0
+                expected = covariance.posterior(prior, views, direction[views] * np.abs(mean[views]))
+                problem = Problem(covariance, allowed, direction, expected, RISK_AVERSION)
+            start = np.abs(self.previous) if self.warm else allowed / np.maximum(count, 1)
+            share, iterations = minimize(problem.gradient, problem.valid, problem.gather(start), problem.lipschitz())
+            share = problem.scatter(share, len(direction))
+            self.iterations.append(iterations)
+        self.previous = direction * share
+        return self.previous
+
+
+class Book(object):
+    """
+    The holdings of every universe under a risk model: their weights,
+    entry and best prices, and daily returns.
+    """
+    def __init__(self, risk, shape, limit=None):
+        if risk not in RISKS:
+            raise SimulationError("%s can't be simulated, choose from: %s" % (risk, ', '.join(RISKS)))
+        self.risk = risk
+        self.limit = limit if limit is not None else RISKS[risk] and PARAMETERS[RISKS[risk]][2]
+        self.weights = np.zeros(shape)
+        self.entry = np.ones(shape)
+        self.best = np.ones(shape)
+        self.returns = []
+        self.turnover = np.zeros(shape[0])
+        self.stops = np.zeros(shape[0])
+
+    def rebalance(self, targets, price):
+        """Trade to ``targets`` at the closes ``price``."""
+        self.turnover += np.abs(targets - self.weights).sum(axis=1)
+        opened = (np.sign(targets) != np.sign(self.weights)) & (targets != 0)
+        self.entry = np.where(opened, price, self.entry)
+        self.best = np.where(opened, price, self.best)
+        self.weights = targets
+
+    def hold(self, path):
+        """
+        Hold until the last of the closes ``path`` (``(symbols, days + 1)``,
+        from the rebalance), liquidating what the risk model stops.
+        """
+        side = np.sign(self.weights)[:, :, None]
+        if self.risk == 'Trailing Stop Risk Management Model':
+            peaks = np.maximum.accumulate(path, axis=1)[None]
+            troughs = np.minimum.accumulate(path, axis=1)[None]
+            best = np.where(side > 0, np.maximum(peaks, self.best[:, :, None]),
+                            np.minimum(troughs, self.best[:, :, None]))
+            stopped = side * (path[None] / best - 1) < -self.limit
+        elif self.risk == 'Maximum Drawdown':
+            stopped = side * (path[None] / self.entry[:, :, None] - 1) < -self.limit
+        elif self.risk == 'Maximum Unrealized Profit Percent Per Security':
+            stopped = side * (path[None] / self.entry[:, :, None] - 1) > self.limit
+        else:
+            stopped = np.zeros(self.weights.shape + path.shape[1:], bool)
+        stopped[:, :, 0] = False
+        days = path.shape[1]
+        #the day of the stop, or past the end
+        stop = np.where(stopped.any(axis=2), stopped.argmax(axis=2), days)
+        frozen = np.minimum(np.arange(days), stop[:, :, None])
+        growth = np.take_along_axis(np.broadcast_to(path[None], frozen.shape), frozen, axis=2) / path[None, :, :1]
+        value = 1 + np.einsum('us,usd->ud', self.weights, growth - 1)
+        self.returns.append(value[:, 1:] / value[:, :-1] - 1)
+        live = stop >= days
+        self.stops += np.count_nonzero(~live & (self.weights != 0), axis=1)
+        self.turnover += np.abs(np.where(live, 0, self.weights * growth[:, :, -1])).sum(axis=1) / value[:, -1:].ravel()
+        self.weights = np.where(live, self.weights * growth[:, :, -1], 0.0) / value[:, -1:]
+        if self.risk == 'Trailing Stop Risk Management Model':
+            self.best = np.where(side[:, :, 0] > 0, np.maximum(self.best, path.max(axis=1)),
+                                 np.minimum(self.best, path.min(axis=1)))
+
+    def summary(self, days):
+        """The performance of the book, averaged over the universes."""
+        returns = np.concatenate(self.returns, axis=1) if self.returns else np.zeros((len(self.turnover), 1))
+        years = max(days / float(TRADING_DAYS), 1e-9)
+        equity = np.cumprod(1 + returns, axis=1)
+        deviation = returns.std(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(deviation > 0, returns.mean(axis=1) / deviation * math.sqrt(TRADING_DAYS), 0.0)
+        drawdown = 1 - equity / np.maximum.accumulate(np.maximum(equity, 1), axis=1)
+        return {
+            'return': float(np.mean(equity[:, -1] ** (1 / years) - 1)),
+            'volatility': float(np.mean(deviation) * math.sqrt(TRADING_DAYS)),
+            'sharpe': float(np.mean(sharpe)),
+            'drawdown': float(np.mean(drawdown.max(axis=1))),
+            'turnover': float(np.mean(self.turnover) / years),
+            'stops': float(np.mean(self.stops) / years),
+        }
+
+
+def simulate(bars, portfolios=PORTFOLIOS, risks=tuple(RISKS), alphas=(), members=None,
+             rebalance=REBALANCE, lookback=LOOKBACK, limits=None, warm=True, weights=None):
+    """
+    Simulate every portfolio model with every risk model on ``bars``, for
+    the universes of ``members`` (every symbol by default). ``limits``
+    overrides the catalog limit of risk models, by parameter name.
+    Returns one row per model pair; when ``weights`` is a dict it gets the
+    ``(rebalances, universes, symbols)`` target weights of every
+    portfolio model.
+    """
+    limits = limits or {}
+    symbols, days = bars.close.shape
+    if lookback < 2 or rebalance < 1:
+        raise SimulationError('the lookback needs 2 days and rebalances at least 1')
+    if days <= lookback + 1:
+        raise SimulationError('%d days of bars, the lookback needs more than %d' % (days, lookback + 1))
+    members = np.ones((1, symbols), bool) if members is None else members
+    direction, confidence = insights(bars, alphas)
+    #rebalance at the close of these days, on the returns up to them
+    schedule = np.arange(lookback, days - 1, rebalance)
+    mean, variance, complete = window_statistics(bars.returns, bars.held, schedule, lookback)
+    rows = []
+    for portfolio in portfolios:
+        constructor = Constructor(portfolio, members, warm)
+        books = [Book(risk, members.shape, limits.get(RISKS.get(risk))) for risk in risks]
+        paths = []
+        optimized = portfolio in ('Mean-Variance', 'Black Litterman')
+        for index, day in enumerate(schedule):
+            covariance = None
+            if optimized:
+                covariance = Covariance(bars.returns[:, day - lookback:day], variance[index])
+            targets = constructor.targets(direction[:, day], confidence[:, day], complete[index],
+                                          covariance, mean[index])
+            if weights is not None:
+                paths.append(targets.astype(np.float32))
+            end = schedule[index + 1] if index + 1 < len(schedule) else days - 1
+            for book in books:
+                book.rebalance(targets, bars.close[:, day])
+                book.hold(bars.close[:, day:end + 1])
+        if weights is not None:
+            weights[portfolio] = np.array(paths)
+        for book in books:
+            row = {'portfolio': portfolio, 'risk': book.risk}
+            row.update(book.summary(days - 1 - schedule[0]))
+            row['iterations'] = float(np.mean(constructor.iterations)) if constructor.iterations else None
+            rows.append(row)
+    return rows
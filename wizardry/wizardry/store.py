@@ -0,0 +1,243 @@
+"""
+The content store of pushed project files, shared by every project.
+
+Files are kept once, named by their SHA-256, under
+``<cache dir>/store/blobs``. After each successful push the files lean
+uploaded are copied to the store (not linked: the project keeps being
+edited) and ``projects/<key>.json`` records which
+blob every path of the remote project (a project name in a lean workspace)
+holds. The next push compares against it line by line, and can skip a
+project already in the cloud as it is even from a copy whose own push
+manifest is gone.
+
+``dedupe`` makes identical files of many projects (the research.ipynb and
+editor settings every variant has) share their storage as copy-on-write
+clones, so each stays writable and an edit only changes the file edited.
+Where the filesystem can't clone they are left alone: a hardlink would make
+an edit of one project change every other. ``clones.json`` remembers the
+files cloned, so that a dedupe run again doesn't clone them again.
+"""
+import collections
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from wizardry.cache import atomic_write, cache_dir
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#permissions of the blobs
+BLOB_MODE = 0o444
+
+#permissions of a file unshared from a blob it was hardlinked to
+MODE = 0o644
+
+#Linux ioctl making a file a copy-on-write clone of another (btrfs, XFS...)
+FICLONE = 0x40049409
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def reflink(source, target):
+    """
+    Replace ``target`` with a copy-on-write clone of ``source``. Returns
+    ``False``, leaving ``target`` alone, where the filesystem can't.
+    """
+    if fcntl is None:
+        return False
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with open(source, 'rb') as original, os.fdopen(fd, 'wb') as clone:
+            fcntl.ioctl(clone.fileno(), FICLONE, original.fileno())
+        shutil.copymode(target, tmp)
+        os.replace(tmp, target)
+    except OSError:
+        os.unlink(tmp)
+        return False
+    return True
+
+
+def unshare(path):
+    """Replace the hardlink ``path`` with a writable copy of its own."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with open(path, 'rb') as original, os.fdopen(fd, 'wb') as copy:
+            shutil.copyfileobj(original, copy)
+        os.chmod(tmp, MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def line_delta(old, new):
+    """
+    ``(added, removed, size)`` from the bytes ``old`` to ``new``: lines
+    added and removed, and their size in bytes.
+    """
+    old = old.decode('utf-8', 'replace').splitlines(True)
+    new = new.decode('utf-8', 'replace').splitlines(True)
+    added = removed = size = 0
+    for line in difflib.unified_diff(old, new, n=0):
+        if line.startswith(('+++', '---', '@@')):
+            continue
+        size += len(line[1:].encode('utf-8'))
+        if line.startswith('+'):
+            added += 1
+        else:
+            removed += 1
+    return added, removed, size
+
+
+class ContentStore(object):
+    """Blobs of pushed files and, per remote project, the blob of each of its paths."""
+    def __init__(self, root=None):
+        self.root = root or cache_dir('store')
+        self.blobs = os.path.join(self.root, 'blobs')
+        self.projects = os.path.join(self.root, 'projects')
+        self.clones = os.path.join(self.root, 'clones.json')
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blobs, sha256[:2], sha256)
+
+    def read(self, sha256):
+        """The content of a blob, ``None`` if it isn't stored."""
+        try:
+            with open(self.blob_path(sha256), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def add(self, path, sha256):
+        """Store a copy of the file at ``path``, whose SHA-256 is ``sha256``. Returns whether a new blob was added."""
+        blob = self.blob_path(sha256)
+        if os.path.exists(blob):
+            return False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(blob), '.tmp-%s-%d' % (sha256[:16], os.getpid()))
+        try:
+            shutil.copyfile(path, tmp)
+            os.chmod(tmp, BLOB_MODE)
+            os.replace(tmp, blob)
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            raise
+        return True
+
+    def _record_path(self, workspace, name):
+        key = hashlib.sha256(('%s\0%s' % (os.path.abspath(workspace), name)).encode('utf-8')).hexdigest()
+        return os.path.join(self.projects, key[:32] + '.json')
+
+    def pushed(self, workspace, name):
+        """``{path: sha256}`` of the files last pushed to the project ``name`` of ``workspace``."""
+        try:
+            with open(self._record_path(workspace, name)) as file:
+                return json.load(file)['files']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def record(self, workspace, name, directory, state):
+        """Remember the files of ``state`` (see ``PushManifest.scan``), in ``directory``, as pushed."""
+        for path, info in state.items():
+            self.add(os.path.join(directory, path), info['sha256'])
+        os.makedirs(self.projects, exist_ok=True)
+        files = {path: info['sha256'] for path, info in state.items()}
+        atomic_write(self._record_path(workspace, name), json.dumps(
+            {'workspace': os.path.abspath(workspace), 'project': name, 'files': files},
+            indent=1, sort_keys=True).encode('utf-8'))
+
+    def deltas(self, directory, state, previous):
+        """
+        ``{path: (added, removed, size)}`` for every path of ``state`` or
+        ``previous`` (``{path: sha256}`` as pushed) which changed, see
+        ``line_delta``. A file whose pushed blob is gone counts as new.
+        """
+        deltas = {}
+        for path in sorted(set(state) | set(previous)):
+            sha256 = state[path]['sha256'] if path in state else None
+            if sha256 == previous.get(path):
+                continue
+            old = self.read(previous[path]) if path in previous else None
+            if sha256 is None:
+                deltas[path] = line_delta(old or b'', b'')
+                continue
+            with open(os.path.join(directory, path), 'rb') as file:
+                new = file.read()
+            deltas[path] = line_delta(old or b'', new)
+        return deltas
+
+    def dedupe(self, paths):
+        """
+        Make the files of ``paths`` with the same content share it, as
+        copy-on-write clones of the first of them. Files an older wizardry
+        hardlinked to a read-only blob get a writable copy of their own
+        first. Returns ``(linked, saved)``: the number of files cloned and
+        the bytes this freed.
+        """
+        try:
+            with open(self.clones) as file:
+                clones = json.load(file)
+        except (OSError, ValueError):
+            clones = {}
+        groups = collections.defaultdict(list)
+        for path in paths:
+            info = os.stat(path)
+            if not info.st_size:
+                continue
+            sha256 = file_sha256(path)
+            blob = self.blob_path(sha256)
+            if info.st_nlink > 1 and os.path.exists(blob) and os.path.samefile(path, blob):
+                unshare(path)
+            groups[sha256, info.st_size].append(path)
+        linked = saved = 0
+        for (sha256, size), group in groups.items():
+            if len(group) < 2:
+                continue
+            for path in group[1:]:
+                key = os.path.abspath(path)
+                info = os.stat(path)
+                if clones.get(key) == [sha256, info.st_ino, info.st_mtime_ns]:
+                    continue
+                if not reflink(group[0], path):
+                    continue
+                info = os.stat(path)
+                clones[key] = [sha256, info.st_ino, info.st_mtime_ns]
+                linked += 1
+                saved += size
+        if linked:
+            os.makedirs(self.root, exist_ok=True)
+            clones = {key: clone for key, clone in clones.items() if os.path.exists(key)}
+            atomic_write(self.clones, json.dumps(clones, indent=1, sort_keys=True).encode('utf-8'))
+        return linked, saved
+
+    def prune(self):
+        """Remove the blobs no remote project holds (nor a file of an older dedupe links to). Returns how many went."""
+        kept = set()
+        if os.path.isdir(self.projects):
+            for name in os.listdir(self.projects):
+                try:
+                    with open(os.path.join(self.projects, name)) as file:
+                        kept.update(json.load(file)['files'].values())
+                except (OSError, ValueError, KeyError):
+                    continue
+        removed = 0
+        for root, _, names in os.walk(self.blobs):
+            for name in names:
+                path = os.path.join(root, name)
+                if name not in kept and os.stat(path).st_nlink == 1:
+                    os.unlink(path)
+                    removed += 1
+        return removed
@@ -0,0 +1,141 @@
+"""
+Timings of wizardry commands, as spans: ``--trace out.json`` and
+``wizardry stats``.
+
+Every command records how long its phases took: ``import`` of the CLI,
+``prompt``, ``codegen``, ``check``, ``fetch`` (HTTP downloads, with the
+bytes received), ``push``, ``queue`` (waiting for the rate limit of
+``backtest --projects``) and each lean sub-command (``lean cloud push``,
+``lean login``... with their exit code and the bytes of output captured),
+plus the whole ``command``. Recording a span is a couple of clock reads,
+so it is always on.
+
+``wizardry --trace out.json <command>`` writes the spans of the command in
+the Chrome trace format (open it in ``chrome://tracing`` or Perfetto), or
+as JSON lines when the file name ends with ``.jsonl``. Every command also
+appends its spans to a history in the cache directory, which ``wizardry
+stats`` summarizes.
+"""
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+from wizardry.cache import atomic_write, cache_dir
+
+#runs kept in the history, older ones are dropped once it grows past HISTORY_SIZE bytes
+MAX_RUNS = 200
+HISTORY_SIZE = 256 * 1024
+
+
+class Tracer(object):
+    """The spans recorded by this process."""
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+        #wall clock time of perf_counter's zero
+        self._origin = time.time() - time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Record the time spent in the ``with`` block as a span ``name``. The
+        block gets the ``attributes`` dict, to add e.g. an exit code to it.
+        """
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.add(name, start, time.perf_counter(), **attributes)
+
+    def add(self, name, start, end, **attributes):
+        """Record a span from the ``perf_counter`` times ``start`` to ``end``."""
+        span = {'name': name, 'start': self._origin + start, 'duration': end - start,
+                'thread': threading.get_ident(), 'attributes': attributes}
+        with self._lock:
+            self.spans.append(span)
+
+    def chrome(self):
+        """The spans in the Chrome trace event format."""
+        pid = os.getpid()
+        return {'displayTimeUnit': 'ms', 'traceEvents': [
+            {'name': span['name'], 'cat': 'wizardry', 'ph': 'X', 'pid': pid, 'tid': span['thread'],
+             'ts': round(span['start'] * 1e6), 'dur': round(span['duration'] * 1e6),
+             'args': span['attributes']}
+            for span in self.spans]}
+
+    def export(self, path):
+        """Write the spans to ``path``, as JSON lines if it ends with ``.jsonl``."""
+        with open(path, 'w') as file:
+            if path.endswith('.jsonl'):
+                for span in self.spans:
+                    file.write(json.dumps(span, default=str) + '\n')
+            else:
+                json.dump(self.chrome(), file, default=str)
+
+    def record(self, command, path=None):
+        """Append the spans of this run of ``command`` to the history."""
+        path = path or cache_dir('traces', 'history.jsonl')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        run = {'command': command, 'started': time.time(),
+               'spans': [{'name': span['name'], 'duration': span['duration']} for span in self.spans]}
+        with open(path, 'a') as file:
+            file.write(json.dumps(run) + '\n')
+        if os.path.getsize(path) > HISTORY_SIZE:
+            runs = load_history(path)
+            if len(runs) > MAX_RUNS:
+                atomic_write(path, ''.join(json.dumps(run) + '\n' for run in runs[-MAX_RUNS:]).encode('utf-8'))
+
+
+TRACER = Tracer()
+
+span = TRACER.span
+
+
+def lean_phase(args):
+    """The span name of ``lean <args>``: ``lean cloud push``, ``lean login``..."""
+    args = list(args)
+    return ' '.join(['lean'] + args[:2 if args[:1] == ['cloud'] else 1])
+
+
+def load_history(path=None, command=None, runs=None):
+    """The recorded runs, oldest first, of ``command`` if given, the last ``runs`` of them."""
+    path = path or cache_dir('traces', 'history.jsonl')
+    history = []
+    try:
+        with open(path) as file:
+            for line in file:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue
+                if command is None or run.get('command') == command:
+                    history.append(run)
+    except OSError:
+        return []
+    return history[-runs:] if runs else history
+
+
+def percentile(values, q):
+    """The nearest-rank ``q`` percentile (0-100) of ``values``."""
+    values = sorted(values)
+    return values[max(1, int(math.ceil(q / 100.0 * len(values)))) - 1]
+
+
+def summarize(runs):
+    """
+    One row per phase of ``runs``: the number of spans, their median, 95th
+    percentile and total duration, in seconds. Phases taking the most time
+    overall come first.
+    """
+    durations = {}
+    for run in runs:
+        for span in run['spans']:
+            durations.setdefault(span['name'], []).append(span['duration'])
+    rows = [{'phase': name, 'count': len(values), 'p50': percentile(values, 50),
+             'p95': percentile(values, 95), 'total': sum(values)}
+            for name, values in durations.items()]
+    rows.sort(key=lambda row: row['total'], reverse=True)
+    return rows
@@ -0,0 +1,229 @@
+"""
+``wizardry watch``: backtest the project again every time it is saved.
+
+Changes are picked up with inotify on Linux and by polling the modification
+times of the project files elsewhere. A burst of saves (an editor writing
+several files, or saving twice) is coalesced until the project has been
+quiet for the debounce window. Then the project is pushed, which is skipped
+when no file lean uploads changed, and backtested. A save arriving while a
+backtest runs terminates it and starts over with the newer code. The time
+from the save to the start of its backtest is reported every time.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from wizardry.manifest import SKIPPED_DIRECTORIES, is_project_file, project_files, project_location, push_project
+from wizardry.runner import run_lean, start_lean
+
+#seconds the project must stay unchanged before a backtest starts
+DEBOUNCE = 0.5
+
+#seconds between two scans of the polling watcher
+POLL_INTERVAL = 0.5
+
+#inotify events meaning a file was written, created, renamed or deleted
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher(object):
+    """Reports the files changed under ``directory``, from inotify."""
+    kind = 'inotify'
+
+    def __init__(self, directory):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self.directory = directory
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        self._watch_tree(directory)
+
+    def _watch_tree(self, top):
+        for root, directories, names in os.walk(top):
+            directories[:] = [name for name in directories
+                              if not name.startswith('.') and name not in SKIPPED_DIRECTORIES]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch failed on %s' % root)
+            self.watches[wd] = root
+
+    def changes(self, timeout=None):
+        """
+        The paths (relative to the directory) of the files changed, waiting
+        up to ``timeout`` seconds (forever if ``None``) for a first one.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                root = self.watches.get(wd)
+                if root is None or not name:
+                    continue
+                path = os.path.join(root, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                        self._watch_tree(path)
+                    continue
+                changed.add(os.path.relpath(path, self.directory).replace(os.sep, '/'))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher(object):
+    """Reports the files changed under ``directory`` by scanning it."""
+    kind = 'polling'
+
+    def __init__(self, directory, interval=POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.state = self.scan()
+
+    def scan(self):
+        state = {}
+        for path in project_files(self.directory):
+            try:
+                stat = os.stat(os.path.join(self.directory, path))
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def changes(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if wait > 0:
+                time.sleep(wait)
+            state = self.scan()
+            changed = {path for path in set(state) | set(self.state) if state.get(path) != self.state.get(path)}
+            self.state = state
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, polling=False):
+    """An inotify watcher of ``directory``, or a polling one without inotify."""
+    if not polling:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory)
+
+
+def last_save(directory, paths):
+    """The modification time of the latest saved file of ``paths``."""
+    times = []
+    for path in paths:
+        try:
+            times.append(os.stat(os.path.join(directory, path)).st_mtime)
+        except OSError:
+            pass
+    return max(times) if times else time.time()
+
+
+class Watch(object):
+    """
+    Backtests the project in ``directory`` after every save, in the cloud or
+    with ``local`` lean backtests.
+    """
+    def __init__(self, directory, debounce=DEBOUNCE, local=False, polling=False,
+                 push=push_project, start=start_lean, log=print):
+        self.directory = os.path.abspath(directory)
+        self.workspace, self.name = project_location(self.directory)
+        self.debounce = debounce
+        self.local = local
+        self.push = push
+        self.start = start
+        self.log = log
+        self.watcher = make_watcher(self.directory, polling)
+        self.process = None
+        self.latencies = []
+
+    def changes(self, timeout):
+        return {path for path in self.watcher.changes(timeout) if is_project_file(path)}
+
+    def settle(self, changed):
+        """Wait for the project to be quiet for the debounce window."""
+        deadline = time.monotonic() + self.debounce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return changed
+            more = self.changes(remaining)
+            if more:
+                changed |= more
+                deadline = time.monotonic() + self.debounce
+
+    def backtest(self, changed):
+        """Push (in the cloud mode) and start the backtest of ``changed``."""
+        saved = last_save(self.directory, changed)
+        if self.process is not None:
+            self.process.cancel()
+            self.process = None
+            self.log("Cancelled the backtest of the previous save.")
+        self.log("Changed: %s" % ', '.join(sorted(changed)))
+        if self.local:
+            args = ['backtest', self.name]
+        else:
+            if self.push(self.directory, run=run_lean, log=self.log):
+                self.log("The push failed, waiting for the next save.")
+                return
+            args = ['cloud', 'backtest', self.name]
+        self.process = self.start(args, cwd=self.workspace)
+        latency = time.time() - saved
+        self.latencies.append(latency)
+        self.log("Backtest started %.2fs after the save." % latency)
+
+    def run(self, stop=None):
+        """Watch until interrupted, or until the ``stop`` event is set."""
+        self.log("Watching %s for changes (%s), Ctrl+C to stop." % (self.name, self.watcher.kind))
+        try:
+            while stop is None or not stop.is_set():
+                changed = self.changes(POLL_INTERVAL)
+                if self.process is not None and self.process.poll() is not None:
+                    self.log("Backtest finished with exit code %d." % self.process.returncode)
+                    self.process = None
+                if changed:
+                    self.backtest(self.settle(changed))
+        finally:
+            if self.process is not None:
+                self.process.cancel()
+            self.watcher.close()
+
+    def summary(self):
+        """The number, median and worst save-to-start latency of the backtests."""
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return {'backtests': len(latencies), 'median': latencies[len(latencies) // 2], 'max': latencies[-1]}